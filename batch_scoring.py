@@ -0,0 +1,80 @@
+# Score a whole CSV of customers (Telco schema) at once, for the upload on the prediction page
+import base64
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from predictors import INPUT_COLUMNS, model_inputs
+
+CHUNK_SIZE = 50_000
+
+
+def read_upload(contents):
+    """DataFrame of a `dcc.Upload` value ("data:<type>;base64,<data>")."""
+    _, data = contents.split(",", 1)
+    try:
+        return pd.read_csv(io.BytesIO(base64.b64decode(data)))
+    except (ValueError, pd.errors.ParserError) as error:
+        raise ValueError(f"Not a readable CSV file ({error})") from error
+
+
+def prepare(raw):
+    """Cleaned copy of the uploaded rows, the same way the dataset is cleaned."""
+    missing = [column for column in INPUT_COLUMNS if column not in raw.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    try:
+        return data_loader.clean_dataset(raw[INPUT_COLUMNS].copy())
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"Invalid values in the numeric columns ({error})") from error
+
+
+def score(raw, encoder, predictor, chunk_size=CHUNK_SIZE, report=None):
+    """`raw` plus ChurnProbability (local model only) and Prediction ("Leave" / "Stay") columns.
+
+    `report(text)` is called before each chunk, a job (see jobs.py) stops there once cancelled.
+    """
+    clean = prepare(raw)
+
+    will_leave = np.empty(len(clean), dtype=bool)
+    probability = np.full(len(clean), np.nan)
+    for start in range(0, len(clean), chunk_size):
+        if report is not None:
+            report(f"Scored {start:,d} of {len(clean):,d} customers")
+        chunk = slice(start, start + chunk_size)
+        X = encoder.transform(model_inputs(clean.iloc[chunk]))
+        will_leave[chunk], chunk_probability = predictor.predict_batch(X)
+        if chunk_probability is not None:
+            probability[chunk] = chunk_probability
+
+    scored = raw.copy()
+    if not np.isnan(probability).all():
+        scored["ChurnProbability"] = probability.round(4)
+    scored["Prediction"] = np.where(will_leave, "Leave", "Stay")
+
+    return scored
+
+
+def summarize(scored, seconds):
+    leavers = scored["Prediction"] == "Leave"
+    charges = pd.to_numeric(scored["MonthlyCharges"], errors="coerce")
+
+    return {
+        "rows": len(scored),
+        "leavers": int(leavers.sum()),
+        "leavers_share": leavers.mean() * 100 if len(scored) else 0,
+        "monthly_charges_at_risk": float(charges[leavers].sum()),
+        "seconds": seconds,
+    }
+
+
+def score_upload(contents, encoder, predictor, report=None):
+    """(scored DataFrame, summary dict) of an uploaded CSV, raises ValueError on a bad file."""
+    start = time.perf_counter()
+    scored = score(read_upload(contents), encoder, predictor, report=report)
+
+    return scored, summarize(scored, time.perf_counter() - start)
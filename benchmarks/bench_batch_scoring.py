@@ -0,0 +1,43 @@
+# Throughput of the CSV upload on the prediction page (local model)
+#   python benchmarks/bench_batch_scoring.py --sizes 7043,1e5,1e6
+import argparse
+import base64
+import os
+import tempfile
+
+from common import make_dataset, timeit, parse_sizes, CSV_PATH, REPO_ROOT
+
+import batch_scoring
+from feature_encoder import FeatureEncoder
+from predictors import LocalPredictor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="7043,1e5,1e6")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    encoder = FeatureEncoder.load(os.path.join(REPO_ROOT, "encoder.json"))
+    predictor = LocalPredictor(os.path.join(REPO_ROOT, "local_model.npz"))
+
+    print(f"{'rows':>12} {'upload (s)':>11} {'rows/s':>12} {'scoring only (s)':>17} {'rows/s':>12} {'leavers':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            csv_path = CSV_PATH if n_rows == 7043 else make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}.csv"))
+            with open(csv_path, "rb") as f:
+                contents = "data:text/csv;base64," + base64.b64encode(f.read()).decode()
+
+            # Everything the callback does: decode, parse, clean, transform, predict
+            upload = timeit(lambda: batch_scoring.score_upload(contents, encoder, predictor), args.repeat)
+
+            raw = batch_scoring.read_upload(contents)
+            scoring = timeit(lambda: batch_scoring.score(raw, encoder, predictor), args.repeat)
+            _, summary = batch_scoring.score_upload(contents, encoder, predictor)
+
+            print(f"{n_rows:>12,d} {upload:>11.2f} {n_rows / upload:>12,.0f} {scoring:>17.2f} "
+                  f"{n_rows / scoring:>12,.0f} {summary['leavers_share']:>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
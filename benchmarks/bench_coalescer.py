@@ -0,0 +1,82 @@
+# Concurrent predictions against the stand-in API, one call each vs coalesced into batch calls
+#   python benchmarks/bench_coalescer.py --users 1,8,32,64 --latency-ms 20
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from common import REPO_ROOT
+
+from load_test import percentiles, start_stand_in
+
+from coalescer import CoalescingPredictor
+from predictors import FEATURES, RemotePredictor
+from prediction_client import PredictionClient
+
+
+def run(predictor, users, seconds):
+    """(latencies, predictions per second) of `users` threads calling predictor.predict."""
+    stop = time.perf_counter() + seconds
+    latencies = []
+
+    def user(i):
+        rng = np.random.default_rng(i)
+        while time.perf_counter() < stop:
+            features = dict(zip(FEATURES, rng.random(len(FEATURES))))
+            start = time.perf_counter()
+            predictor.predict(features)
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return latencies, len(latencies) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", default="1,8,32,64", help="threads predicting at once, one run per value")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20, help="latency of every stand-in API call")
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    process, url = start_stand_in(args.latency_ms)
+    stats_url = url.rsplit("/", 1)[0] + "/stats"
+
+    def api_calls():
+        return json.loads(urllib.request.urlopen(stats_url).read())["requests"]
+
+    try:
+        print(f"API latency {args.latency_ms:.0f} ms, window {args.window_ms:.0f} ms, up to {args.max_batch} per batch")
+        print(f"{'users':>6} {'mode':>10} {'per second':>11} {'API calls':>10} {'mean batch':>11}  latency")
+        for users in [int(i) for i in args.users.split(",")]:
+            client = PredictionClient(url, pool_size=max(users, 1), retries=0)
+            single = RemotePredictor(client)
+            coalesced = CoalescingPredictor(RemotePredictor(client, batch_url=url + "/batch"),
+                                            window=args.window_ms / 1e3, max_batch=args.max_batch,
+                                            concurrency=max(users, 1))
+
+            for mode, predictor in [("single", single), ("coalesced", coalesced)]:
+                before = api_calls()
+                latencies, throughput = run(predictor, users, args.seconds)
+                calls = api_calls() - before
+                print(f"{users:>6} {mode:>10} {throughput:>11,.0f} {calls:>10,d} {len(latencies) / calls:>11.1f}  "
+                      f"{percentiles(latencies)}")
+
+            client.close()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# transformer.pkl (pandas + sklearn) vs the exported FeatureEncoder, one customer and whole datasets
+#   python benchmarks/bench_encoder.py --sizes 7043,1e6
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import make_dataset, timeit, parse_sizes, CSV_PATH, REPO_ROOT
+
+import data_loader
+from feature_encoder import FeatureEncoder
+from predictors import model_inputs
+
+# What the prediction form sends
+FORM = {"gender": "Male", "SeniorCitizen": 0, "Partner": 1, "Dependents": 0, "tenure": 15, "PhoneService": 1,
+        "InternetService": "DSL", "Contract": "One year", "PaymentMethod": "Mailed check",
+        "MonthlyCharges": 50, "TotalCharges": 500}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="7043,1e6")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    transformer = pd.read_pickle(os.path.join(REPO_ROOT, "transformer.pkl"))
+    encoder = FeatureEncoder.load(os.path.join(REPO_ROOT, "encoder.json"))
+
+    n_calls = 1000
+    legacy = timeit(lambda: [transformer.transform(pd.DataFrame({k: [v] for k, v in FORM.items()}))
+                             for _ in range(n_calls)], 1)
+    fast = timeit(lambda: [encoder.transform_one(FORM) for _ in range(n_calls)], args.repeat)
+    assert np.array_equal(encoder.transform_one(FORM),
+                          transformer.transform(pd.DataFrame({k: [v] for k, v in FORM.items()}))[0])
+    print(f"one customer: transformer {legacy / n_calls * 1e6:,.0f} us, encoder {fast / n_calls * 1e6:,.1f} us "
+          f"({legacy / fast:,.0f}x)")
+
+    print(f"{'rows':>12} {'transformer (ms)':>17} {'encoder (ms)':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            csv_path = CSV_PATH if n_rows == 7043 else make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}.csv"))
+            inputs = model_inputs(data_loader.load_dataset(csv_path, use_snapshot=False))
+
+            legacy = timeit(lambda: transformer.transform(inputs), args.repeat)
+            fast = timeit(lambda: encoder.transform(inputs), args.repeat)
+            assert np.array_equal(encoder.transform(inputs), transformer.transform(inputs))
+
+            print(f"{n_rows:>12,d} {legacy * 1e3:>17.1f} {fast * 1e3:>13.1f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Copy based page filters vs the precomputed FilterIndex
+#   python benchmarks/bench_filters.py --sizes 7043,1e6
+import argparse
+import itertools
+import os
+import tempfile
+
+from common import make_dataset, timeit, parse_sizes, CSV_PATH
+
+import data_loader
+from filter_index import FilterIndex
+
+
+# The filters main.py used before the index, kept here as the baseline
+def filter_the_column(the_df, column, value):
+    df_filtered = the_df.copy()
+
+    if value != "All":
+        f = the_df[column] == value
+        df_filtered = the_df[f].copy()
+
+    return df_filtered
+
+
+def legacy_select(the_df, contract, payment_method):
+    dff = filter_the_column(the_df, "Contract", contract)
+    return filter_the_column(dff, "PaymentMethod", payment_method)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="7043,1e6")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'legacy (ms)':>12} {'index build (ms)':>17} {'index (ms)':>11} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            csv_path = CSV_PATH if n_rows == 7043 else make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}.csv"))
+            df = data_loader.load_dataset(csv_path, use_snapshot=False)
+
+            # One page view per sidebar combination
+            combos = list(itertools.product(["All"] + data_loader.CATEGORIES["Contract"],
+                                            ["All"] + data_loader.CATEGORIES["PaymentMethod"]))
+
+            legacy = timeit(lambda: [legacy_select(df, c, p) for c, p in combos], args.repeat)
+            build = timeit(lambda: FilterIndex(df), 1)
+
+            index = FilterIndex(df)
+            for c, p in combos:
+                assert index.select(Contract=c, PaymentMethod=p).equals(legacy_select(df, c, p))
+
+            indexed = timeit(lambda: [index.select(Contract=c, PaymentMethod=p) for c, p in combos], args.repeat)
+
+            print(f"{n_rows:>12,d} {legacy * 1e3 / len(combos):>12.2f} {build * 1e3:>17.1f} "
+                  f"{indexed * 1e3 / len(combos):>11.2f} {legacy / indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Time for the dashboard to reflect rows appended to the customer CSV, incremental vs loading it again
+#   python benchmarks/bench_reload.py --sizes 1e6 --append 1e5
+#
+# Each mode imports main.py in a fresh interpreter on a synthetic CSV, builds
+# the At-Risk ranking, appends rows to the file and lets the watcher of
+# reloader.py pick them up, then checks every chart count against a cube
+# built from the whole new file.
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import CSV_PATH, REPO_ROOT, make_dataset, parse_sizes
+
+import data_loader
+import synthetic
+from cube import CUBE_COLUMNS, AggregateCube
+from filter_index import FILTER_COLUMNS
+
+MODES = {
+    "memory": {"STREAMING_INGEST": "0"},
+    "streaming": {"STREAMING_INGEST": "1"},
+}
+
+
+def reload(csv_path, n_append):
+    """Load like the app, append `n_append` rows, print the seconds of each step and the counts check as JSON."""
+    import main
+    import reloader
+
+    main.risk_ranking.get()
+    watcher = reloader.CSVWatcher(csv_path, main.append_rows, main.reload_dataset)
+
+    n_rows = main.cube.kpis()["rows"]
+    model = synthetic.SyntheticTelco.fit(CSV_PATH)
+    with open(csv_path, "a", newline="") as f:
+        f.write(model.csv_lines(n_append, np.random.default_rng(n_rows), first_id=n_rows,
+                                id_digits=synthetic.id_digits(n_rows + n_append)))
+
+    start = time.perf_counter()
+    assert watcher.check() == "append"
+    append_seconds = time.perf_counter() - start
+    top = main.update_at_risk_table("All", "All", 25)[0]
+
+    expected = AggregateCube(data_loader.load_csv(csv_path))
+    same = all(main.cube.counts(column, **filters).equals(expected.counts(column, **filters))
+               for column in CUBE_COLUMNS
+               for filters in [dict(zip(FILTER_COLUMNS, values)) for values in
+                               itertools.product(*[["All"] + data_loader.CATEGORIES[k] for k in FILTER_COLUMNS])])
+    same &= main.cube.kpis()["customers"] == expected.kpis()["customers"] == n_rows + n_append
+    same &= len(top) == 25
+
+    start = time.perf_counter()
+    main.reload_dataset()
+    main.risk_ranking.get()
+    full_seconds = time.perf_counter() - start
+
+    print(json.dumps({"append_seconds": append_seconds, "full_seconds": full_seconds, "same": bool(same)}))
+
+
+def run(mode, csv_path, n_append):
+    env = dict(os.environ, CHURN_DATA_PATH=csv_path, PREDICTOR_BACKEND="local", **MODES[mode])
+    output = subprocess.run([sys.executable, "-W", "ignore", __file__, "--child", csv_path, str(n_append)],
+                            capture_output=True, text=True, check=True, cwd=REPO_ROOT, env=env).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        reload(sys.argv[2], int(sys.argv[3]))
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1e6", help="rows of the CSV before the append")
+    parser.add_argument("--append", type=float, default=1e5, help="rows appended")
+    parser.add_argument("--modes", default="memory,streaming")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'appended':>9} {'mode':>9} {'append (s)':>11} {'full reload (s)':>16}  same counts")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            for mode in args.modes.split(","):
+                csv_path = make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}-{mode}.csv"))
+                result = run(mode, csv_path, int(args.append))
+                print(f"{n_rows:>12,d} {int(args.append):>9,d} {mode:>9} {result['append_seconds']:>11.2f} "
+                      f"{result['full_seconds']:>16.2f}  {result['same']}")
+
+                assert result["same"]
+                os.remove(csv_path)
+
+
+if __name__ == "__main__":
+    main()
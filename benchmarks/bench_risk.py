@@ -0,0 +1,60 @@
+# Whole-base churn scoring for the At-Risk Customers page (local model)
+#   python benchmarks/bench_risk.py --sizes 7043,1e6
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+
+from common import make_dataset, timeit, parse_sizes, CSV_PATH, REPO_ROOT
+
+import data_loader
+import risk
+from feature_encoder import FeatureEncoder
+from filter_index import FilterIndex
+from predictors import LocalPredictor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="7043,1e6")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=50)
+    args = parser.parse_args()
+
+    encoder = FeatureEncoder.load(os.path.join(REPO_ROOT, "encoder.json"))
+    predictor = LocalPredictor(os.path.join(REPO_ROOT, "local_model.npz"))
+
+    print(f"{'rows':>12} {'score (s)':>10} {'rows/s':>12} {'cached load (ms)':>17} {'ranking (ms)':>13} "
+          f"{'top-N query (ms)':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            csv_path = os.path.join(tmp, f"telco-{n_rows}.csv")
+            if n_rows == 7043:
+                shutil.copy(CSV_PATH, csv_path)
+            else:
+                make_dataset(n_rows, csv_path)
+
+            df = data_loader.load_dataset(csv_path)
+
+            scoring = timeit(lambda: risk.score(df, encoder, predictor), args.repeat)
+            scores = risk.load_or_score(csv_path, df, encoder, predictor)  # writes the cache file
+            cached = timeit(lambda: risk.load_or_score(csv_path, df, encoder, predictor), args.repeat)
+            assert (risk.load_or_score(csv_path, df, encoder, predictor) == scores).all()
+
+            index = FilterIndex(df)
+            ranking_build = timeit(lambda: risk.RiskRanking(df, scores, index), 1)
+            ranking = risk.RiskRanking(df, scores, index)
+
+            # One query per sidebar combination, like the page callback
+            combos = list(itertools.product(["All"] + data_loader.CATEGORIES["Contract"],
+                                            ["All"] + data_loader.CATEGORIES["PaymentMethod"]))
+            query = timeit(lambda: [ranking.top(args.top, Contract=c, PaymentMethod=p, Churn="No")
+                                    for c, p in combos], args.repeat)
+
+            print(f"{n_rows:>12,d} {scoring:>10.2f} {n_rows / scoring:>12,.0f} {cached * 1e3:>17.1f} "
+                  f"{ranking_build * 1e3:>13.1f} {query * 1e3 / len(combos):>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# CSV parse + cleaning vs columnar snapshot load
+#   python benchmarks/bench_snapshot.py --sizes 7043,1e6,1e7
+import argparse
+import os
+import tempfile
+
+from common import make_dataset, timeit, parse_sizes, CSV_PATH
+
+import data_loader
+
+
+def bench(csv_path, repeat):
+    csv_time = timeit(lambda: data_loader.load_csv(csv_path), repeat)
+
+    # First call builds the snapshot, the timed ones read it
+    data_loader.load_dataset(csv_path)
+    snapshot_time = timeit(lambda: data_loader.load_dataset(csv_path), repeat)
+
+    return csv_time, snapshot_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="7043,1e6,1e7")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'csv (s)':>10} {'snapshot (s)':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            if n_rows == 7043:
+                csv_path = os.path.join(tmp, "telco.csv")
+                with open(CSV_PATH) as src, open(csv_path, "w") as dst:
+                    dst.write(src.read())
+            else:
+                csv_path = make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}.csv"))
+
+            csv_time, snapshot_time = bench(csv_path, args.repeat)
+            print(f"{n_rows:>12,d} {csv_time:>10.3f} {snapshot_time:>13.3f} {csv_time / snapshot_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Chart counts and KPI cards from the in-memory AggregateCube vs SQL queries against SQLite
+#   python benchmarks/bench_sql_backend.py --sizes 1e6,1e7 --queries 40
+#
+# Every query the benchmark times is also checked against the cube, any difference fails the run.
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import make_dataset, parse_sizes
+
+import data_loader
+import sql_backend
+import streaming
+from cube import CUBE_COLUMNS, AggregateCube
+from filter_index import FILTER_COLUMNS
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def same_kpis(a, b):
+    return (all(a[k] == b[k] for k in ("customers", "rows", "churned"))
+            and np.isclose(a["total_charges"], b["total_charges"], rtol=1e-9))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="7043,1e6")
+    parser.add_argument("--queries", type=int, default=40, help="random chart queries per size, every one when 0")
+    parser.add_argument("--kpi-queries", type=int, default=8, help="random KPI card queries per size, every one when 0")
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    filters = [dict(zip(FILTER_COLUMNS, values)) for values in
+               itertools.product(*[["All"] + data_loader.CATEGORIES[column] for column in FILTER_COLUMNS])]
+    charts = list(itertools.product(CUBE_COLUMNS, filters))
+
+    print(f"{'rows':>12} {'build (s)':>10} {'DB (MB)':>8} {'cube (ms)':>10} {'SQL p50 (ms)':>13} "
+          f"{'SQL p95 (ms)':>13} {'KPI (ms)':>9}  same results")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            csv_path = make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}.csv"))
+            rng = np.random.default_rng(args.seed)
+
+            cube = AggregateCube()
+            streaming.stream_dataset(csv_path, [cube], args.chunk_rows)
+
+            path, build_seconds = timed(sql_backend.load_or_build, csv_path, args.chunk_rows)
+            backend = sql_backend.SQLBackend(path)
+
+            picked = [charts[i] for i in rng.permutation(len(charts))[:args.queries or None]]
+            cube_times, sql_times, same = [], [], True
+            for column, chart_filters in picked:
+                expected, seconds = timed(cube.counts, column, **chart_filters)
+                cube_times.append(seconds)
+                counts, seconds = timed(backend.counts, column, **chart_filters)
+                sql_times.append(seconds)
+                same &= expected.index.tolist() == counts.index.tolist() and expected.tolist() == counts.tolist()
+
+            kpi_times = []
+            for i in rng.permutation(len(filters))[:args.kpi_queries or None]:
+                kpis, seconds = timed(backend.kpis, **filters[i])
+                kpi_times.append(seconds)
+                same &= same_kpis(kpis, cube.kpis(**filters[i]))
+
+            p50, p95 = np.percentile(sql_times, [50, 95]) * 1e3
+            print(f"{n_rows:>12,d} {build_seconds:>10.1f} {os.path.getsize(path) / 2 ** 20:>8,.0f} "
+                  f"{np.mean(cube_times) * 1e3:>10.2f} {p50:>13.1f} {p95:>13.1f} "
+                  f"{np.mean(kpi_times) * 1e3:>9.1f}  {same}")
+
+            assert same
+            os.remove(path)
+            os.remove(csv_path)
+
+
+if __name__ == "__main__":
+    main()
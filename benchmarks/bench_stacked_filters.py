@@ -0,0 +1,88 @@
+# Chart counts under more and more sidebar filters: filtered DataFrame copies vs the bitmaps of cube.RowCounts
+#   python benchmarks/bench_stacked_filters.py --sizes 1e6,5e6
+#
+# Every step adds one filter to the ones before it (a contract, two payment
+# methods, stayed customers, a tenure range, a MonthlyCharges range) and
+# counts every chart column under them. The copies get cheaper as fewer rows
+# are left, the bitmaps cost the same at every step. Each step must give the
+# same counts both ways.
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from common import make_dataset, parse_sizes, timeit
+
+import data_loader
+from cube import CUBE_COLUMNS, RowCounts, column_codes
+from filter_index import FILTER_COLUMNS, RANGE_COLUMNS, FilterIndex, selected
+
+STEPS = [
+    ("Contract", "Month-to-month"),
+    ("PaymentMethod", ["Electronic check", "Mailed check"]),
+    ("Churn", "No"),
+    ("tenure", (12, 48)),
+    ("MonthlyCharges", (30, 90)),
+]
+
+
+def copy_counts(df, filters):
+    """Counts of every chart column from a filtered copy, like the pages did before the cube."""
+    keep = np.logical_and.reduce([df[k].cat.codes.to_numpy() >= 0 for k in FILTER_COLUMNS])
+    for column, value in filters.items():
+        if column in RANGE_COLUMNS:
+            keep &= df[column].between(*value).to_numpy()
+        elif selected(value) is not None:
+            keep &= df[column].isin(selected(value)).to_numpy()
+    dff = df[keep].copy()
+
+    counts = {}
+    for column in CUBE_COLUMNS:
+        codes, categories = column_codes(dff, column)
+        counts[column] = np.bincount(codes[codes >= 0], minlength=len(categories))
+
+    return counts
+
+
+def bitmap_counts(row_counts, filters):
+    counts = {}
+    for column in CUBE_COLUMNS:
+        _, categories = column_codes(row_counts.df.head(0), column)
+        counts[column] = row_counts.counts(column, **filters).reindex(categories).to_numpy()
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1e6,5e6")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'filters':>8} {'rows left':>10} {'copies (ms)':>12} {'bitmaps (ms)':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            df = data_loader.load_csv(make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}.csv")))
+            index = FilterIndex(df)
+            row_counts = RowCounts(df, index)
+            # Chart bitmaps are built once per column, on first use
+            bitmap_counts(row_counts, {})
+
+            filters = {}
+            for step, (column, value) in enumerate(STEPS, start=1):
+                filters[column] = value
+                expected = copy_counts(df, filters)
+                counts = bitmap_counts(row_counts, filters)
+                assert all(np.array_equal(counts[c], expected[c]) for c in CUBE_COLUMNS), filters
+
+                copies = timeit(lambda: copy_counts(df, filters), args.repeat)
+                # Without the cached masks, every repeat intersects the bitmaps again
+                bitmaps = timeit(lambda: (index._masks.clear(), bitmap_counts(row_counts, filters)), args.repeat)
+
+                print(f"{n_rows:>12,d} {step:>8} {int(expected['Churn'].sum()):>10,d} {copies * 1e3:>12.1f} "
+                      f"{bitmaps * 1e3:>13.1f} {copies / bitmaps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
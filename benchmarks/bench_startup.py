@@ -0,0 +1,160 @@
+# Start up and memory of the Dash app at several dataset sizes
+#   python benchmarks/bench_startup.py --sizes 7043,1e5,1e6
+#
+# Every size runs in a fresh interpreter, results go to benchmarks/results/ as JSON.
+import argparse
+import datetime
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import make_dataset, parse_sizes, REPO_ROOT, CSV_PATH
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# Sidebar values a first visit starts with
+DEFAULT_VALUES = {
+    "contracts-filter.value": "All",
+    "payment-method-filter.value": "All",
+    "churn-filter.value": "All",
+    "theme-toggle.value": "Light",
+}
+
+
+def rss_mb():
+    """Current and peak resident set size of this process, in MB."""
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+
+    return int(status["VmRSS"].split()[0]) / 1024, int(status["VmHWM"].split()[0]) / 1024
+
+
+def render_page(client, pathname):
+    """Seconds to render `pathname` like a browser: the skeleton, then every chart and card."""
+    from dash_client import component_ids
+
+    values = dict(DEFAULT_VALUES, **{"page-url.pathname": pathname})
+
+    start = time.perf_counter()
+    skeleton = client.call(client.find("page-content", "children"), values)
+    children = skeleton["response"]["page-content"]["children"]
+
+    done = set()
+    for component_id in component_ids(children, ("chart", "pie-chart", "kpi-text")):
+        prop = "children" if component_id["type"] == "kpi-text" else "figure"
+        try:
+            dependency = client.find(component_id, prop)
+        except KeyError:
+            continue  # static text, e.g. a card label
+
+        if dependency["output"] not in done:
+            client.call(dependency, values)
+            done.add(dependency["output"])
+
+    return time.perf_counter() - start
+
+
+def measure(csv_path):
+    """Runs inside the child interpreter."""
+    result = {"rss_start_mb": rss_mb()[0]}
+
+    import data_loader
+
+    start = time.perf_counter()
+    data_loader.load_csv(csv_path)
+    result["csv_load_clean_s"] = time.perf_counter() - start
+
+    shutil.rmtree(data_loader.snapshot_root(csv_path), ignore_errors=True)
+    start = time.perf_counter()
+    data_loader.load_dataset(csv_path)
+    result["snapshot_build_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data_loader.load_dataset(csv_path)
+    result["snapshot_load_s"] = time.perf_counter() - start
+
+    gc.collect()
+    start = time.perf_counter()
+    import main
+    result["import_main_s"] = time.perf_counter() - start
+    result["rss_after_import_mb"] = rss_mb()[0]
+
+    start = time.perf_counter()
+    main.encoder.get()
+    result["encoder_load_s"] = time.perf_counter() - start
+
+    from dash_client import DashClient
+
+    client = DashClient(server=main.server)
+    result["first_render_s"] = {name: render_page(client, path) for name, path in main.pages_dict.items()}
+    result["warm_render_s"] = {name: render_page(client, path) for name, path in main.pages_dict.items()}
+
+    gc.collect()
+    result["rss_steady_mb"], result["rss_peak_mb"] = rss_mb()
+
+    return result
+
+
+def run_child(csv_path):
+    env = dict(os.environ, CHURN_DATA_PATH=csv_path)
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--child", csv_path],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="7043,1e5,1e6")
+    parser.add_argument("--output", default=None, help="JSON file, default benchmarks/results/startup-<time>.json")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child)))
+        return
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            csv_path = os.path.join(tmp, f"telco-{n_rows}.csv")
+            if n_rows == 7043:
+                shutil.copy(CSV_PATH, csv_path)
+            else:
+                make_dataset(n_rows, csv_path)
+
+            result = dict(rows=n_rows, **run_child(csv_path))
+            runs.append(result)
+
+            pages = " ".join(f"{name}={t * 1e3:.0f}ms" for name, t in result["first_render_s"].items())
+            print(f"{n_rows:>12,d} rows | import {result['import_main_s']:.2f}s "
+                  f"(csv {result['csv_load_clean_s']:.2f}s, snapshot {result['snapshot_load_s']:.2f}s) | "
+                  f"encoder {result['encoder_load_s']:.3f}s | RSS {result['rss_steady_mb']:.0f} MB | {pages}")
+
+    now = datetime.datetime.now()
+    output = args.output or os.path.join(RESULTS_DIR, f"startup-{now:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"time": now.isoformat(timespec="seconds"), "revision": git_revision(),
+                   "python": sys.version.split()[0], "runs": runs}, f, indent=2)
+
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Loading the dashboard counts from a whole DataFrame vs streaming the CSV chunk by chunk
+#   python benchmarks/bench_streaming.py --sizes 1e5,1e6,5e6 --chunk-rows 200000
+#
+# Each mode runs in a fresh interpreter so its peak RSS is its own.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import make_dataset, parse_sizes
+
+from bench_startup import rss_mb
+
+import config
+import data_loader
+import streaming
+from cube import AggregateCube
+
+
+def load(mode, csv_path, chunk_rows):
+    """Build the cube like main.py does, print seconds, peak RSS and the cube numbers as JSON."""
+    start = time.perf_counter()
+    if mode == "whole":
+        cube = AggregateCube(data_loader.load_csv(csv_path))
+    else:
+        cube = AggregateCube(max_exact_ids=config.STREAMING_EXACT_CUSTOMERS)
+        streaming.stream_dataset(csv_path, [cube], chunk_rows)
+    seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "seconds": seconds,
+        "peak_rss_mb": rss_mb()[1],
+        "counts": {column: counts.tolist() for column, counts in cube.counts_by_column.items()},
+        "customers": cube.kpis()["customers"],
+        "total_charges": cube.total_charges.sum(),
+    }))
+
+
+def run(mode, csv_path, chunk_rows):
+    output = subprocess.run([sys.executable, "-W", "ignore", __file__, "--child", mode, csv_path, str(chunk_rows)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        load(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1e5,1e6")
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'mode':>9} {'seconds':>8} {'peak RSS (MB)':>14}  "
+          f"same counts, customers difference, TotalCharges difference")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in parse_sizes(args.sizes):
+            csv_path = make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}.csv"))
+
+            whole = run("whole", csv_path, args.chunk_rows)
+            stream = run("streaming", csv_path, args.chunk_rows)
+
+            same = whole["counts"] == stream["counts"]
+            # Exact up to STREAMING_EXACT_CUSTOMERS distinct IDs, a sketch estimate (about 1% off) past it
+            customers = abs(stream["customers"] - whole["customers"]) / whole["customers"]
+            difference = abs(stream["total_charges"] - whole["total_charges"]) / whole["total_charges"]
+            for mode, result in [("whole", whole), ("streaming", stream)]:
+                print(f"{n_rows:>12,d} {mode:>9} {result['seconds']:>8.2f} {result['peak_rss_mb']:>14,.0f}", end="")
+                print(f"  {same}, {customers:.2e}, {difference:.2e}" if mode == "streaming" else "")
+
+            exact = whole["customers"] <= config.STREAMING_EXACT_CUSTOMERS
+            assert same and (customers == 0 if exact else customers < 0.03) and np.isfinite(difference)
+            os.remove(csv_path)
+
+
+if __name__ == "__main__":
+    main()
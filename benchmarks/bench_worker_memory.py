@@ -0,0 +1,107 @@
+# Memory of the app under gunicorn: a private copy of the dataset per worker vs one copy shared by all
+#   python benchmarks/bench_worker_memory.py --rows 1e6 --workers 1,4
+#
+# "private" imports the app in every worker and reads the snapshot into each
+# one (no preload, DATASET_MMAP=0), like before gunicorn.conf.py. "shared"
+# uses gunicorn.conf.py: the app is loaded once in the master, the workers
+# are forked from it and the snapshot columns are memory mapped. Memory comes
+# from /proc/<pid>/smaps_rollup after every page was rendered a few times:
+# PSS splits each shared page between the processes mapping it, USS counts
+# the pages only that process has, the real cost of one more worker.
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import REPO_ROOT, make_dataset, parse_sizes
+
+from dash_client import DashClient
+from load_test import PAGES, free_port, render, wait_until_up
+
+import data_loader
+
+
+def smaps_rollup(pid):
+    """(RSS, PSS, USS) of process `pid`, in MB."""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        # The first line is the address range of the rollup
+        kb = {name: int(value.split()[0]) for name, value in (line.split(":", 1) for line in f.readlines()[1:])}
+
+    return kb["Rss"] / 1024, kb["Pss"] / 1024, (kb["Private_Clean"] + kb["Private_Dirty"]) / 1024
+
+
+def worker_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(i) for i in f.read().split()]
+
+
+def start_app(mode, workers, csv_path, config_path):
+    port = free_port()
+    env = dict(os.environ, CHURN_DATA_PATH=csv_path, PREDICTOR_BACKEND="local")
+    if mode == "private":
+        env.update(DATASET_MMAP="0", PRELOAD_MODEL="0")
+
+    command = [sys.executable, "-m", "gunicorn", "main:server", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+               "--timeout", "300", "--log-level", "warning"]
+    if mode == "private":
+        command += ["-c", config_path]
+
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_up(process, lambda: DashClient(base_url))
+    return process, base_url
+
+
+def measure(mode, workers, csv_path, config_path, renders):
+    process, base_url = start_app(mode, workers, csv_path, config_path)
+    try:
+        pids = worker_pids(process.pid)
+        client = DashClient(base_url)
+        for _ in range(renders * workers):
+            for pathname in PAGES:
+                render(client, pathname)
+
+        master = smaps_rollup(process.pid)
+        per_worker = [smaps_rollup(pid) for pid in pids]
+    finally:
+        process.terminate()
+        process.wait()
+
+    return master, per_worker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="1e6", help="dataset sizes, one run per value")
+    parser.add_argument("--workers", default="1,4", help="gunicorn workers, one run per value")
+    parser.add_argument("--renders", type=int, default=3, help="renders of every page per worker")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'mode':>8} {'workers':>8} {'master PSS':>11} {'total PSS':>10} "
+          f"{'worker RSS':>11} {'worker USS':>11} {'+1 worker':>10}  (MB)")
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, "private.conf.py")
+        with open(config_path, "w") as f:
+            f.write("preload_app = False\n")
+
+        for n_rows in parse_sizes(args.rows):
+            csv_path = make_dataset(n_rows, os.path.join(tmp, f"telco-{n_rows}.csv"))
+            # Build the snapshot up front, the workers of the private mode would race to build it
+            data_loader.build_snapshot(data_loader.load_csv(csv_path), csv_path)
+
+            for mode in ["private", "shared"]:
+                totals = {}
+                for workers in [int(i) for i in args.workers.split(",")]:
+                    master, per_worker = measure(mode, workers, csv_path, config_path, args.renders)
+                    totals[workers] = master[1] + sum(pss for _, pss, _ in per_worker)
+
+                    first = min(totals)
+                    extra = (totals[workers] - totals[first]) / (workers - first) if workers != first else float("nan")
+                    print(f"{n_rows:>10,d} {mode:>8} {workers:>8} {master[1]:>11,.0f} {totals[workers]:>10,.0f} "
+                          f"{max(rss for rss, _, _ in per_worker):>11,.0f} "
+                          f"{max(uss for _, _, uss in per_worker):>11,.0f} {extra:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
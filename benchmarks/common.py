@@ -0,0 +1,33 @@
+# Shared helpers for the benchmark scripts, run them from the repo root:
+#   python benchmarks/<script>.py
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+CSV_PATH = os.path.join(REPO_ROOT, "Telco-Customer-Churn.csv")
+
+import synthetic  # noqa: E402
+
+
+def make_dataset(n_rows, path, seed=0):
+    """Write an `n_rows` CSV in the Telco schema, drawn from distributions learned from the shipped rows."""
+    return synthetic.write_csv(synthetic.SyntheticTelco.fit(CSV_PATH), path, n_rows, seed=seed)
+
+
+def timeit(func, repeat=5):
+    """Best wall time of `repeat` calls to `func`, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def parse_sizes(text):
+    return [int(float(i)) for i in text.split(",")]
@@ -0,0 +1,96 @@
+# Drive Dash callbacks over HTTP the way the browser does, against a running
+# server (base_url) or in process through the Flask test client (server).
+import json
+
+
+def parse_output(key):
+    """[(component id, property)] of a callback output key from /_dash-dependencies."""
+    parts = key[2:-2].split("...") if key.startswith("..") else [key]
+
+    outputs = []
+    for part in parts:
+        component_id, prop = part.rsplit(".", 1)
+        if component_id.startswith("{"):
+            component_id = json.loads(component_id)
+        outputs.append((component_id, prop.split("@")[0]))
+
+    return outputs
+
+
+class DashClient:
+    def __init__(self, base_url=None, server=None, timeout=60):
+        if server is not None:
+            client = server.test_client()
+            self._get = lambda path: client.get(path).get_json()
+            self._post = lambda path, body: _flask_post(client, path, body)
+        else:
+            import requests
+
+            session = requests.Session()
+            self._get = lambda path: session.get(base_url + path, timeout=timeout).json()
+            self._post = lambda path, body: _requests_post(session, base_url + path, body, timeout)
+
+        self.dependencies = self._get("/_dash-dependencies")
+
+    def find(self, component_id, prop):
+        """The callback that outputs `prop` of `component_id`."""
+        for dependency in self.dependencies:
+            if (component_id, prop) in parse_output(dependency["output"]):
+                return dependency
+
+        raise KeyError(f"No callback outputs {component_id}.{prop}")
+
+    def call(self, dependency, values, changed=None):
+        """Run one callback, `values` maps "component_id.property" to the current value.
+
+        `changed` lists the "component_id.property" inputs that triggered the
+        call, all of them by default.
+        """
+        outputs = [{"id": i, "property": p} for i, p in parse_output(dependency["output"])]
+
+        def current(items):
+            return [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in items]
+
+        inputs = current(dependency["inputs"])
+        body = {
+            "output": dependency["output"],
+            "outputs": outputs if len(outputs) > 1 else outputs[0],
+            "inputs": inputs,
+            "changedPropIds": changed or [f"{i['id']}.{i['property']}" for i in inputs],
+            "state": current(dependency["state"]),
+        }
+
+        status, response = self._post("/_dash-update-component", body)
+        if status != 200:
+            raise RuntimeError(f"{dependency['output']} returned HTTP {status}")
+
+        return response
+
+
+def _flask_post(client, path, body):
+    response = client.post(path, json=body)
+    return response.status_code, response.get_json()
+
+
+def _requests_post(session, url, body, timeout):
+    response = session.post(url, json=body, timeout=timeout)
+    return response.status_code, response.json() if response.status_code == 200 else None
+
+
+def component_ids(tree, types):
+    """Pattern-matching ids in a serialized layout whose type is in `types`."""
+    found = []
+    if isinstance(tree, dict):
+        props = tree.get("props", {})
+        component_id = props.get("id")
+        if isinstance(component_id, dict) and component_id.get("type") in types:
+            found.append(component_id)
+
+        for value in props.values():
+            found.extend(component_ids(value, types))
+
+    elif isinstance(tree, list):
+        for item in tree:
+            found.extend(component_ids(item, types))
+
+    return found
@@ -0,0 +1,67 @@
+# Import time breakdown of main.py, based on `python -X importtime`
+#   python benchmarks/import_time.py --top 15 --target-ms 1500
+import argparse
+import json
+import subprocess
+import sys
+
+from common import REPO_ROOT
+
+
+def import_times(module="main", env=None):
+    """[(package, self_us, cumulative_us, depth)] in import order."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+
+    return rows
+
+
+def breakdown(rows, module="main"):
+    total_us = next(cumulative for name, _, cumulative, depth in rows if name == module and depth == 0)
+
+    # Direct imports of `module` are one level deeper than it
+    direct = [(name, cumulative) for name, _, cumulative, depth in rows if depth == 1]
+    direct.sort(key=lambda row: row[1], reverse=True)
+
+    return total_us, direct
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--target-ms", type=float, default=None,
+                        help="exit with status 1 when the import takes longer")
+    parser.add_argument("--json", default=None, help="also write the breakdown to this file")
+    args = parser.parse_args()
+
+    total_us, direct = breakdown(import_times(args.module), args.module)
+
+    print(f"import {args.module}: {total_us / 1e3:,.0f} ms")
+    print(f"{'cumulative (ms)':>16} {'share':>6}  package")
+    for name, cumulative in direct[:args.top]:
+        print(f"{cumulative / 1e3:>16,.1f} {cumulative / total_us:>6.0%}  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"module": args.module, "total_ms": total_us / 1e3,
+                       "packages": {name: cumulative / 1e3 for name, cumulative in direct}}, f, indent=2)
+
+    if args.target_ms is not None and total_us / 1e3 > args.target_ms:
+        print(f"over the {args.target_ms:,.0f} ms target", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
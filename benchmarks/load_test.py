@@ -0,0 +1,194 @@
+# Dashboard latency while prediction traffic saturates a slow prediction API
+#   python benchmarks/load_test.py --workers 2 --api-latency 2 --prediction-users 16
+#
+# Starts local_server.py answering after --api-latency seconds and the app
+# under gunicorn pointed at it (or uses --base-url), then renders dashboard
+# pages with and without concurrent predictions. --blocking waits for every
+# prediction inside the request, like the app did before the prediction jobs,
+# for comparison.
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from common import REPO_ROOT
+
+from bench_startup import DEFAULT_VALUES
+from dash_client import DashClient, component_ids
+
+PAGES = ["/", "/InternetServices", "/OtherServices"]
+
+# Prediction form, tenure and charges are randomized so the prediction cache does not answer
+FORM = {
+    "gender.value": "Male", "is-senior.value": 0, "partner.value": 1, "dependents.value": 0, "tenure.value": 15,
+    "phone-services.value": 1, "internet-services.value": "DSL", "contract.value": "One year",
+    "payment-method.value": "Mailed check", "monthly-charges.value": 50, "total-charges.value": 500,
+    "submit-button.n_clicks": 1, "prediction-poll.n_intervals": 0, "cancel-button.n_clicks": 0,
+    "prediction-job.data": None,
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(process, check):
+    for _ in range(600):
+        try:
+            return check()
+        except Exception:
+            if process.poll() is not None:
+                raise RuntimeError(f"{process.args} exited with status {process.returncode}")
+            time.sleep(0.1)
+
+    process.kill()
+    raise RuntimeError(f"{process.args} did not start")
+
+
+def start_stand_in(latency_ms, jitter_ms=0.0, error_rate=0.0):
+    """local_server.py in its own process, returns (process, prediction URL)."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "local_server.py", "--port", str(port), "--latency-ms", str(latency_ms),
+         "--jitter-ms", str(jitter_ms), "--error-rate", str(error_rate), "--seed", "0"],
+        cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_up(process, lambda: urllib.request.urlopen(base_url + "/stats", timeout=1).read())
+    return process, base_url + "/churn_prediction"
+
+
+def start_app(workers, api_url, blocking):
+    port = free_port()
+    # Failed API calls show up as failures instead of answers of the local fallback model
+    env = dict(os.environ, PREDICTION_URL=api_url, PREDICTOR_BACKEND="remote", PREDICTION_RETRIES="0",
+               PREDICTION_FALLBACK_BACKEND="")
+    if blocking:
+        env["PREDICTION_INLINE_WAIT"] = "60"
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:server", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+         "--timeout", "120", "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env,
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_up(process, lambda: DashClient(base_url))
+    return process, base_url
+
+
+def render(client, pathname):
+    """Seconds to render a page: the skeleton, then every chart and card callback."""
+    values = dict(DEFAULT_VALUES, **{"page-url.pathname": pathname})
+
+    start = time.perf_counter()
+    skeleton = client.call(client.find("page-content", "children"), values)
+    for component_id in component_ids(skeleton["response"]["page-content"]["children"], ("chart", "pie-chart")):
+        client.call(client.find(component_id, "figure"), values)
+
+    return time.perf_counter() - start
+
+
+def predict(client, dependency, rng, poll_seconds):
+    """Seconds until a prediction is shown, submit then poll like the page does."""
+    values = dict(FORM, **{"tenure.value": rng.randint(0, 72), "monthly-charges.value": rng.uniform(18, 120)})
+
+    start = time.perf_counter()
+    response = client.call(dependency, values, changed=["submit-button.n_clicks"])["response"]
+    while response.get("prediction-job", {}).get("data"):
+        time.sleep(poll_seconds)
+        values["prediction-job.data"] = response["prediction-job"]["data"]
+        response = client.call(dependency, values, changed=["prediction-poll.n_intervals"])["response"]
+
+    return time.perf_counter() - start, response["output-div"]["children"]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return "no samples"
+
+    def pick(q):
+        return samples[min(int(q * len(samples)), len(samples) - 1)] * 1e3
+
+    return f"p50 {pick(0.5):>7,.0f} ms  p95 {pick(0.95):>7,.0f} ms  p99 {pick(0.99):>7,.0f} ms  (n={len(samples)})"
+
+
+def run_phase(base_url, seconds, dashboard_users, prediction_users, poll_seconds):
+    stop = time.perf_counter() + seconds
+    pages, predictions, failures = [], [], []
+
+    def dashboard_user(i):
+        client = DashClient(base_url, timeout=120)
+        while time.perf_counter() < stop:
+            pages.append(render(client, PAGES[i % len(PAGES)]))
+            i += 1
+
+    def prediction_user(i):
+        client = DashClient(base_url, timeout=120)
+        dependency = client.find("output-div", "children")
+        rng = random.Random(i)
+        while time.perf_counter() < stop:
+            seconds_taken, text = predict(client, dependency, rng, poll_seconds)
+            (predictions if "Customer" in text else failures).append(seconds_taken)
+
+    threads = [threading.Thread(target=dashboard_user, args=(i,)) for i in range(dashboard_users)]
+    threads += [threading.Thread(target=prediction_user, args=(i,)) for i in range(prediction_users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return pages, predictions, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=None, help="test a running app instead of starting one")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn sync workers")
+    parser.add_argument("--api-latency", type=float, default=2.0, help="seconds the stand-in API takes")
+    parser.add_argument("--dashboard-users", type=int, default=2)
+    parser.add_argument("--prediction-users", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--poll-ms", type=int, default=250)
+    parser.add_argument("--blocking", action="store_true", help="wait for predictions inside the request")
+    args = parser.parse_args()
+
+    processes = []
+    base_url = args.base_url
+    if base_url is None:
+        stand_in, api_url = start_stand_in(args.api_latency * 1e3)
+        processes.append(stand_in)
+        app, base_url = start_app(args.workers, api_url, args.blocking)
+        processes.append(app)
+
+    try:
+        # Warm the figure caches of every worker first
+        run_phase(base_url, 3, args.workers * 2, 0, args.poll_ms / 1e3)
+
+        mode = "blocking" if args.blocking else "background jobs"
+        print(f"{args.workers} workers, API latency {args.api_latency:.1f}s, predictions as {mode}")
+
+        pages, _, _ = run_phase(base_url, args.seconds, args.dashboard_users, 0, args.poll_ms / 1e3)
+        print(f"dashboard alone          : {percentiles(pages)}")
+
+        pages, predictions, failures = run_phase(base_url, args.seconds, args.dashboard_users,
+                                                 args.prediction_users, args.poll_ms / 1e3)
+        print(f"dashboard + {args.prediction_users:>3} predicting: {percentiles(pages)}")
+        print(f"predictions              : {percentiles(predictions)}, {len(failures)} rejected or failed")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
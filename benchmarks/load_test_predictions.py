@@ -0,0 +1,72 @@
+# Throughput and latency of the prediction callback at N concurrent users
+#   python benchmarks/load_test_predictions.py --users 1,8,32 --latency-ms 200 --error-rate 0.02
+#
+# Starts local_server.py with the given latency and error rate and the app
+# under gunicorn pointed at it (or uses --base-url), then every user submits
+# a customer profile and polls until the answer is shown, over and over.
+import argparse
+import random
+import threading
+import time
+
+from dash_client import DashClient
+from load_test import percentiles, predict, start_app, start_stand_in
+
+
+def run(base_url, users, seconds, poll_seconds):
+    stop = time.perf_counter() + seconds
+    latencies, failures = [], []
+
+    def user(i):
+        client = DashClient(base_url, timeout=120)
+        dependency = client.find("output-div", "children")
+        rng = random.Random(i)
+        while time.perf_counter() < stop:
+            seconds_taken, text = predict(client, dependency, rng, poll_seconds)
+            (latencies if "Customer" in text else failures).append(seconds_taken)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return latencies, failures, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=None, help="test a running app instead of starting one")
+    parser.add_argument("--users", default="1,8,32", help="concurrent users, one run per value")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn sync workers")
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--poll-ms", type=int, default=250)
+    args = parser.parse_args()
+
+    processes = []
+    base_url = args.base_url
+    if base_url is None:
+        stand_in, api_url = start_stand_in(args.latency_ms, args.jitter_ms, args.error_rate)
+        processes.append(stand_in)
+        app, base_url = start_app(args.workers, api_url, blocking=False)
+        processes.append(app)
+
+    try:
+        print(f"API latency {args.latency_ms:.0f} ± {args.jitter_ms:.0f} ms, error rate {args.error_rate:.0%}")
+        print(f"{'users':>6} {'done':>6} {'failed':>7} {'per second':>11}  latency")
+        for users in [int(i) for i in args.users.split(",")]:
+            latencies, failures, elapsed = run(base_url, users, args.seconds, args.poll_ms / 1e3)
+            print(f"{users:>6} {len(latencies):>6} {len(failures):>7} {len(latencies) / elapsed:>11.1f}  "
+                  f"{percentiles(latencies)}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Importing Toolkits
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread safe least-recently-used cache bounded by entries and by bytes.
+
+    `sizeof` gives the cost of a value in bytes, it is only called once when
+    the value is stored. With `ttl` (seconds) entries also expire that long
+    after they were stored. Hits, misses and evictions are counted for `stats()`.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=None, sizeof=None, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.ttl = ttl
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+
+            value, size, expires = self._entries[key]
+            if expires is not None and self.clock() >= expires:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+
+        # A single value bigger than the whole budget is never stored
+        if self.max_bytes is not None and size > self.max_bytes:
+            return value
+
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (value, size, expires)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+        return value
+
+    def get_or_create(self, key, factory):
+        """Cached value for `key`, `factory()` is called (outside the lock) on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, factory())
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "ttl": self.ttl,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
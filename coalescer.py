@@ -0,0 +1,120 @@
+# Micro-batching of concurrent predictions into one call to a batch-capable backend
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class Coalescer:
+    """Groups items submitted from many threads and hands them to `handler` as one list.
+
+    A batch closes `window` seconds after its first item arrives or once it
+    holds `max_batch` items, whichever comes first. `handler` gets the list of
+    items and returns one result per item, in order; the results (or the
+    exception it raised) go back to each caller's `Future`. Up to
+    `concurrency` batches are in flight at once, so a slow batch does not hold
+    up the next one.
+    """
+
+    def __init__(self, handler, window=0.005, max_batch=32, concurrency=4):
+        self.handler = handler
+        self.window = window
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="coalescer")
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.errors = 0
+
+    def submit(self, item):
+        """`Future` of the result of `item`."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._collect, name="coalescer", daemon=True)
+                    self._thread.start()
+
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        with self._lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+        try:
+            results = self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"{len(results)} results for a batch of {len(batch)}")
+        except Exception as error:
+            with self._lock:
+                self.errors += 1
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                window_ms=self.window * 1e3,
+                max_batch=self.max_batch,
+                requests=self.requests,
+                batches=self.batches,
+                mean_batch=self.requests / self.batches if self.batches else None,
+                largest_batch=self.largest_batch,
+                batch_errors=self.errors,
+                pending=self._queue.qsize(),
+            )
+
+
+class CoalescingPredictor:
+    """A predictor whose `predict` calls from every thread share `predict_many` calls of `predictor`.
+
+    Same name and version as the wrapped predictor, so cached predictions
+    stay valid when coalescing is turned on or off.
+    """
+
+    def __init__(self, predictor, window=0.005, max_batch=32, concurrency=4):
+        self.predictor = predictor
+        self.name = predictor.name
+        self.version = predictor.version
+        self.coalescer = Coalescer(predictor.predict_many, window, max_batch, concurrency)
+
+    def predict(self, features):
+        return self.coalescer.submit(features).result()
+
+    def predict_many(self, features_list):
+        return self.predictor.predict_many(features_list)
+
+    def predict_batch(self, X):
+        return self.predictor.predict_batch(X)
+
+    def stats(self):
+        return dict(self.predictor.stats(), coalescing=self.coalescer.stats())
@@ -0,0 +1,91 @@
+# Runtime settings, every value can be overridden with an environment variable
+import os
+import tempfile
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def env_str(name, default):
+    return os.environ.get(name, default)
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# ----------- Dataset -----------
+DATA_PATH = env_str("CHURN_DATA_PATH", "Telco-Customer-Churn.csv")
+# Map the snapshot columns read only instead of reading them, every worker then shares one copy (see data_loader.py)
+DATASET_MMAP = env_bool("DATASET_MMAP", True)
+# Count the dataset chunk by chunk instead of loading it whole, for files larger than memory (see streaming.py)
+STREAMING_INGEST = env_bool("STREAMING_INGEST", False)
+STREAMING_CHUNK_ROWS = env_int("STREAMING_CHUNK_ROWS", 200_000)
+# Distinct customers of a streamed file are counted exactly up to this many, estimated past it (bounded memory)
+STREAMING_EXACT_CUSTOMERS = env_int("STREAMING_EXACT_CUSTOMERS", 1_000_000)
+# "pandas" counts the charts in memory, "sql" queries an SQLite database built from the CSV (see sql_backend.py)
+DATA_BACKEND = env_str("DATA_BACKEND", "pandas")
+# Seconds between checks of DATA_PATH for appended rows or a new file, picked up without a restart (0 = off)
+DATA_RELOAD_INTERVAL = env_float("DATA_RELOAD_INTERVAL", 0)
+
+# ----------- Figure Cache -----------
+FIGURE_CACHE_MAX_ENTRIES = env_int("FIGURE_CACHE_MAX_ENTRIES", 512)
+FIGURE_CACHE_MAX_BYTES = env_int("FIGURE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# ----------- Start Up -----------
+# Load the feature encoder at import instead of on the first prediction
+PRELOAD_MODEL = env_bool("PRELOAD_MODEL", False)
+
+# ----------- Prediction -----------
+# transformer.pkl exported by scripts/export_encoder.py
+ENCODER_PATH = env_str("ENCODER_PATH", "encoder.json")
+# "remote" calls the API below, "local" runs LOCAL_MODEL_PATH in process
+PREDICTOR_BACKEND = env_str("PREDICTOR_BACKEND", "remote")
+LOCAL_MODEL_PATH = env_str("LOCAL_MODEL_PATH", "local_model.npz")
+# Backend of the CSV upload on the prediction page, thousands of rows at a time
+BATCH_PREDICTOR_BACKEND = env_str("BATCH_PREDICTOR_BACKEND", "local")
+
+# ----------- Prediction Cache -----------
+# Answers for recently submitted profiles, TTL in seconds (0 keeps them until evicted)
+PREDICTION_CACHE_MAX_ENTRIES = env_int("PREDICTION_CACHE_MAX_ENTRIES", 4096)
+PREDICTION_CACHE_TTL = env_float("PREDICTION_CACHE_TTL", 3600)
+
+# ----------- Prediction Jobs -----------
+# Predictions run on PREDICTION_WORKERS threads per process, PREDICTION_QUEUE_SIZE more may wait,
+# the page polls every PREDICTION_POLL_MS and the first PREDICTION_INLINE_WAIT seconds are awaited inline
+PREDICTION_WORKERS = env_int("PREDICTION_WORKERS", 8)
+PREDICTION_QUEUE_SIZE = env_int("PREDICTION_QUEUE_SIZE", 32)
+PREDICTION_POLL_MS = env_int("PREDICTION_POLL_MS", 250)
+PREDICTION_INLINE_WAIT = env_float("PREDICTION_INLINE_WAIT", 0.05)
+# Job state shared by every worker process
+PREDICTION_JOBS_DIR = env_str("PREDICTION_JOBS_DIR", os.path.join(tempfile.gettempdir(), "churn-prediction-jobs"))
+# A queued or running job its worker has not touched for this long failed with it
+PREDICTION_JOB_HEARTBEAT = env_float("PREDICTION_JOB_HEARTBEAT", 30)
+
+# ----------- Prediction API -----------
+PREDICTION_URL = env_str("PREDICTION_URL", "https://modyehab810-customer-churn-api.hf.space/churn_prediction")
+PREDICTION_POOL_SIZE = env_int("PREDICTION_POOL_SIZE", 10)
+PREDICTION_CONNECT_TIMEOUT = env_float("PREDICTION_CONNECT_TIMEOUT", 3.05)
+PREDICTION_READ_TIMEOUT = env_float("PREDICTION_READ_TIMEOUT", 10)
+PREDICTION_RETRIES = env_int("PREDICTION_RETRIES", 2)
+PREDICTION_BACKOFF = env_float("PREDICTION_BACKOFF", 0.3)
+# Batch endpoint of the API, concurrent predictions are coalesced into one call when set
+PREDICTION_BATCH_URL = env_str("PREDICTION_BATCH_URL", "")
+PREDICTION_BATCH_WINDOW_MS = env_float("PREDICTION_BATCH_WINDOW_MS", 5)
+PREDICTION_BATCH_SIZE = env_int("PREDICTION_BATCH_SIZE", 32)
+
+# ----------- Prediction Fallback -----------
+# An API call gets PREDICTION_BUDGET seconds, PREDICTION_BREAKER_FAILURES failures in a row stop calling it
+# for PREDICTION_BREAKER_RESET seconds and meanwhile PREDICTION_FALLBACK_BACKEND answers ("" to show an error)
+PREDICTION_BUDGET = env_float("PREDICTION_BUDGET", 5)
+PREDICTION_BREAKER_FAILURES = env_int("PREDICTION_BREAKER_FAILURES", 5)
+PREDICTION_BREAKER_RESET = env_float("PREDICTION_BREAKER_RESET", 30)
+PREDICTION_FALLBACK_BACKEND = env_str("PREDICTION_FALLBACK_BACKEND", "local")
+# API calls (batches when coalescing) pending at once per process, past their budget or not,
+# more fall back right away. Not the connection pool size, a call may wait for a connection.
+PREDICTION_MAX_PENDING = env_int("PREDICTION_MAX_PENDING", 16)
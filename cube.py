@@ -0,0 +1,247 @@
+# Importing Toolkits
+import copy
+
+import numpy as np
+import pandas as pd
+
+from filter_index import FILTER_COLUMNS, append_bits, popcount, selected
+from streaming import DistinctSketch
+
+# Every column a dashboard chart counts
+CUBE_COLUMNS = (
+    "gender", "SeniorCitizen", "Dependents", "PhoneService", "Churn", "tenure",
+    "OnlineBackup", "OnlineSecurity", "InternetService", "DeviceProtection",
+    "TechSupport", "StreamingTV", "PaperlessBilling", "PaymentMethod",
+)
+
+# Customer life time buckets of the tenure chart, upper edges are inclusive
+TENURE_EDGES = [12, 24, 36, 48, 60, 72]
+TENURE_LABELS = ["0-12 Months", "13-24 Months", "25-36 Months",
+                 "37-48 Months", "49-60 Months", "61-72 Months"]
+
+SENIOR_CATEGORIES = [0, 1]
+
+
+def column_codes(df, column):
+    """Integer codes and their labels for one cube column, -1 means 'not counted'."""
+    values = df[column]
+
+    if column == "tenure":
+        tenure = values.to_numpy()
+        codes = np.searchsorted(TENURE_EDGES, tenure, side="left")
+        codes[(tenure < 0) | (codes == len(TENURE_EDGES))] = -1
+        return codes, TENURE_LABELS
+
+    if column == "SeniorCitizen":
+        codes = values.to_numpy().astype(np.int64)
+        codes[~np.isin(codes, SENIOR_CATEGORIES)] = -1
+        return codes, SENIOR_CATEGORIES
+
+    return values.cat.codes.to_numpy().astype(np.int64), values.cat.categories.tolist()
+
+
+class AggregateCube:
+    """Customer counts keyed by (Contract, PaymentMethod, Churn) x column x category.
+
+    Built with one bincount per column over the combined filter key, so every
+    chart and KPI card becomes a slice + sum over a few dozen cells, however
+    many customers the dataset holds. `update` adds more rows, so a file can
+    also be counted one chunk at a time (see streaming.py).
+
+    Distinct customers are counted exactly, which keeps a hash of every
+    customerID. With `max_exact_ids` that stops past so many IDs: the KPI
+    then comes from a DistinctSketch per cell, kept from the start, and
+    memory stays bounded whatever the file size.
+    """
+
+    def __init__(self, df=None, keys=FILTER_COLUMNS, columns=CUBE_COLUMNS, max_exact_ids=None):
+        self.keys = keys
+        self.columns = columns
+        self.key_categories = None
+        self.categories = {}
+        self.counts_by_column = {}
+        self.customers = None
+        self.total_charges = None
+        self.max_exact_ids = max_exact_ids
+        # Sorted 64-bit hashes of every customerID counted so far, for the distinct customer KPI,
+        # None once there were more than max_exact_ids
+        self._seen_ids = np.empty(0, dtype=np.uint64)
+        self._sketch = None
+
+        if df is not None:
+            self.update(df)
+
+    def copy(self):
+        """Independent cube with the same counts, `update` on it leaves this one alone."""
+        cube = copy.copy(self)
+        cube.counts_by_column = {column: counts.copy() for column, counts in self.counts_by_column.items()}
+        if self.customers is not None:
+            cube.customers = self.customers.copy()
+            cube.total_charges = self.total_charges.copy()
+        if self._sketch is not None:
+            cube._sketch = self._sketch.copy()
+        # _seen_ids is replaced by update, never written to, both cubes can share it
+        return cube
+
+    def _allocate(self, df):
+        self.key_categories = [df[k].cat.categories.tolist() for k in self.keys]
+        self.shape = tuple(len(c) for c in self.key_categories)
+
+        for column in self.columns:
+            _, categories = column_codes(df.head(0), column)
+            self.categories[column] = categories
+            self.counts_by_column[column] = np.zeros(self.shape + (len(categories),), dtype=np.int64)
+
+        self.customers = np.zeros(self.shape, dtype=np.int64)
+        self.total_charges = np.zeros(self.shape, dtype=np.float64)
+        if self.max_exact_ids is not None:
+            self._sketch = DistinctSketch(int(np.prod(self.shape)))
+
+    def update(self, df):
+        """Add the rows of `df` (cleaned, see data_loader.py) to every count."""
+        if self.key_categories is None:
+            self._allocate(df)
+        elif [df[k].cat.categories.tolist() for k in self.keys] != self.key_categories:
+            raise ValueError("Rows with other filter categories than the cube")
+
+        key_codes = [df[k].cat.codes.to_numpy().astype(np.int64) for k in self.keys]
+        valid = np.logical_and.reduce([c >= 0 for c in key_codes])
+        cell = np.ravel_multi_index([np.where(valid, c, 0) for c in key_codes], self.shape)
+        n_cells = int(np.prod(self.shape))
+
+        for column in self.columns:
+            codes, categories = column_codes(df, column)
+            if categories != self.categories[column]:
+                raise ValueError(f"Rows with other {column} categories than the cube")
+
+            keep = valid & (codes >= 0)
+            n_categories = len(categories)
+
+            counts = np.bincount(cell[keep] * n_categories + codes[keep], minlength=n_cells * n_categories)
+            self.counts_by_column[column] += counts.reshape(self.shape + (n_categories,))
+
+        # KPI cards: distinct customers, summed charges and churned customers
+        ids = pd.util.hash_array(df["customerID"].to_numpy(dtype=object), categorize=False)
+        if self._sketch is not None:
+            self._sketch.update(cell[valid], ids[valid])
+
+        if self._seen_ids is not None:
+            first_seen = ~pd.Series(ids).duplicated().to_numpy()
+            if len(self._seen_ids):
+                first_seen &= self._seen_ids[np.minimum(np.searchsorted(self._seen_ids, ids),
+                                                        len(self._seen_ids) - 1)] != ids
+            self._seen_ids = np.union1d(self._seen_ids, ids[first_seen])
+            self.customers += np.bincount(cell[valid & first_seen], minlength=n_cells).reshape(self.shape)
+
+            if self.max_exact_ids is not None and len(self._seen_ids) > self.max_exact_ids:
+                self._seen_ids = None
+
+        self.total_charges += np.bincount(cell[valid], weights=df["TotalCharges"].to_numpy()[valid],
+                                          minlength=n_cells).reshape(self.shape)
+
+    def _select(self, array, filters):
+        """`array` cut down to the cells of `filters`, a filter with several values keeps all of theirs."""
+        for axis, (key, categories) in enumerate(zip(self.keys, self.key_categories)):
+            values = selected(filters.get(key, "All"))
+            if values is not None:
+                array = array.take([categories.index(v) for v in values if v in categories], axis=axis)
+
+        return array
+
+    def counts(self, column, **filters):
+        """Same numbers as df[column].value_counts() under `filters`."""
+        cells = self._select(self.counts_by_column[column], filters)
+        counts = cells.reshape(-1, cells.shape[-1]).sum(axis=0)
+
+        counts = pd.Series(counts, index=pd.Index(self.categories[column], name=column), name="count")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def kpis(self, **filters):
+        churn = self._select(self.counts_by_column["Churn"], filters)
+        churned = churn.reshape(-1, churn.shape[-1])[:, self.categories["Churn"].index("Yes")].sum()
+
+        if self._seen_ids is None:
+            cells = self._select(np.arange(self.customers.size).reshape(self.shape), filters)
+            customers = self._sketch.count(cells.ravel())
+        else:
+            customers = int(self._select(self.customers, filters).sum())
+
+        return {
+            "customers": customers,
+            "rows": int(churn.sum()),
+            "total_charges": float(self._select(self.total_charges, filters).sum()),
+            "churned": int(churned),
+        }
+
+
+class RowCounts:
+    """AggregateCube's `counts` and `kpis` from the rows, for filters the cube has no axis for.
+
+    The tenure and MonthlyCharges range sliders can cut anywhere, so their
+    counts come from a FilterIndex mask instead: each chart category is a
+    packed bitmap too, and its count the popcount of (mask AND bitmap). The
+    work per chart is a few passes over n / 8 bytes whatever the filters.
+    """
+
+    def __init__(self, df, index, keys=FILTER_COLUMNS):
+        self.df = df
+        self.index = index
+        self.keys = keys
+        self._bitmaps = {}
+
+        # Rows the cube counts: every filter key known
+        self._valid = np.packbits(np.logical_and.reduce([df[k].cat.codes.to_numpy() >= 0 for k in keys]))
+        self._first_seen = None
+
+    def extended(self, df, rows, index):
+        """Counts of `df`, the counted frame with `rows` appended, over `index` (this index, extended).
+
+        The chart bitmaps built so far get the new rows' bits, the first
+        appearances are worked out again on first use.
+        """
+        row_counts = RowCounts(df.head(0), index, self.keys)
+        row_counts.df = df
+        row_counts._valid = append_bits(self._valid, len(self.df),
+                                        np.logical_and.reduce([rows[k].cat.codes.to_numpy() >= 0 for k in self.keys]))
+
+        for column, (bitmaps, categories) in self._bitmaps.items():
+            codes, _ = column_codes(rows, column)
+            row_counts._bitmaps[column] = ([append_bits(bitmap, len(self.df), codes == code)
+                                            for code, bitmap in enumerate(bitmaps)], categories)
+
+        return row_counts
+
+    def _column(self, column):
+        if column not in self._bitmaps:
+            codes, categories = column_codes(self.df, column)
+            self._bitmaps[column] = (self.index.code_bitmaps(codes, len(categories)), categories)
+
+        return self._bitmaps[column]
+
+    def _mask(self, filters):
+        mask = self.index.mask(**filters)
+        return self._valid if mask is None else mask & self._valid
+
+    def counts(self, column, **filters):
+        """Same numbers as df[column].value_counts() under `filters`."""
+        mask = self._mask(filters)
+        bitmaps, categories = self._column(column)
+        counts = np.array([popcount(mask & bitmap) for bitmap in bitmaps], dtype=np.int64)
+
+        counts = pd.Series(counts, index=pd.Index(categories, name=column), name="count")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def kpis(self, **filters):
+        if self._first_seen is None:
+            # Duplicated customerIDs count once, where they first appear, like the cube
+            self._first_seen = np.packbits(~self.df["customerID"].duplicated().to_numpy())
+
+        mask = self._mask(filters)
+        churn, categories = self._column("Churn")
+
+        return {
+            "customers": popcount(mask & self._first_seen),
+            "rows": sum(popcount(mask & bitmap) for bitmap in churn),
+            "total_charges": float(self.df["TotalCharges"].to_numpy()[self.index.rows(mask)].sum()),
+            "churned": popcount(mask & churn[categories.index("Yes")]),
+        }
@@ -0,0 +1,430 @@
+# Importing Toolkits
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the cleaning steps or the on-disk layout change,
+# old snapshots are then ignored and rebuilt from the CSV.
+SNAPSHOT_VERSION = 4
+
+YES_NO = ["No", "Yes"]
+
+# ---------------------- Schema ----------------------
+# Every low cardinality column is held as a pandas Categorical with this fixed
+# dictionary, so filters and value_counts compare small integer codes instead
+# of Python strings, and the codes mean the same thing in every worker.
+CATEGORIES = {
+    "gender": ["Female", "Male"],
+    "Partner": YES_NO,
+    "Dependents": YES_NO,
+    "PhoneService": YES_NO,
+    "MultipleLines": YES_NO,
+    "InternetService": ["DSL", "Fiber optic", "No"],
+    "OnlineSecurity": YES_NO,
+    "OnlineBackup": YES_NO,
+    "DeviceProtection": YES_NO,
+    "TechSupport": YES_NO,
+    "StreamingTV": YES_NO,
+    "StreamingMovies": YES_NO,
+    "Contract": ["Month-to-month", "One year", "Two year"],
+    "PaperlessBilling": YES_NO,
+    "PaymentMethod": ["Bank transfer (automatic)", "Credit card (automatic)",
+                      "Electronic check", "Mailed check"],
+    "Churn": YES_NO,
+}
+
+NUMERIC_TYPES = {
+    "SeniorCitizen": np.int8,
+    "tenure": np.int16,
+    "MonthlyCharges": np.float64,
+    "TotalCharges": np.float64,
+}
+
+# Object columns with at most this many distinct values are stored as
+# integer codes + a small dictionary, the rest as fixed width strings.
+DICTIONARY_MAX_CARDINALITY = 1024
+
+# Rows appended to a snapshot (see extend_snapshot) make a new one named after it and this suffix
+APPENDED = "+rows-"
+# Appended snapshots older than this are dropped by the next append, a worker still on one
+# writes its next append whole (see extend_snapshot)
+APPENDED_KEEP_SECONDS = 600
+
+
+# ---------------------- Cleaning ----------------------
+def parse_total_charges(values):
+    # First: We have to Replace Any Space With 0
+    values = values.replace(" ", 0)
+
+    # Converting Data Type From Object Into Float
+    return values.astype(float)
+
+
+def clean_dataset(df, total_charges_median=None):
+    """Clean `df` in place. A chunk of a larger file passes the median of the whole file (see streaming.py)."""
+    df["TotalCharges"] = parse_total_charges(df["TotalCharges"])
+
+    # Replace 0 With The Median
+    if total_charges_median is None:
+        total_charges_median = df["TotalCharges"].median()
+    df["TotalCharges"] = df["TotalCharges"].replace(0, total_charges_median)
+
+    df.replace(["No internet service", "No phone service"], "No", inplace=True)
+
+    return apply_schema(df)
+
+
+def clean_rows(df, total_charges_median=None):
+    """(`df` cleaned, without the rows holding a value outside the fixed schema, how many were dropped).
+
+    Every way rows come in (a load, a streamed chunk, an append) goes
+    through here, so a CSV gives the same rows however it arrived. Such
+    rows would never be counted by the charts (their code is -1), yet
+    show up in the row based views.
+    """
+    raw = df[[column for column in CATEGORIES if column in df.columns]].copy()
+    df = clean_dataset(df, total_charges_median)
+
+    rejected, values = outside_schema(raw, df)
+    if rejected.any():
+        logger.warning("Skipped %d rows with values outside the schema: %s", rejected.sum(), values)
+        df = df[~rejected].reset_index(drop=True)
+
+    return df, int(rejected.sum())
+
+
+def outside_schema(raw, df):
+    """Rows of the cleaned `df` with a value the fixed schema has no category for, and those values by column.
+
+    `raw` are the same rows before cleaning. Such values become NaN (code -1),
+    the cube never counts them.
+    """
+    rejected = np.zeros(len(df), dtype=bool)
+    values = {}
+    for column in CATEGORIES:
+        if column in df.columns:
+            unknown = df[column].cat.codes.to_numpy() < 0
+            if unknown.any():
+                rejected |= unknown
+                values[column] = sorted(map(str, raw[column][unknown].unique()))
+
+    return rejected, values
+
+
+def apply_schema(df):
+    for column, categories in CATEGORIES.items():
+        if column in df.columns:
+            df[column] = df[column].astype(pd.CategoricalDtype(categories))
+
+    for column, dtype in NUMERIC_TYPES.items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype)
+
+    return df
+
+
+# ---------------------- Columnar Snapshot ----------------------
+def snapshot_root(csv_path):
+    csv_path = os.path.abspath(csv_path)
+    return os.path.join(os.path.dirname(csv_path), ".snapshots")
+
+
+def snapshot_dir(csv_path):
+    """Snapshot directory for the current state of `csv_path`.
+
+    The name carries the snapshot version and the CSV size and mtime, so a
+    changed CSV (or a new layout) simply points to a directory that does
+    not exist yet and gets rebuilt.
+    """
+    stat = os.stat(csv_path)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    name = f"{stem}-v{SNAPSHOT_VERSION}-{stat.st_size}-{stat.st_mtime_ns}"
+    return os.path.join(snapshot_root(csv_path), name)
+
+
+def write_column(values, path):
+    """Save one column of a snapshot into `path`, its entry of meta.json."""
+    column = values.name
+    entry = {"name": column}
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        np.save(os.path.join(path, f"{column}.npy"), values.cat.codes.to_numpy())
+        entry["kind"] = "categorical"
+        entry["categories"] = values.cat.categories.tolist()
+
+    elif values.dtype == object and values.nunique() <= DICTIONARY_MAX_CARDINALITY:
+        codes, uniques = pd.factorize(values)
+        np.save(os.path.join(path, f"{column}.npy"), codes.astype(np.int32))
+        entry["kind"] = "dictionary"
+        entry["categories"] = uniques.tolist()
+
+    elif values.dtype == object:
+        np.save(os.path.join(path, f"{column}.npy"), values.to_numpy(dtype=str))
+        entry["kind"] = "string"
+
+    else:
+        np.save(os.path.join(path, f"{column}.npy"), values.to_numpy())
+        entry["kind"] = "numeric"
+
+    return entry
+
+
+def write_meta(meta, path):
+    # meta.json is written last, a directory without it is incomplete
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def write_snapshot(df, path):
+    meta = {"version": SNAPSHOT_VERSION, "rows": len(df), "columns": []}
+    for column in df.columns:
+        meta["columns"].append(write_column(df[column], path))
+
+    write_meta(meta, path)
+
+
+def npy_header(f):
+    """(dtype, offset of the data) of the .npy file open as `f`."""
+    version = np.lib.format.read_magic(f)
+    read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+    _, _, dtype = read_header(f)
+    return dtype, f.tell()
+
+
+def read_column(file, rows, mmap=False):
+    """The first `rows` values of the .npy `file`, appends may have made it longer (see extend_snapshot)."""
+    with open(file, "rb") as f:
+        dtype, offset = npy_header(f)
+        if not mmap or not rows:
+            return np.fromfile(f, dtype=dtype, count=rows)
+
+    return np.memmap(file, dtype=dtype, mode="r", offset=offset, shape=(rows,))
+
+
+def read_snapshot(path, mmap=False, known=None):
+    """DataFrame of the snapshot at `path`.
+
+    With `mmap` the numeric columns and category codes are read only views of
+    the .npy files: every process mapping them shares the same pages of the
+    OS page cache, so more gunicorn workers do not mean more copies. The
+    files may sit in another snapshot (meta.json "data"), only the first
+    "rows" of them belong to this one. `known` is a DataFrame of the first
+    rows, read before: its text columns are reused, not decoded again.
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+
+    if meta["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot version {meta['version']} != {SNAPSHOT_VERSION}")
+
+    path = os.path.normpath(path)
+    data = os.path.join(os.path.dirname(path), meta.get("data", os.path.basename(path)))
+    start = 0 if known is None else len(known)
+
+    columns = {}
+    for entry in meta["columns"]:
+        values = read_column(os.path.join(data, f"{entry['name']}.npy"), meta["rows"], mmap)
+
+        if entry["kind"] == "categorical":
+            values = pd.Categorical.from_codes(values, categories=entry["categories"])
+
+        elif entry["kind"] == "dictionary":
+            categories = np.array(entry["categories"], dtype=object)
+            values = categories.take(values[start:])
+
+        elif entry["kind"] == "string":
+            values = values[start:].astype(object)
+
+        if start and entry["kind"] in ("dictionary", "string"):
+            values = np.concatenate([known[entry["name"]].to_numpy(dtype=object), values])
+
+        columns[entry["name"]] = values
+
+    # One block per column, pandas would copy same dtype columns into one 2D block otherwise
+    return pd.DataFrame(columns, copy=False)
+
+
+def build_snapshot(df, csv_path):
+    target = snapshot_dir(csv_path)
+    root = snapshot_root(csv_path)
+    os.makedirs(root, exist_ok=True)
+
+    # Write into a private temp dir, then rename it into place so concurrent
+    # workers never see a half written snapshot.
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+    try:
+        write_snapshot(df, tmp)
+        os.chmod(tmp, 0o755)
+        os.rename(tmp, target)
+    except OSError:
+        # Another worker won the race, its snapshot is just as good
+        shutil.rmtree(tmp, ignore_errors=True)
+        return target
+
+    # Drop snapshots of older CSV versions
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    for name in os.listdir(root):
+        old = os.path.join(root, name)
+        if name.startswith(f"{stem}-v") and old != target:
+            shutil.rmtree(old, ignore_errors=True)
+
+    return target
+
+
+@contextlib.contextmanager
+def build_lock(csv_path):
+    """Held while building files from `csv_path`: one worker writes them, the others wait and read them.
+
+    Deployments where the lock file cannot be created (read only) go
+    ahead without it, they do not write anything either.
+    """
+    root = snapshot_root(csv_path)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    try:
+        os.makedirs(root, exist_ok=True)
+        f = open(os.path.join(root, f".{stem}.lock"), "a")
+    except OSError:
+        yield
+        return
+
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def append_columns(meta, data, rows):
+    """Write `rows` after the first meta["rows"] of the column files in `data`, meta.json of the result.
+
+    Only the bytes past the end of each file are written, nothing a reader
+    may have mapped is changed: a reader maps the rows of its own meta.json,
+    never more than the files held when it was written. Files already
+    holding some of these rows (from a larger append) keep them. Raises
+    ValueError when a value does not fit the column (a longer string).
+    """
+    meta = dict(meta, rows=meta["rows"] + len(rows), columns=[dict(entry) for entry in meta["columns"]])
+
+    for entry in meta["columns"]:
+        values = rows[entry["name"]]
+        if entry["kind"] in ("categorical", "dictionary"):
+            codes = pd.Categorical(values, categories=entry["categories"]).codes
+            if entry["kind"] == "dictionary" and (codes < 0).any():
+                # New values get the next codes, in order of appearance like pd.factorize
+                entry["categories"] = entry["categories"] + pd.unique(values[(codes < 0) & values.notna()]).tolist()
+                codes = pd.Categorical(values, categories=entry["categories"]).codes
+            values = codes
+        elif entry["kind"] == "string":
+            values = values.to_numpy(dtype=str)
+        else:
+            values = values.to_numpy()
+
+        with open(os.path.join(data, f"{entry['name']}.npy"), "r+b") as f:
+            dtype, offset = npy_header(f)
+            if values.dtype.kind == "U" and values.dtype.itemsize > dtype.itemsize:
+                raise ValueError(f"{entry['name']} values longer than the snapshot column")
+
+            held = (os.fstat(f.fileno()).st_size - offset) // dtype.itemsize
+            written = held - (meta["rows"] - len(rows))
+            if written < len(rows):
+                f.seek(offset + held * dtype.itemsize)
+                f.write(values[written:].astype(dtype).tobytes())
+
+    meta["data"] = os.path.basename(data)
+    return meta
+
+
+def extend_snapshot(path, df, rows, csv_path, mmap=False):
+    """(path, DataFrame) of the snapshot at `path` with `rows` appended, `df` being the one read from it.
+
+    The rows go at the end of the column files of the snapshot, and a new
+    snapshot of just a meta.json covers them. Every worker appending the
+    same rows to the same snapshot ends up with the same one: the first to
+    take the lock writes it, the others find it there and map it (with
+    `mmap`, the pages stay shared), and the text columns of `df` are reused.
+    The cost is the new rows, not the dataset. When the files are gone
+    (a newer CSV version was snapshotted) or a value does not fit, the
+    snapshot is written whole once more instead.
+    """
+    root = os.path.dirname(path)
+    base = os.path.basename(path).split(APPENDED)[0]
+    target = os.path.join(root, f"{base}{APPENDED}{len(df) + len(rows)}")
+
+    with build_lock(csv_path):
+        if not os.path.exists(os.path.join(target, "meta.json")):
+            tmp = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+            try:
+                try:
+                    with open(os.path.join(path, "meta.json")) as f:
+                        meta = json.load(f)
+                    data = os.path.join(root, meta.get("data", os.path.basename(path)))
+                    write_meta(append_columns(meta, data, rows), tmp)
+                except (OSError, ValueError, KeyError):
+                    meta = {"version": SNAPSHOT_VERSION, "rows": len(df) + len(rows), "columns": []}
+                    for column in df.columns:
+                        values = pd.concat([df[column], rows[column]], ignore_index=True)
+                        meta["columns"].append(write_column(values, tmp))
+                    write_meta(meta, tmp)
+                os.chmod(tmp, 0o755)
+                os.rename(tmp, target)
+            except BaseException:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+
+            keep = {os.path.basename(target), read_data_name(target)}
+            for name in os.listdir(root):
+                old = os.path.join(root, name)
+                if (name.startswith(f"{base}{APPENDED}") and name not in keep
+                        and time.time() - os.path.getmtime(old) > APPENDED_KEEP_SECONDS):
+                    shutil.rmtree(old, ignore_errors=True)
+
+        return target, read_snapshot(target, mmap, known=df)
+
+
+def read_data_name(path):
+    """Name of the snapshot holding the column files of the one at `path`."""
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f).get("data", os.path.basename(path))
+
+
+# ---------------------- Loading ----------------------
+def load_csv(csv_path):
+    return clean_rows(pd.read_csv(csv_path))[0]
+
+
+def load_dataset(csv_path, use_snapshot=True, mmap=False):
+    """Cleaned customer dataset, served from the columnar snapshot when possible (memory mapped with `mmap`)."""
+    if not use_snapshot:
+        return load_csv(csv_path)
+
+    # One worker parses the CSV and writes the snapshot, the others wait for it and read it
+    with build_lock(csv_path):
+        path = snapshot_dir(csv_path)
+        if os.path.exists(os.path.join(path, "meta.json")):
+            try:
+                return read_snapshot(path, mmap)
+            except (OSError, ValueError, KeyError):
+                pass
+
+        df = load_csv(csv_path)
+        try:
+            path = build_snapshot(df, csv_path)
+            if mmap:
+                # Serve the mapped copy, the parsed one is dropped
+                return read_snapshot(path, mmap)
+        except (OSError, ValueError, KeyError):
+            # Read only deployments still work, they just parse the CSV each time
+            pass
+
+    return df
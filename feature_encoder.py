@@ -0,0 +1,96 @@
+# transformer.pkl without sklearn: one hot columns and min-max scaling read from encoder.json
+#   python scripts/export_encoder.py   (re)writes encoder.json from the fitted ColumnTransformer
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureEncoder:
+    """The arithmetic of the fitted ColumnTransformer.
+
+    Categorical columns become one 0/1 feature per category in `categories`
+    (the encoder dropped the first one, unknown values give all zeros),
+    numerical columns are scaled as `value * scale + offset`. Features come
+    out in `features` order, the order the model expects.
+    """
+
+    def __init__(self, categorical, numerical, features):
+        self.categorical = [(column, list(categories)) for column, categories in categorical]
+        self.numerical = [column for column, _, _ in numerical]
+        self.scale = np.array([scale for _, scale, _ in numerical], dtype=np.float64)
+        self.offset = np.array([offset for _, _, offset in numerical], dtype=np.float64)
+        self.features = list(features)
+
+        n_features = sum(len(categories) for _, categories in self.categorical) + len(self.numerical)
+        if n_features != len(self.features):
+            raise ValueError(f"The encoder outputs {n_features} features, {len(self.features)} are named")
+
+        # Changes whenever the exported transformer does, e.g. to invalidate cached predictions
+        self.version = hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode()).hexdigest()[:12]
+
+        # (column, category, position) of every one hot feature, for single rows
+        self._one_hot = []
+        for column, categories in self.categorical:
+            for category in categories:
+                self._one_hot.append((column, category, len(self._one_hot)))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            spec = json.load(f)
+
+        return cls(
+            categorical=[(item["column"], item["categories"]) for item in spec["categorical"]],
+            numerical=[(item["column"], item["scale"], item["offset"]) for item in spec["numerical"]],
+            features=spec["features"],
+        )
+
+    def to_dict(self):
+        return {
+            "categorical": [{"column": column, "categories": categories} for column, categories in self.categorical],
+            "numerical": [{"column": column, "scale": scale, "offset": offset}
+                          for column, scale, offset in zip(self.numerical, self.scale.tolist(), self.offset.tolist())],
+            "features": self.features,
+        }
+
+    def transform_one(self, row):
+        """Features of one customer, `row` maps column names to plain values."""
+        encoded = np.zeros(len(self.features))
+        for column, category, position in self._one_hot:
+            if row[column] == category:
+                encoded[position] = 1.0
+
+        numbers = np.array([row[column] for column in self.numerical], dtype=np.float64)
+        encoded[len(self._one_hot):] = numbers * self.scale + self.offset
+
+        return encoded
+
+    def transform(self, rows):
+        """(n_rows, n_features) array, `rows` is a DataFrame, a dict of columns or a structured array."""
+        n_rows = len(rows[self.numerical[0]])
+        encoded = np.empty((n_rows, len(self.features)))
+
+        position = 0
+        for column, categories in self.categorical:
+            values = rows[column]
+            if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+                # Compare the small integer codes instead of the strings
+                codes, known = values.cat.codes.to_numpy(), list(values.cat.categories)
+                for category in categories:
+                    encoded[:, position] = codes == known.index(category) if category in known else 0
+                    position += 1
+                continue
+
+            values = np.asarray(values, dtype=object)
+            for category in categories:
+                encoded[:, position] = values == category
+                position += 1
+
+        # Scaled column by column, in the same order of operations as MinMaxScaler
+        for i, column in enumerate(self.numerical):
+            encoded[:, position + i] = np.asarray(rows[column], dtype=np.float64) * self.scale[i]
+            encoded[:, position + i] += self.offset[i]
+
+        return encoded
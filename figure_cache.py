@@ -0,0 +1,73 @@
+# Importing Toolkits
+import functools
+
+import config
+from cache import LRUCache
+
+
+def figure_size(fig):
+    return len(fig.to_json())
+
+
+NO_DATA = "No customers match these filters"
+
+cache = LRUCache(max_entries=config.FIGURE_CACHE_MAX_ENTRIES,
+                 max_bytes=config.FIGURE_CACHE_MAX_BYTES,
+                 sizeof=figure_size)
+
+
+def empty_figure(title="", title_font_size=30, chart_theme="plotly_dark", **kwargs):
+    """Chart of filters that match no customer: its title and a note, styled like the builders do."""
+    # Loaded with the page modules, not on start up (see main.page_function)
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.update_layout(
+        title={"text": title, "font": {"size": title_font_size, "family": "tahoma"}},
+        template=chart_theme,
+        xaxis={"visible": False},
+        yaxis={"visible": False},
+        annotations=[{"text": NO_DATA, "showarrow": False, "font": {"size": 20, "family": "tahoma"}}],
+    )
+    if chart_theme == "plotly_dark":
+        fig.update_layout(paper_bgcolor='#171C31', plot_bgcolor='rgba(255,255,255,0)')
+
+    return fig
+
+
+def cached_figure(builder):
+    """Memoize a chart builder that takes a counts Series as first argument.
+
+    The key is the builder, the counts themselves and every other argument
+    (title, chart_theme, ...). Page, filters and theme therefore all end up in
+    the key, and a changed dataset produces new counts and so new keys.
+    Cached figures are shared between requests and must not be mutated.
+    Counts of zero customers (filters that match nobody) get `empty_figure`,
+    plotly express cannot draw an empty Series.
+    """
+
+    @functools.wraps(builder)
+    def wrapper(counts, **kwargs):
+        key = (
+            builder.__module__,
+            builder.__name__,
+            counts.name,
+            tuple(counts.index),
+            tuple(counts.tolist()),
+            tuple(sorted(kwargs.items())),
+        )
+        if not counts.sum():
+            return cache.get_or_create(key, lambda: empty_figure(**kwargs))
+
+        return cache.get_or_create(key, lambda: builder(counts, **kwargs))
+
+    return wrapper
+
+
+def invalidate():
+    """Drop every cached figure, call it after the dataset is reloaded."""
+    cache.clear()
+
+
+def stats():
+    return cache.stats()
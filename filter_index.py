@@ -0,0 +1,230 @@
+# Importing Toolkits
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache
+
+# Sidebar filters that can narrow the dataset
+FILTER_COLUMNS = ("Contract", "PaymentMethod", "Churn")
+# Sidebar range sliders, a (low, high) pair with both ends included
+RANGE_COLUMNS = ("tenure", "MonthlyCharges")
+
+# Prefix bitmaps per range column, at about this many quantiles of its values
+RANGE_BUCKETS = 32
+
+# Set bits of every byte value, popcount of a packed bitmap is a lookup and a sum
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def selected(value):
+    """Values a filter keeps, None when it keeps everything ("All", nothing picked in a multi select)."""
+    if value is None or isinstance(value, str):
+        return None if value in (None, "All") else (value,)
+
+    values = tuple(value)
+    return None if not values or "All" in values else values
+
+
+def popcount(bitmap):
+    return int(POPCOUNT[bitmap].sum(dtype=np.int64))
+
+
+def set_bits(bitmap, positions):
+    """Set the bits of row `positions` in the packed `bitmap`, without unpacking it."""
+    if not len(positions):
+        return bitmap
+
+    # Distinct rows of one byte are distinct bits, their sum is their OR
+    bitmap |= np.bincount(positions >> 3, weights=128 >> (positions & 7), minlength=len(bitmap)).astype(np.uint8)
+    return bitmap
+
+
+def search(values, low, high):
+    """(start, stop) of the rows of the sorted `values` within [low, high], both ends included."""
+    if values.dtype.kind in "iu":
+        # Searched as the column's own type, numpy would cast every value to the type of the ends otherwise
+        info = np.iinfo(values.dtype)
+        low, high = max(np.ceil(low), info.min), min(np.floor(high), info.max)
+        if low > high:
+            return 0, 0
+        low, high = values.dtype.type(low), values.dtype.type(high)
+
+    return np.searchsorted(values, low, side="left"), np.searchsorted(values, high, side="right")
+
+
+def append_bits(bitmap, n_rows, rows):
+    """Packed `bitmap` of `n_rows` rows followed by the boolean `rows`, only its last byte is repacked."""
+    full = n_rows // 8
+    tail = np.unpackbits(bitmap[full:], count=n_rows - full * 8).view(bool)
+    return np.concatenate([bitmap[:full], np.packbits(np.concatenate([tail, rows]))])
+
+
+class FilterIndex:
+    """Row bitmaps for every sidebar filter value and row orders for the range sliders, built once.
+
+    Each categorical filter column gets one bitmap per category, taken
+    straight from the category codes and packed 8 rows to a byte. Several
+    values of one filter are the OR of their bitmaps, several filters the
+    AND of those, so stacking filters costs one pass over n / 8 bytes each.
+    A range is two binary searches in the rows sorted by that column, its
+    mask the difference of two prefix bitmaps (rows below a threshold, at
+    about RANGE_BUCKETS quantiles of the column) plus the few rows between
+    the range ends and the nearest thresholds, set straight into the packed
+    form. That is a pass over n / 8 bytes too, whatever the range, for
+    about RANGE_BUCKETS * n / 4 bytes per range column. The masks of recent
+    filter combinations are kept, serving one again is a dict lookup.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS, cache_bytes=64 * 1024 * 1024):
+        self.df = df
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        self._orders = {}
+        self._prefixes = {}
+        self._cache_bytes = cache_bytes
+        self._masks = LRUCache(max_entries=256, max_bytes=cache_bytes,
+                               sizeof=lambda mask: 0 if mask is None else mask.nbytes)
+
+        for column in columns:
+            values = df[column]
+            self.bitmaps[column] = dict(zip(values.cat.categories, self.code_bitmaps(values.cat.codes.to_numpy(),
+                                                                                     len(values.cat.categories))))
+
+    def extended(self, df, rows):
+        """Index of `df`, the indexed frame with `rows` appended, without going over the old rows again.
+
+        The bitmaps get the new rows' bits (only the last byte of each is
+        repacked) and the range orders built so far take the new rows in with
+        one merge. Cached masks are dropped, they are one row count short.
+        """
+        index = FilterIndex(df.head(0), columns=(), cache_bytes=self._cache_bytes)
+        index.df, index.n_rows = df, len(df)
+
+        for column, bitmaps in self.bitmaps.items():
+            categories = list(bitmaps)
+            codes = pd.Categorical(rows[column], categories=categories).codes
+            index.bitmaps[column] = {category: append_bits(bitmap, self.n_rows, codes == code)
+                                     for code, (category, bitmap) in enumerate(bitmaps.items())}
+
+        for column, (order, values) in self._orders.items():
+            new = rows[column].to_numpy()
+            new_order = np.argsort(new, kind="stable")
+            # After the old rows of the same value, as a stable sort of the whole column puts them
+            at = np.searchsorted(values, new[new_order], side="right")
+            index._orders[column] = (np.insert(order, at, new_order + self.n_rows),
+                                     np.insert(values, at, new[new_order]))
+
+        for column, (thresholds, bitmaps) in self._prefixes.items():
+            new = rows[column].to_numpy()
+            index._prefixes[column] = (thresholds, [append_bits(bitmap, self.n_rows, new < threshold)
+                                                    for threshold, bitmap in zip(thresholds, bitmaps)])
+
+        return index
+
+    def code_bitmaps(self, codes, n_codes):
+        """Packed bitmap of every code 0 .. n_codes - 1 of `codes`, -1 is in none of them."""
+        return [np.packbits(codes == code) for code in range(n_codes)]
+
+    def _prefix_bitmaps(self, column):
+        """(thresholds, packed bitmap of the rows below each) of a range column."""
+        _, values = self._orders[column]
+        quantiles = values[::-(-self.n_rows // RANGE_BUCKETS)]
+        # The value after each quantile is a threshold too: a value held by many rows then
+        # lies between two thresholds, and never among the rows set one by one
+        after = values[np.minimum(np.searchsorted(values, quantiles, side="right"), self.n_rows - 1)]
+        thresholds = np.unique(np.concatenate([quantiles, after]))
+        # No row is below NaN, while the sorted rows put it last
+        thresholds = thresholds[thresholds == thresholds]
+
+        column_values = self.df[column].to_numpy()
+        return thresholds, [np.packbits(column_values < threshold) for threshold in thresholds]
+
+    def _range(self, column, low, high):
+        if self.n_rows == 0:
+            return None
+
+        if column not in self._orders:
+            values = self.df[column].to_numpy()
+            order = np.argsort(values, kind="stable")
+            self._orders[column] = (order, values[order])
+        if column not in self._prefixes:
+            self._prefixes[column] = self._prefix_bitmaps(column)
+
+        order, values = self._orders[column]
+        start, stop = search(values, low, high)
+        if start == 0 and stop == self.n_rows:
+            return None
+
+        mask = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        thresholds, bitmaps = self._prefixes[column]
+        # The rows below each threshold are the first `below` of the sorted ones
+        below = np.searchsorted(values, thresholds, side="left")
+        first, last = np.searchsorted(below, start, side="left"), np.searchsorted(below, stop, side="right") - 1
+        if first > last:
+            # No threshold inside the range, its few rows are set one by one
+            return set_bits(mask, order[start:stop])
+
+        np.bitwise_and(bitmaps[last], ~bitmaps[first], out=mask)
+        set_bits(mask, order[start:below[first]])
+        return set_bits(mask, order[below[last]:stop])
+
+    def _key(self, filters):
+        key = []
+        for column, value in sorted(filters.items()):
+            if column in RANGE_COLUMNS:
+                if value is not None:
+                    key.append((column, (float(value[0]), float(value[1]))))
+            elif selected(value) is not None:
+                key.append((column, tuple(sorted(selected(value)))))
+
+        return tuple(key)
+
+    def mask(self, **filters):
+        """Packed bitmap of the rows matching `filters`, or None when nothing is filtered."""
+        key = self._key(filters)
+        if not key:
+            return None
+
+        return self._masks.get_or_create(key, lambda: self._build_mask(key))
+
+    def _build_mask(self, key):
+        mask = None
+        for column, value in key:
+            if column in RANGE_COLUMNS:
+                rows = self._range(column, *value)
+                if rows is None:
+                    continue
+            else:
+                rows = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+                for category in value:
+                    bitmap = self.bitmaps[column].get(category)
+                    if bitmap is not None:
+                        rows |= bitmap
+
+            mask = rows if mask is None else mask & rows
+
+        return mask
+
+    def rows(self, mask):
+        """Boolean row mask of a packed bitmap."""
+        return np.unpackbits(mask, count=self.n_rows).view(bool)
+
+    def positions(self, **filters):
+        """Row positions matching `filters`, or None when nothing is filtered."""
+        mask = self.mask(**filters)
+        if mask is None:
+            return None
+
+        return np.flatnonzero(self.rows(mask))
+
+    def select(self, **filters):
+        """Rows matching `filters`, e.g. select(Contract="One year", Churn="All").
+
+        "All" everywhere hands back the indexed frame itself, without a copy.
+        The result is shared, the chart functions only read from it.
+        """
+        positions = self.positions(**filters)
+        if positions is None:
+            return self.df
+
+        return self.df.take(positions)
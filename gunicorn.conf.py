@@ -0,0 +1,20 @@
+# gunicorn settings, read automatically by `gunicorn main:server` run from the repo root
+#
+# The app is imported once in the master and the workers are forked from it,
+# so the dataset, the aggregate cube and the feature encoder are built once
+# and every worker shares those pages with the master instead of holding its
+# own copy. Command line flags (-w, -b, ...) still override these values.
+import gc
+import os
+
+preload_app = True
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+
+# Part of what the master loads before forking (see config.py)
+os.environ.setdefault("PRELOAD_MODEL", "1")
+
+
+def pre_fork(server, worker):
+    # Objects loaded so far are never collected: the collector then leaves
+    # their headers alone and the workers keep sharing their pages
+    gc.freeze()
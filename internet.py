@@ -3,6 +3,8 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 
+from figure_cache import cached_figure
+
 used_color = ["#ADA2FF", "#FCDDB0", "#FF9F9F", "#EDD2F3", "#7FE9DE", "#84DFFF"]
 
 # Custom function for chart layout
@@ -27,11 +29,12 @@ def update_layout(fig, title_font_size=28, hover_font_size=16, hover_bgcolor="#1
 # ====================== Home Page ================================3
 
 # Main Visualization Function
-def count_viz_func(data_frame, column_name, title="Chart Title",
+@cached_figure
+def count_viz_func(counts, title="Chart Title",
                    title_font_size=30, x_label="X", y_label="Y",
                    showlegend=False, hover_template="None", chart_theme="plotly_dark"):
-    # Get Value Count For Any Column in df
-    value_counts = data_frame[column_name].value_counts(normalize=1) * 100
+    # Percentage of customers per category, counts come from the aggregate cube
+    value_counts = (counts[counts > 0] / counts.sum() * 100).rename("proportion")
 
     fig = px.bar(
         data_frame=value_counts,
@@ -80,10 +83,11 @@ def count_viz_func(data_frame, column_name, title="Chart Title",
     return fig
 
 
-def count_online_backup(data_frame, column_name, title="Chart Title",
+@cached_figure
+def count_online_backup(counts, title="Chart Title",
                         title_font_size=30, showlegend=False,
                         hover_template="None", chart_theme="plotly_dark"):
-    phone_services = data_frame[column_name].value_counts()
+    phone_services = counts[counts > 0]
 
     fig = px.pie(
         names=phone_services.index,
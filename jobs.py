@@ -0,0 +1,224 @@
+# Background jobs for slow work started from callbacks (the prediction API)
+#
+# A callback submits the job and returns right away, the page then polls
+# status() from a dcc.Interval. Jobs run on a small thread pool of the worker
+# that accepted them; their state lives in one JSON file per job, so a poll
+# answered by any other gunicorn worker sees the same progress and result.
+# The worker touches the files of its jobs every few seconds, a queued or
+# running job nobody touched for `heartbeat_timeout` lost its worker (killed,
+# restarted) and is reported as failed instead of polled forever.
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+# Job ids are uuid4().hex
+JOB_ID_LENGTH = 32
+
+
+def is_job_id(job_id):
+    """True for a string shaped like the ids submit() hands out, they come back from the browser."""
+    return (isinstance(job_id, str) and len(job_id) == JOB_ID_LENGTH
+            and all(c in "0123456789abcdef" for c in job_id))
+
+
+class JobQueueFull(Exception):
+    """Every worker thread is busy and the queue is full, try again later."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by `report()` once the job has been cancelled."""
+
+
+class JobQueue:
+    def __init__(self, directory, max_workers=8, max_pending=32, keep_seconds=600, heartbeat_timeout=30):
+        self.directory = directory
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self.heartbeat_timeout = heartbeat_timeout
+        os.makedirs(directory, exist_ok=True)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._capacity = threading.BoundedSemaphore(max_workers + max_pending)
+        self._done_events = {}
+        self._lock = threading.Lock()
+        self._heartbeat_pid = None
+
+        self.submitted = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    # ---- Job files ----
+    def _path(self, job_id, suffix=".json"):
+        if not is_job_id(job_id):
+            raise ValueError(f"Invalid job id {job_id!r}")
+        return os.path.join(self.directory, job_id + suffix)
+
+    def _write(self, job_id, **state):
+        path = self._path(job_id)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(dict(state, updated=time.time()), f)
+        os.replace(tmp, path)
+
+    def _remove(self, job_id):
+        for suffix in (".json", ".cancel"):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except OSError:
+                pass
+
+    def _sweep(self):
+        """Remove the files of jobs nobody collected."""
+        cutoff = time.time() - self.keep_seconds
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass  # removed by another worker
+
+    def _start_heartbeat(self):
+        """Start the thread touching this process's jobs, once per process (a fork does not copy threads)."""
+        with self._lock:
+            if self._heartbeat_pid == os.getpid():
+                return
+            self._heartbeat_pid = os.getpid()
+        threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.heartbeat_timeout / 3)
+            with self._lock:
+                job_ids = list(self._done_events)
+            for job_id in job_ids:
+                try:
+                    os.utime(self._path(job_id))
+                except OSError:
+                    pass  # finished and collected meanwhile
+
+    def _lost(self, job_id, state):
+        """True for a queued or running job its worker stopped touching."""
+        if state["state"] not in (QUEUED, RUNNING) or job_id in self._done_events:
+            return False
+        try:
+            seen = max(state.get("updated", 0), os.path.getmtime(self._path(job_id)))
+        except OSError:
+            return False
+        return time.time() - seen > self.heartbeat_timeout
+
+    # ---- API ----
+    def submit(self, func, *args):
+        """Start `func(report, *args)` in the background and return the job id.
+
+        `report(text)` publishes progress and raises JobCancelled when the job
+        was cancelled. The return value of `func` has to be JSON serializable.
+        """
+        if not self._capacity.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise JobQueueFull()
+
+        self._start_heartbeat()
+        job_id = uuid.uuid4().hex
+        self._write(job_id, state=QUEUED, progress="Waiting in the queue")
+        done = threading.Event()
+        with self._lock:
+            self._done_events[job_id] = done
+            self.submitted += 1
+            if self.submitted % 100 == 0:
+                self._sweep()
+
+        self._executor.submit(self._run, job_id, func, args, done)
+        return job_id
+
+    def _run(self, job_id, func, args, done):
+        def report(progress):
+            if self.is_cancelled(job_id):
+                raise JobCancelled()
+            self._write(job_id, state=RUNNING, progress=progress)
+
+        try:
+            report("Started")
+            result = func(report, *args)
+        except JobCancelled:
+            self._remove(job_id)  # nobody waits for the result
+        except Exception as error:
+            self._write(job_id, state=FAILED, progress="Failed", error=str(error))
+        else:
+            if self.is_cancelled(job_id):
+                self._remove(job_id)
+            else:
+                self._write(job_id, state=DONE, progress="Done", result=result)
+        finally:
+            self._capacity.release()
+            done.set()
+            with self._lock:
+                self._done_events.pop(job_id, None)
+
+    def wait(self, job_id, timeout):
+        """Block up to `timeout` seconds for a job of this worker, True once it finished (or it is another's)."""
+        done = self._done_events.get(job_id) if is_job_id(job_id) else None
+        return done is None or done.wait(timeout)
+
+    def status(self, job_id):
+        """{"state", "progress", "result" or "error"}, None for unknown or collected jobs."""
+        if not is_job_id(job_id):
+            return None
+
+        if self.is_cancelled(job_id):
+            return {"state": CANCELLED, "progress": "Cancelled"}
+
+        state = self._read(job_id)
+        if state is not None and self._lost(job_id, state):
+            return {"state": FAILED, "progress": "Failed", "error": "worker lost"}
+        return state
+
+    def _read(self, job_id):
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def collect(self, job_id):
+        """Like status(), and once the job has finished its files are removed."""
+        status = self.status(job_id)
+        if status is None or status["state"] in (QUEUED, RUNNING):
+            return status
+
+        if status["state"] == CANCELLED:
+            # A job still going removes its files once it sees the marker, without it the job would carry on
+            state = self._read(job_id)
+            if state is not None and state["state"] in (QUEUED, RUNNING):
+                return status
+
+        self._remove(job_id)
+        return status
+
+    def cancel(self, job_id):
+        """Stop waiting for a job. Work already sent (an HTTP call) finishes, its result is dropped."""
+        # Unknown or already collected jobs have nothing to stop, a marker would never be removed
+        if not is_job_id(job_id) or not os.path.exists(self._path(job_id)):
+            return
+
+        with open(self._path(job_id, ".cancel"), "w"):
+            pass
+        with self._lock:
+            self.cancelled += 1
+
+    def is_cancelled(self, job_id):
+        return is_job_id(job_id) and os.path.exists(self._path(job_id, ".cancel"))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "cancelled": self.cancelled,
+                "in_flight": len(self._done_events),
+            }
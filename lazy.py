@@ -0,0 +1,59 @@
+# Importing Toolkits
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Lazy:
+    """Build a value on first use, exactly once, even with many threads asking.
+
+    Used for artifacts most workers never need (the fitted transformer pulls
+    in sklearn), so they do not slow down worker start up.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded = False
+        self._started = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def of(cls, value):
+        """A Lazy already holding `value`."""
+        lazy = cls(None)
+        lazy._value, lazy._loaded = value, True
+        return lazy
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._factory()
+                    self._loaded = True
+
+        return self._value
+
+    def _load(self):
+        try:
+            self.get()
+        except Exception:
+            logger.exception("Building %r failed, the next call tries again", self._factory)
+            self._started = None
+
+    def load_in_background(self):
+        """Start building the value on a daemon thread, once per process (threads do not survive a fork)."""
+        if self._loaded or self._started == os.getpid():
+            return
+
+        with self._start_lock:
+            if not self._loaded and self._started != os.getpid():
+                self._started = os.getpid()
+                threading.Thread(target=self._load, name="lazy-load", daemon=True).start()
+
+    @property
+    def loaded(self):
+        return self._loaded
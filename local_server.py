@@ -0,0 +1,104 @@
+# Stand-in for the churn prediction API, for tests, benchmarks and air-gapped boxes
+#   python local_server.py --port 8000 --latency-ms 200 --jitter-ms 50 --error-rate 0.05
+#   PREDICTION_URL=http://127.0.0.1:8000/churn_prediction python main.py
+#
+# Same contract as the Hugging Face API: POST the 15 encoded features as a JSON
+# object to /churn_prediction, the answer is a JSON string that contains
+# "Leave" when the customer is predicted to churn. /churn_prediction/batch takes
+# a list of those objects and answers the list of strings. The answers come
+# from the bundled local model, latency and failures are injected on request.
+import argparse
+import random
+import threading
+import time
+
+import flask
+
+from predictors import FEATURES, LocalPredictor
+
+
+def create_app(model_path="local_model.npz", latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+    """Flask app serving /churn_prediction with `latency_ms` ± `jitter_ms` delay and `error_rate` HTTP 500s."""
+    app = flask.Flask(__name__)
+    predictor = LocalPredictor(model_path)
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    counters = {"requests": 0, "errors": 0, "invalid": 0, "batches": 0, "batched_rows": 0}
+
+    def inject():
+        """Sleep like a remote model would, True when this request should fail."""
+        with rng_lock:
+            delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1e3
+            fail = rng.random() < error_rate
+            counters["requests"] += 1
+            counters["errors"] += fail
+
+        time.sleep(delay)
+        return fail
+
+    def invalid(features):
+        """422 response when `features` is not an object with every feature, else None."""
+        missing = [key for key in FEATURES if not isinstance(features, dict) or key not in features]
+        if not missing:
+            return None
+
+        with rng_lock:
+            counters["invalid"] += 1
+        return flask.jsonify({"detail": f"missing features: {', '.join(missing)}"}), 422
+
+    @app.post("/churn_prediction")
+    def churn_prediction():
+        features = flask.request.get_json(force=True, silent=True)
+        error = invalid(features)
+        if error:
+            return error
+
+        if inject():
+            return flask.jsonify({"detail": "Injected failure"}), 500
+
+        return flask.jsonify(predictor.predict(features).text)
+
+    @app.post("/churn_prediction/batch")
+    def churn_prediction_batch():
+        """A list of feature objects in, the list of answers out, for the latency of one request."""
+        batch = flask.request.get_json(force=True, silent=True)
+        if not isinstance(batch, list) or not batch:
+            return flask.jsonify({"detail": "expected a non empty list of feature objects"}), 422
+        for features in batch:
+            error = invalid(features)
+            if error:
+                return error
+
+        if inject():
+            return flask.jsonify({"detail": "Injected failure"}), 500
+
+        with rng_lock:
+            counters["batches"] += 1
+            counters["batched_rows"] += len(batch)
+        return flask.jsonify([prediction.text for prediction in predictor.predict_many(batch)])
+
+    @app.get("/stats")
+    def stats():
+        with rng_lock:
+            return flask.jsonify(counters)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default="local_model.npz")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform ± around --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 500")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app(args.model, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,107 @@
 # Importing Toolkits
-import pandas as pd
-import sklearn
-
+import functools
+import importlib
+import logging
+import math
+import os
+import flask
 import numpy as np
-import plotly.express as px
-import json
-import requests
+import pandas as pd
 
 
 # Importing Dash Components
 import dash
-from dash import Dash, html, dcc, Input, Output, State
+from dash import Dash, html, dcc, dash_table, Input, Output, State, ALL, ctx, no_update
+from dash.dash_table import FormatTemplate
 import dash_bootstrap_components as dbc
 import dash_loading_spinners as dls
 
-import home
-import internet
-import other
+import data_loader
+import figure_cache
+import prediction_cache
+import metrics
+import theme
+import config
+from lazy import Lazy
+import jobs
+from jobs import JobQueue, JobQueueFull
+from cube import AggregateCube, RowCounts
+from filter_index import RANGE_COLUMNS, FilterIndex
+import risk
+import streaming
+import sql_backend
+import reloader
+from feature_encoder import FeatureEncoder
+from predictors import PredictionError, create_predictor
+
+logger = logging.getLogger(__name__)
 
 used_color = ["#ADA2FF", "#FCDDB0", "#FF9F9F", "#EDD2F3"]
 # ----------- Loading Dataset -----------
-df = pd.read_csv("Telco-Customer-Churn.csv")
+if config.DATA_BACKEND not in ("pandas", "sql"):
+    raise ValueError(f"Unknown data backend {config.DATA_BACKEND!r}, expected 'pandas' or 'sql'")
+
+# Sidebar filters whose choices come from the data
+FILTER_LISTS = ["PaymentMethod", "Contract", "Churn"]
+range_inputs = {"tenure": "tenure-filter", "MonthlyCharges": "monthly-charges-filter"}
+
+
+def load_data():
+    """(df, cube, FirstSeen of the filter values, TotalCharges median or None) of config.DATA_PATH."""
+    first_seen = streaming.FirstSeen(FILTER_LISTS)
+
+    if config.DATA_BACKEND == "sql":
+        # Charts and cards are SQL queries against an SQLite copy of the CSV (see sql_backend.py),
+        # same counts / kpis as the cube, rows stay on disk and df stays None
+        backend = sql_backend.SQLBackend(sql_backend.load_or_build(config.DATA_PATH, config.STREAMING_CHUNK_ROWS))
+        first_seen.values = {column: backend.first_seen(column) for column in FILTER_LISTS}
+        return None, backend, first_seen, backend.total_charges_median
+
+    if config.STREAMING_INGEST:
+        # Never held whole: the charts are counted chunk by chunk (see streaming.py), df stays None
+        cube = AggregateCube(max_exact_ids=config.STREAMING_EXACT_CUSTOMERS)
+        median = streaming.stream_dataset(config.DATA_PATH, [first_seen, cube], config.STREAMING_CHUNK_ROWS)
+        return None, cube, first_seen, median
+
+    # Cleaned once and cached as a columnar snapshot next to the CSV (see data_loader.py),
+    # memory mapped so every gunicorn worker reads the same pages
+    df = data_loader.load_dataset(config.DATA_PATH, mmap=config.DATASET_MMAP)
+    first_seen.update(df)
+    # Chart counts for every Contract / PaymentMethod / Churn combination, the pages only read from it
+    return df, AggregateCube(df), first_seen, None
+
+
+def load_range_bounds():
+    """(low, high) of every range slider, None when streamed rows cannot be cut by range."""
+    if df is not None:
+        bounds = {column: (df[column].min(), df[column].max()) for column in RANGE_COLUMNS}
+    elif config.DATA_BACKEND == "sql":
+        bounds = {column: cube.bounds(column) for column in RANGE_COLUMNS}
+    else:
+        return None
 
-# First: We have to Replace Any Space With 0
-df["TotalCharges"] = df["TotalCharges"].replace(" ", 0)
+    return {column: (math.floor(low), math.ceil(high)) for column, (low, high) in bounds.items()}
 
-# Converting Data Type From Object Into Float
-df["TotalCharges"] = df["TotalCharges"].astype(float)
 
-# Replace 0 With The Median
-df["TotalCharges"] = df["TotalCharges"].replace(0, df["TotalCharges"].median())
+def mapped_snapshot(df):
+    """Snapshot directory `df` was just mapped from, None when it is not mapped (see data_loader.extend_snapshot)."""
+    if df is None or not config.DATASET_MMAP:
+        return None
 
-df.replace(["No internet service", "No phone service"], "No", inplace=True)
+    path = data_loader.snapshot_dir(config.DATA_PATH)
+    return path if os.path.exists(os.path.join(path, "meta.json")) else None
 
-payment_method = df["PaymentMethod"].unique().tolist()
-payment_method.insert(0, "All")
 
-contracts = df["Contract"].unique().tolist()
-contracts.insert(0, "All")
+df, cube, first_seen, charges_median = load_data()
+dataset_snapshot = mapped_snapshot(df)
+filter_values = first_seen.values
+range_bounds = load_range_bounds()
 
-churn = df["Churn"].unique().tolist()
+# Multi select dropdowns, nothing picked means every value
+payment_method = list(filter_values["PaymentMethod"])
+contracts = list(filter_values["Contract"])
+
+churn = list(filter_values["Churn"])
 churn = ["Left" if i == "Yes" else "Stayed" for i in churn]
 churn.insert(0, "All")
 
@@ -49,7 +111,12 @@ churn = {
     "Left": "Yes"
 }
 
-transformer = pd.read_pickle("transformer.pkl")
+# The fitted transformer.pkl exported as plain arithmetic (see feature_encoder.py), no sklearn needed.
+# Loaded by the first prediction, or right away with PRELOAD_MODEL=1 (e.g. under gunicorn --preload)
+encoder = Lazy(lambda: FeatureEncoder.load(config.ENCODER_PATH))
+
+if config.PRELOAD_MODEL:
+    encoder.get()
 
 # *******************************************************************************************************
 # ** Notice: The Data Exploration & Preprocessing of This DataSet has Already Done In Jupyter Notebook **
@@ -61,11 +128,21 @@ app = Dash(__name__, external_stylesheets=[dbc.themes.CYBORG], suppress_callback
 # To render on web app
 server = app.server
 
+# Cache sizes, hit ratios, ... as JSON
+metrics.register("figure_cache", figure_cache.stats)
+
+
+@server.route("/metrics")
+def metrics_endpoint():
+    return flask.jsonify(metrics.collect())
+
+
 # Pages Navigator
 pages_dict = {
     "Home": "/",
     "Internet Services": "/InternetServices",
     "Other Services": "/OtherServices",
+    "At-Risk Customers": "/AtRiskCustomers",
     "Churn Prediction": "/ChurnPrediction",
 }
 
@@ -101,6 +178,24 @@ filter_style = {
 }
 
 # -------------- Start The App Layout ------------------ #
+def range_filter(column):
+    """Range slider over every value of `column`, streamed datasets hide it."""
+    low, high = range_bounds[column] if range_bounds is not None else (0, 1)
+    return dcc.RangeSlider(id=range_inputs[column], min=low, max=high, value=[low, high], step=1, marks=None,
+                           allowCross=False, tooltip={"placement": "bottom"})
+
+
+range_sliders = {column: range_filter(column) for column in RANGE_COLUMNS}
+
+
+def filter_options(values):
+    """Options of a sidebar dropdown, rebuilt when a reload brings new values."""
+    return [
+        {"label": html.Span([i], style={'color': '#D67BFF', 'font': "bold 16px arial", "margin": "12px 5px"}),
+         "value": i} for i in values
+    ]
+
+
 # Creating The SideBar
 sidebar = html.Div(
     [
@@ -159,15 +254,13 @@ sidebar = html.Div(
 
         dcc.Dropdown(
             id="contracts-filter",
-            options=[
-                {"label": html.Span([i], style={'color': '#D67BFF', 'font': "bold 16px arial", "margin": "12px 5px"}),
-                 "value": i} for i in contracts
-            ],
-            value="All",
+            options=filter_options(contracts),
+            value=[],
+            placeholder="All",
 
-            multi=False,
+            multi=True,
             searchable=False,
-            clearable=False,
+            clearable=True,
             optionHeight=40,
 
             style=filter_style
@@ -178,15 +271,12 @@ sidebar = html.Div(
 
         dcc.Dropdown(
             id="payment-method-filter",
-            options=[
-                {"label": html.Span([i], style={'color': '#D67BFF', 'font': "bold 16px arial", "margin": "12px 5px"}),
-                 "value": i, } for i in payment_method
-
-            ],
-            value="All",
-            multi=False,
+            options=filter_options(payment_method),
+            value=[],
+            placeholder="All",
+            multi=True,
             optionHeight=40,
-            clearable=False,
+            clearable=True,
             searchable=True,
             style=filter_style
         ),
@@ -205,6 +295,17 @@ sidebar = html.Div(
             searchable=True,
             style={"display": "none"}
         ),
+
+        # Both ends included, the full span filters nothing
+        html.Div(
+            [
+                dbc.Label("Tenure (Months)", style={"font-size": "14px"}),
+                range_sliders["tenure"],
+                dbc.Label("Monthly Charges", style={"font-size": "14px"}),
+                range_sliders["MonthlyCharges"],
+            ],
+            id="range-filters",
+        ),
     ],
     style=sidebar_style
 )
@@ -216,36 +317,6 @@ content = html.Div(id="page-content", children=[], style=content_style)
 # ►►► App Layout
 
 
-def filter_the_payment_method(the_df, the_payment_method):
-    df_filtered = the_df.copy()
-
-    if the_payment_method != "All":
-        f = the_df["PaymentMethod"] == the_payment_method
-        df_filtered = the_df[f].copy()
-
-    return df_filtered
-
-
-def filter_the_contract(the_df, contracts_type):
-    df_filtered = the_df.copy()
-
-    if contracts_type != "All":
-        f = the_df["Contract"] == contracts_type
-        df_filtered = the_df[f].copy()
-
-    return df_filtered
-
-
-def filter_the_churn_status(the_df, churn_status):
-    df_filtered = the_df.copy()
-
-    if churn_status != "All":
-        f = the_df["Churn"] == churn_status
-        df_filtered = the_df[f].copy()
-
-    return df_filtered
-
-
 options_style = {'color': '#B51B75', 'font': "bold 16px arial", "margin": "12px 5px"}
 
 model_inputs_style = {
@@ -281,6 +352,8 @@ card_style = {
     "opacity": 0.8
 }
 
+HIDDEN = {"display": "none"}
+
 prediction_layout = html.Div([
     html.Br(),
     dbc.Row([
@@ -464,40 +537,113 @@ prediction_layout = html.Div([
     html.Br(),
 
     html.Button('Forecasting 🚀', id='submit-button', n_clicks=1),
+    html.Button('Cancel', id='cancel-button', n_clicks=0, style=HIDDEN),
+
+    # The prediction runs as a background job (see jobs.py), polled until it is done
+    dcc.Store(id="prediction-job"),
+    dcc.Interval(id="prediction-poll", interval=config.PREDICTION_POLL_MS, disabled=True),
 
     html.Br(),
 
     # Cards
     dbc.Row([
-        dcc.Loading(
-            children=[
-                dbc.Col([
-                    html.H3(style={"color": "#555", "font": "bold 25px tahoma", "text-align": "center"},
-                            id='output-div'),
+        dbc.Col([
+            html.H3(style={"color": "#555", "font": "bold 25px tahoma", "text-align": "center"},
+                    id='output-div'),
 
-                    html.Img(id="prediction-image", src="", height=100, style={"margin": "auto", "display": "flex"})
-                ]),
-            ],
-            type="circle",
-            fullscreen=False,
-            color="purple"
-        )
+            html.Img(id="prediction-image", src="", height=100, style={"margin": "auto", "display": "flex"})
+        ]),
+    ]),
+    html.Hr(),
 
+    # Batch scoring of a whole CSV file
+    dbc.Row([
+        html.H2("Score a Customers File 📄",
+                style={"font": "bold 30px arial", "text-align": "center", "color": "#444"})
     ]),
+    dcc.Upload(
+        id="batch-upload",
+        children=html.Div(["Drag and Drop or ", html.A("Select a CSV File", style={"color": "#B51B75"}),
+                           " with the Telco columns"]),
+        accept=".csv",
+        multiple=False,
+        style=dict(model_inputs_style, **{"height": "80px", "line-height": "80px", "text-align": "center",
+                                         "border": "2px dashed #B51B75", "border-radius": "10px",
+                                         "color": "#444"})
+    ),
+    html.Div(id="batch-summary", style={"text-align": "center", "font": "16px arial", "color": "#444"}),
+    html.Button('Cancel', id='batch-cancel-button', n_clicks=0, style=HIDDEN),
+
+    # Scored as a background job too, polled like the prediction above
+    dcc.Store(id="batch-job"),
+    dcc.Interval(id="batch-poll", interval=config.PREDICTION_POLL_MS, disabled=True),
+    dcc.Download(id="batch-download"),
 ])
 
 
-# url = "http://128.0.0.1:8000/churn_prediction"
-# Deep Learning API
-url = "https://modyehab810-customer-churn-api.hf.space/churn_prediction"
+# Remote deep learning API or the in-process model, see predictors.py
+predictor = Lazy(create_predictor)
+metrics.register("prediction_cache", prediction_cache.stats)
+metrics.register("predictor", lambda: dict(backend=predictor.get().name, **predictor.get().stats())
+                 if predictor.loaded else {})
+
+
+# Prediction jobs run on a thread pool, so a slow API never holds the request that started them
+prediction_jobs = JobQueue(config.PREDICTION_JOBS_DIR,
+                           max_workers=config.PREDICTION_WORKERS,
+                           max_pending=config.PREDICTION_QUEUE_SIZE,
+                           heartbeat_timeout=config.PREDICTION_JOB_HEARTBEAT)
+metrics.register("prediction_jobs", prediction_jobs.stats)
+
+
+def run_prediction(report, input_dict):
+    report("Encoding the customer profile")
+    features = encoder.get().transform_one(input_dict)
+
+    report("Waiting for the churn model")
+    try:
+        prediction = prediction_cache.predict(predictor.get(), encoder.get(), features)
+    except PredictionError:
+        return ["Sorry, Server is Crashed", "/assets/sad.png"]
+
+    image_src = "/assets/sad.png" if prediction.will_leave else "/assets/happy-face.png"
+    if prediction.fallback:
+        return [f"{prediction.text} (offline estimate, the prediction API is unavailable)", image_src]
+
+    return [prediction.text, image_src]
+
+
+def prediction_result(job_id):
+    """Outputs of update_output for the current state of a prediction job."""
+    status = prediction_jobs.collect(job_id)
+
+    if status is None:
+        return ["Prediction Expired, Please Try Again", "", None, True, HIDDEN]
+
+    if status["state"] in (jobs.QUEUED, jobs.RUNNING):
+        return [status["progress"] + " ⏳", "", job_id, False, {}]
+
+    if status["state"] == jobs.DONE:
+        return status["result"] + [None, True, HIDDEN]
+
+    if status["state"] == jobs.CANCELLED:
+        return ["Prediction Cancelled", "", None, True, HIDDEN]
+
+    return ["Sorry, Server is Crashed", "/assets/sad.png", None, True, HIDDEN]
 
 
 # Define callback for Prediction Page
 @app.callback(Output('output-div', 'children'),
               Output('prediction-image', 'src'),
+              Output('prediction-job', 'data'),
+              Output('prediction-poll', 'disabled'),
+              Output('cancel-button', 'style'),
 
               Input('submit-button', 'n_clicks'),
+              Input('prediction-poll', 'n_intervals'),
+              Input('cancel-button', 'n_clicks'),
 
+              State('prediction-job', 'data'),
               State('gender', 'value'),
                State('is-senior', 'value'),
                State('partner', 'value'),
@@ -511,65 +657,124 @@ url = "https://modyehab810-customer-churn-api.hf.space/churn_prediction"
                State('total-charges', 'value'),
 
                )
-def update_output(n_clicks, gender, senior_citizen, partner, dependents, tenure, phone_services,
-                  internet_services, contract, payment_method_val, monthly_charges, total_charges):
+def update_output(n_clicks, n_intervals, cancel_clicks, job_id, gender, senior_citizen, partner, dependents, tenure,
+                  phone_services, internet_services, contract, payment_method_val, monthly_charges, total_charges):
+    if ctx.triggered_id == "prediction-poll":
+        return prediction_result(job_id) if job_id else [no_update] * 5
+
+    if ctx.triggered_id == "cancel-button":
+        if job_id:
+            prediction_jobs.cancel(job_id)
+        return ["Prediction Cancelled", "", None, True, HIDDEN]
+
     if n_clicks > 0:
+        if job_id:
+            prediction_jobs.cancel(job_id)  # superseded by this click
+
         input_dict = {
-            'gender': [gender],
-            'SeniorCitizen': [senior_citizen],
-            'Partner': [partner],
-            'Dependents': [dependents],
-            'tenure': [tenure],
-            'PhoneService': [phone_services],
-            'InternetService': [internet_services],
-            'Contract': [contract],
-            'PaymentMethod': [payment_method_val],
-            'MonthlyCharges': [monthly_charges],
-            'TotalCharges': [total_charges]
+            'gender': gender,
+            'SeniorCitizen': senior_citizen,
+            'Partner': partner,
+            'Dependents': dependents,
+            'tenure': tenure,
+            'PhoneService': phone_services,
+            'InternetService': internet_services,
+            'Contract': contract,
+            'PaymentMethod': payment_method_val,
+            'MonthlyCharges': monthly_charges,
+            'TotalCharges': total_charges
         }
 
-        input_dict = pd.DataFrame(input_dict)
-        input_dict = transformer.transform(input_dict)[0]
-
-        key_list = ["GenderMale",
-                    "InternetServiceFiberOptic",
-                    "InternetServiceNo",
-                    "ContractOneYear",
-                    "ContractTwoYear",
-                    "PaymentMethodCreditCard",
-                    "PaymentMethodElectronicCheck",
-                    "PaymentMethodMailedCheck",
-                    "SeniorCitizen",
-                    "Partner",
-                    "Dependents",
-                    "tenure",
-                    "PhoneService",
-                    "MonthlyCharges",
-                    "TotalCharges"]
-
-        model_dictionary = {}
-
-        for i in range(len(key_list)):
-            model_dictionary[key_list[i]] = input_dict[i]
-
-        json_input = json.dumps(model_dictionary)
-        response = requests.post(url, data=json_input)
-        
-        if response.status_code == 200:
-            image_src = "/assets/happy-face.png"
-
-            if response.text.__contains__("Leave"):
-                image_src = "/assets/sad.png"
-            return [response.text, image_src]
-
-        else:
-            return ["Sorry, Server is Crashed", "/assets/sad.png"]
+        try:
+            job_id = prediction_jobs.submit(run_prediction, input_dict)
+        except JobQueueFull:
+            return ["Too Many Forecasts Running, Please Try Again", "/assets/sad.png", None, True, HIDDEN]
 
+        # Fast answers (local model, cached profiles) come back without a poll
+        prediction_jobs.wait(job_id, config.PREDICTION_INLINE_WAIT)
+        return prediction_result(job_id)
 
     else:
-        return [n_clicks, '']
+        return [n_clicks, '', None, True, HIDDEN]
+
+
+# Uploads are scored with BATCH_PREDICTOR_BACKEND, the API takes one customer per request, as a job
+# of prediction_jobs so a slow backend never holds the request (progress and cancel like the form)
+batch_predictor = Lazy(lambda: create_predictor(config.BATCH_PREDICTOR_BACKEND))
+
+
+def run_upload_scoring(report, contents, filename):
+    import batch_scoring
+
+    report("Reading the file")
+    try:
+        scored, summary = batch_scoring.score_upload(contents, encoder.get(), batch_predictor.get(), report=report)
+    except (ValueError, PredictionError) as error:
+        return {"error": f"Could not score {filename}: {error}"}
+
+    name = os.path.splitext(filename or "customers.csv")[0] + "-scored.csv"
+    return {"summary": summary, "name": name, "csv": scored.to_csv(index=False)}
 
 
+def upload_result(job_id):
+    """Outputs of score_uploaded_file for the current state of an upload scoring job."""
+    status = prediction_jobs.collect(job_id)
+
+    if status is None:
+        return html.P("Scoring Expired, Please Upload the File Again"), no_update, None, True, HIDDEN
+
+    if status["state"] in (jobs.QUEUED, jobs.RUNNING):
+        return html.P(status["progress"] + " ⏳"), no_update, job_id, False, {}
+
+    if status["state"] == jobs.CANCELLED:
+        return html.P("Scoring Cancelled"), no_update, None, True, HIDDEN
+
+    result = status.get("result") or {"error": "Sorry, Server is Crashed, Please Upload the File Again"}
+    if "error" in result:
+        return html.P(result["error"], style={"color": "#B51B75"}), no_update, None, True, HIDDEN
+
+    summary, name = result["summary"], result["name"]
+    return [
+        html.H3(f"{summary['leavers']:,d} of {summary['rows']:,d} customers ({summary['leavers_share']:.1f}%) "
+                f"are predicted to leave", style={"font": "bold 22px tahoma", "margin-top": "15px"}),
+        html.P(f"Monthly charges at risk: ${summary['monthly_charges_at_risk']:,.2f}"),
+        html.P(f"Scored in {summary['seconds']:.2f}s, the results are downloading as {name}",
+               style={"color": "#888", "font-size": "14px"}),
+    ], dcc.send_string(result["csv"], name), None, True, HIDDEN
+
+
+@app.callback(Output("batch-summary", "children"),
+              Output("batch-download", "data"),
+              Output("batch-job", "data"),
+              Output("batch-poll", "disabled"),
+              Output("batch-cancel-button", "style"),
+              Input("batch-upload", "contents"),
+              Input("batch-poll", "n_intervals"),
+              Input("batch-cancel-button", "n_clicks"),
+              State("batch-upload", "filename"),
+              State("batch-job", "data"),
+              prevent_initial_call=True)
+def score_uploaded_file(contents, n_intervals, cancel_clicks, filename, job_id):
+    if ctx.triggered_id == "batch-poll":
+        return upload_result(job_id) if job_id else [no_update] * 5
+
+    if ctx.triggered_id == "batch-cancel-button":
+        if job_id:
+            prediction_jobs.cancel(job_id)
+        return html.P("Scoring Cancelled"), no_update, None, True, HIDDEN
+
+    if job_id:
+        prediction_jobs.cancel(job_id)  # superseded by this file
+
+    try:
+        job_id = prediction_jobs.submit(run_upload_scoring, contents, filename)
+    except JobQueueFull:
+        return (html.P("Too Many Forecasts Running, Please Try Again", style={"color": "#B51B75"}),
+                no_update, None, True, HIDDEN)
+
+    prediction_jobs.wait(job_id, config.PREDICTION_INLINE_WAIT)
+    return upload_result(job_id)
+
 
 app.layout = html.Div([
     dcc.Location(id="page-url"),
@@ -581,6 +786,8 @@ app.layout = html.Div([
 
 
 # CallBack Functions
+# Page skeletons: headings, cards and empty graphs, built once per page and theme.
+# The charts and KPI cards are filled by their own callbacks below.
 @app.callback(
     Output(component_id="contract-label", component_property="style"),
     Output(component_id="contracts-filter", component_property="style"),
@@ -595,80 +802,29 @@ app.layout = html.Div([
     # For Page Routing
     Input(component_id="page-url", component_property="pathname"),
 
-    # Get Values From Contracts Filter Select Box
-    Input(component_id="contracts-filter", component_property="value"),
+    # Theme changes are patched in place by switch_theme
+    State(component_id="theme-toggle", component_property="value"),
 
-    # Get Values From Payment Methods Filter Select Box
-    Input(component_id="payment-method-filter", component_property="value"),
+)
+def get_content_layout(pathname, target_theme):
+    # Both come from the browser: only the known pages and themes are memoized, so odd URLs never grow the cache
+    if pathname in pages_dict.values() and target_theme in ("Light", "Dark"):
+        return page_layout(pathname, target_theme)
 
-    # Get Values From Churn Filter Select Box
-    Input(component_id="churn-filter", component_property="value"),
+    return page_layout.__wrapped__(pathname, target_theme)
 
-    Input(component_id="theme-toggle", component_property="value"),
 
-)
-def get_content_layout(pathname, contract_val, payment_method_val, churn_val, target_theme):
-    page_theme = {
-        "title_color": "#333",
-        "text_color": "#777",
-        "app_theme": "#F8F8F8",
-
-        "chart_theme": "plotly_white",
-        "chart_border": "#F8F8F8",
-
-        "card_bg": "#fff",
-        "card_bg_border": "#fafafa",
-        "card_font_color": "#333",
-
-    }
-
-    if target_theme == "Dark":
-        page_theme["title_color"] = "#fefefe"
-
-        page_theme["text_color"] = "#eee"
-
-        page_theme["app_theme"] = "#111526"
-
-        page_theme["chart_theme"] = "plotly_dark"
-        page_theme["chart_border"] = "#171C31"
-
-        page_theme["card_bg"] = "#171C31"
-        page_theme["card_bg_border"] = "#171C31"
-        page_theme["card_font_color"] = "#fafafa"
-
-    card_style = {
-        "background-color": page_theme["card_bg"],
-        "text-align": "center",
-        "padding-top": "25px",
-        "padding-bottom": "25px",
-        "border": f"3px solid {page_theme['card_bg_border']}",
-        "border-radius": "5px",
-        "margin-bottom": "5px",
-        "box-shadow": "0 1px 2px 0 rgba(0, 0, 0, 0.05)",
-        "opacity": 0.8
-    }
-
-    graph_style = {
-        "margin-bottom": "10px",
-        "height": "560px",
-        "border": f"3px solid {page_theme['chart_border']}",
-        "border-radius": "4px"
-    }
-
-    the_app_theme = {
-        "margin-left": "16rem",
-        "margin-right": "0rem",
-        "padding": "20px",
-        "height": "100%",
-        "background-color": page_theme['app_theme']
-    }
+@functools.lru_cache(maxsize=None)
+def page_layout(pathname, target_theme):
+    page_theme = theme.get_page_theme(target_theme)
 
-    if pathname == "/":
-        dff = filter_the_contract(df, contract_val)
+    card_style = theme.get_card_style(page_theme)
 
-        dff = filter_the_payment_method(dff, payment_method_val)
+    graph_style = theme.get_graph_style(page_theme)
 
-        customer_count, charges, churn_customer = home.create_home_cards(dff, contract_val, payment_method_val)
+    the_app_theme = theme.get_app_theme(page_theme)
+
+    if pathname == "/":
         return [
             {"display": "block"},
 
@@ -681,7 +837,7 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
             html.Div([
                 html.Br(),
                 dbc.Row([
-                    html.H1("Customer Churn Analysis 📊",
+                    html.H1("Customer Churn Analysis 📊", id={"type": theme.PAGE_TITLE, "index": "home"},
                             style={"font": "bold 40px arial", "text-align": "center",
                                    "color": page_theme['title_color']})
                 ]),
@@ -693,36 +849,39 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                     dbc.Col([
                         dbc.Card(
                             dbc.CardBody([
-                                html.H3(customer_count,
+                                html.H3("",
                                         style={"color": page_theme['card_font_color'], "font": "bold 30px tahoma"},
-                                        id='customer-count-crd'),
+                                        id={"type": theme.KPI_TEXT, "index": "customer-count-crd"}),
                                 html.H3("Customers",
-                                        style={"font": "bold 20px tahoma", "color": page_theme['card_font_color']}),
-                            ]), style=card_style,
+                                        style={"font": "bold 20px tahoma", "color": page_theme['card_font_color']},
+                                        id={"type": theme.KPI_TEXT, "index": "customer-count-label"}),
+                            ]), style=card_style, id={"type": theme.KPI_CARD, "index": "customer-count"},
                         ),
 
                     ]),
                     dbc.Col([
                         dbc.Card(
                             dbc.CardBody([
-                                html.H3(charges,
+                                html.H3("",
                                         style={"color": page_theme['card_font_color'], "font": "bold 30px tahoma"},
-                                        id='charges-crd'),
+                                        id={"type": theme.KPI_TEXT, "index": "charges-crd"}),
                                 html.H3("Total Charges", style={"font": "bold 20px tahoma",
-                                                                "color": page_theme['card_font_color']}),
-                            ]), style=card_style
+                                                                "color": page_theme['card_font_color']},
+                                        id={"type": theme.KPI_TEXT, "index": "charges-label"}),
+                            ]), style=card_style, id={"type": theme.KPI_CARD, "index": "charges"}
                         ),
 
                     ]),
                     dbc.Col([
                         dbc.Card(
                             dbc.CardBody([
-                                html.H3(churn_customer,
+                                html.H3("",
                                         style={"color": page_theme['card_font_color'], "font": "bold 30px tahoma"},
-                                        id='left-customer-crd'),
+                                        id={"type": theme.KPI_TEXT, "index": "left-customer-crd"}),
                                 html.H3("(%) Left Customer", style={"font": "bold 20px tahoma",
-                                                                    "color": page_theme['card_font_color']}),
-                            ]), style=card_style
+                                                                    "color": page_theme['card_font_color']},
+                                        id={"type": theme.KPI_TEXT, "index": "left-customer-label"}),
+                            ]), style=card_style, id={"type": theme.KPI_CARD, "index": "left-customer"}
                         ),
                     ]),
                 ]),
@@ -733,25 +892,15 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                         dbc.Col(
 
                             [
-                                dcc.Graph(id="gender-chart",
+                                dcc.Graph(id={"type": theme.CHART, "index": "gender-chart"},
                                           config={'displayModeBar': False},
-                                          figure=home.count_viz_func(dff, "gender", title="Gender Distributions",
-                                                                     x_label="Gender", y_label="Frequency in PCT(%)",
-                                                                     hover_template="Gender: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
-                                                                     chart_theme=page_theme['chart_theme']),
                                           style=graph_style)
                             ]
                         ),
                         dbc.Col(
                             [
-                                dcc.Graph(id="senior-citizen-chart",
+                                dcc.Graph(id={"type": theme.CHART, "index": "senior-citizen-chart"},
                                           config={'displayModeBar': False},
-                                          figure=home.count_senior_citizen(dff, "SeniorCitizen",
-                                                                           title="Senior Citizen Distributions",
-                                                                           x_label="Senior Citizen",
-                                                                           y_label="Frequency in PCT(%)",
-                                                                           hover_template="Senior Citizen: %{x}<br>Frequency in PCT(%): %{y:0.0f}%",
-                                                                           chart_theme=page_theme['chart_theme']),
                                           style=graph_style)
                             ]
                         )
@@ -762,23 +911,15 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                 dbc.Row([
                     dbc.Col(
                         [
-                            dcc.Graph(id="dependents",
+                            dcc.Graph(id={"type": theme.CHART, "index": "dependents"},
                                       config={'displayModeBar': False},
-                                      figure=home.count_viz_func(dff, "Dependents", title="Dependents Distributions",
-                                                                 x_label="Dependents", y_label="Frequency in PCT(%)",
-                                                                 hover_template="Dependents: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
-                                                                 chart_theme=page_theme['chart_theme']),
                                       style=graph_style)
                         ]
                     ),
                     dbc.Col(
                         [
-                            dcc.Graph(id="phone-service-status",
+                            dcc.Graph(id={"type": theme.PIE_CHART, "index": "phone-service-status"},
                                       config={'displayModeBar': False},
-                                      figure=home.phone_service_chart(dff, "PhoneService",
-                                                                      title="Phone Services Status",
-                                                                      hover_template="Phone Services Status: %{label}<br>Frequency: %{value}",
-                                                                      chart_theme=page_theme['chart_theme']),
                                       style=graph_style)
                         ]
                     )
@@ -787,15 +928,8 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                 dbc.Row([
                     dbc.Col(
                         [
-                            dcc.Graph(id="churn",
+                            dcc.Graph(id={"type": theme.CHART, "index": "churn"},
                                       config={'displayModeBar': False},
-                                      figure=home.count_customer_churn(dff, "Churn",
-                                                                       title="Customer Status Distributions",
-                                                                       x_label="Customer Status",
-                                                                       y_label="Frequency in PCT(%)",
-                                                                       hover_template="Churn Status: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
-                                                                       chart_theme=page_theme['chart_theme'],
-                                                                       ),
                                       style=graph_style)
                         ]
                     )
@@ -805,12 +939,7 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                 dbc.Row([
                     dbc.Col(
                         [
-                            dcc.Graph(id="customer_by_tenure",
-                                      figure=home.count_customer_tenure(dff, "tenure",
-                                                                        title="Number of Customers Via Tenure (Months)",
-                                                                        hover_template="Tenure (Months): %{x}<br>Frequency of Customer: %{y:,.0f}",
-                                                                        chart_theme=page_theme['chart_theme'],
-                                                                        ),
+                            dcc.Graph(id={"type": theme.CHART, "index": "customer_by_tenure"},
                                       style=graph_style)
                         ]
                     )
@@ -823,10 +952,6 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
         ]
 
     if pathname == "/InternetServices":
-        dff = filter_the_contract(df, contract_val)
-
-        dff = filter_the_churn_status(dff, churn_val)
-
         return [
             {"display": "block"},
 
@@ -840,7 +965,7 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
             html.Div([
                 html.Br(),
                 dbc.Row([
-                    html.H1("Internet Services 🌐",
+                    html.H1("Internet Services 🌐", id={"type": theme.PAGE_TITLE, "index": "internet"},
                             style={"font": "bold 40px arial", "text-align": "center",
                                    "color": page_theme['title_color']})
                 ]),
@@ -852,26 +977,15 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                         dbc.Col(
 
                             [
-                                dcc.Graph(id="online-backup-chart",
-
+                                dcc.Graph(id={"type": theme.PIE_CHART, "index": "online-backup-chart"},
                                           config={'displayModeBar': False},
-                                          figure=internet.count_online_backup(dff, "OnlineBackup",
-                                                                              title="Online Backup Status",
-                                                                              hover_template="Online Backup: %{label}<br>Frequency in PCT(%): %{percent}<br>Count: %{value:,.0f}",
-                                                                              chart_theme=page_theme['chart_theme']),
                                           style=graph_style)
                             ]
                         ),
                         dbc.Col(
                             [
-                                dcc.Graph(id="online-security-chart",
+                                dcc.Graph(id={"type": theme.CHART, "index": "online-security-chart"},
                                           config={'displayModeBar': False},
-                                          figure=internet.count_viz_func(dff, "OnlineSecurity",
-                                                                         title="Online Security Status",
-                                                                         x_label="Online Security",
-                                                                         y_label="Frequency in PCT(%)",
-                                                                         hover_template="Online Security Status: %{x}<br>Frequency in PCT(%): %{y:0.0f}%",
-                                                                         chart_theme=page_theme['chart_theme']),
                                           style=graph_style)
                             ]
                         )
@@ -882,15 +996,8 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                 dbc.Row([
                     dbc.Col(
                         [
-                            dcc.Graph(id="internet-service-status",
+                            dcc.Graph(id={"type": theme.CHART, "index": "internet-service-status"},
                                       config={'displayModeBar': False},
-
-                                      figure=internet.count_viz_func(dff, "InternetService",
-                                                                     title="Internet Services Status Distribution",
-                                                                     x_label="Internet Service",
-                                                                     y_label="Frequency in PCT(%)",
-                                                                     hover_template="Internet Service: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
-                                                                     chart_theme=page_theme['chart_theme']),
                                       style=graph_style)
                         ]
                     )
@@ -903,10 +1010,6 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
         ]
 
     if pathname == "/OtherServices":
-        dff = filter_the_contract(df, contract_val)
-
-        dff = filter_the_payment_method(dff, payment_method_val)
-
         return [
             {"display": "block"},
 
@@ -920,7 +1023,7 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
             html.Div([
                 html.Br(),
                 dbc.Row([
-                    html.H1("Other Services 📊",
+                    html.H1("Other Services 📊", id={"type": theme.PAGE_TITLE, "index": "other"},
                             style={"font": "bold 40px arial", "text-align": "center",
                                    "color": page_theme['title_color']})
                 ]),
@@ -932,24 +1035,15 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                         dbc.Col(
 
                             [
-                                dcc.Graph(id="device-protection-chart",
+                                dcc.Graph(id={"type": theme.CHART, "index": "device-protection-chart"},
                                           config={'displayModeBar': False},
-                                          figure=other.count_viz_func(dff, "DeviceProtection",
-                                                                      title="Device Protection Subscription",
-                                                                      x_label="Status", y_label="Frequency in PCT(%)",
-                                                                      hover_template="Status: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
-                                                                      chart_theme=page_theme['chart_theme']),
                                           style=graph_style)
                             ]
                         ),
                         dbc.Col(
                             [
-                                dcc.Graph(id="tech-support-chart",
+                                dcc.Graph(id={"type": theme.PIE_CHART, "index": "tech-support-chart"},
                                           config={'displayModeBar': False},
-                                          figure=other.tech_support_chart(dff, "TechSupport",
-                                                                          title="Tech Support Subscription",
-                                                                          hover_template="Tech Support: %{label}<br>Frequency in PCT(%): %{percent}<br>Count: %{value:,.0f}",
-                                                                          chart_theme=page_theme['chart_theme']),
                                           style=graph_style)
                             ]
                         )
@@ -960,25 +1054,15 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                 dbc.Row([
                     dbc.Col(
                         [
-                            dcc.Graph(id="StreamingTV",
+                            dcc.Graph(id={"type": theme.CHART, "index": "StreamingTV"},
                                       config={'displayModeBar': False},
-                                      figure=other.count_viz_func(dff, "StreamingTV", title="Streaming TV Subscription",
-                                                                  x_label="Streaming TV", y_label="Frequency in PCT(%)",
-                                                                  hover_template="Status: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
-                                                                  chart_theme=page_theme['chart_theme']),
                                       style=graph_style)
                         ]
                     ),
                     dbc.Col(
                         [
-                            dcc.Graph(id="PaperlessBilling",
+                            dcc.Graph(id={"type": theme.CHART, "index": "PaperlessBilling"},
                                       config={'displayModeBar': False},
-                                      figure=other.count_viz_func(dff, "PaperlessBilling",
-                                                                  title="Paperless Billing Subscription",
-                                                                  x_label="Paperless Billing",
-                                                                  y_label="Frequency in PCT(%)",
-                                                                  hover_template="Status: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
-                                                                  chart_theme=page_theme['chart_theme']),
                                       style=graph_style)
                         ]
                     )
@@ -987,15 +1071,8 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
                 dbc.Row([
                     dbc.Col(
                         [
-                            dcc.Graph(id="PaymentMethod",
+                            dcc.Graph(id={"type": theme.CHART, "index": "PaymentMethod"},
                                       config={'displayModeBar': False},
-                                      figure=other.count_viz_func(dff, "PaymentMethod",
-                                                                  title="Payment Methods Distribution",
-                                                                  x_label="Payment Method",
-                                                                  y_label="Frequency in PCT(%)",
-                                                                  hover_template="Payment Method: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
-                                                                  chart_theme=page_theme['chart_theme'],
-                                                                  ),
                                       style=graph_style)
                         ]
                     )
@@ -1007,11 +1084,83 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
             the_app_theme
         ]
 
-    if pathname == "/ChurnPrediction":
-        dff = filter_the_contract(df, contract_val)
+    if pathname == "/AtRiskCustomers":
+        return [
+            {"display": "block"},
+
+            filter_style,
+            {"display": "none"},
+            "Payment Methods",  # Filter Label
+            filter_style,  # Payment Methods Filter Style
+            {"display": "none"},  # Only customers who have not left are listed
+
+            html.Div([
+                html.Br(),
+                dbc.Row([
+                    html.H1("At-Risk Customers 🚨", id={"type": theme.PAGE_TITLE, "index": "at-risk"},
+                            style={"font": "bold 40px arial", "text-align": "center",
+                                   "color": page_theme['title_color']})
+                ]),
+
+                html.Br(),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card(
+                            dbc.CardBody([
+                                html.H3("",
+                                        style={"color": page_theme['card_font_color'], "font": "bold 30px tahoma"},
+                                        id={"type": theme.KPI_TEXT, "index": "active-customers-crd"}),
+                                html.H3("Current Customers",
+                                        style={"font": "bold 20px tahoma", "color": page_theme['card_font_color']},
+                                        id={"type": theme.KPI_TEXT, "index": "active-customers-label"}),
+                            ]), style=card_style, id={"type": theme.KPI_CARD, "index": "active-customers"},
+                        ),
+                    ]),
+                    dbc.Col([
+                        dbc.Card(
+                            dbc.CardBody([
+                                html.H3("",
+                                        style={"color": page_theme['card_font_color'], "font": "bold 30px tahoma"},
+                                        id={"type": theme.KPI_TEXT, "index": "expected-leavers-crd"}),
+                                html.H3("Expected to Leave",
+                                        style={"font": "bold 20px tahoma", "color": page_theme['card_font_color']},
+                                        id={"type": theme.KPI_TEXT, "index": "expected-leavers-label"}),
+                            ]), style=card_style, id={"type": theme.KPI_CARD, "index": "expected-leavers"},
+                        ),
+                    ]),
+                ]),
+                html.Br(),
 
-        dff = filter_the_payment_method(dff, payment_method_val)
+                # Polls until the ranking built in the background is ready
+                dcc.Interval(id="risk-poll", interval=1000, disabled=True),
 
+                dcc.Dropdown(
+                    id="risk-top-n",
+                    options=[{"label": f"Top {n} Customers", "value": n} for n in AT_RISK_TOP_N],
+                    value=50,
+                    multi=False,
+                    searchable=False,
+                    clearable=False,
+                    style={"width": "220px", "margin-bottom": "10px", "font-family": "arial"}
+                ),
+
+                dash_table.DataTable(
+                    id={"type": theme.TABLE, "index": "at-risk"},
+                    columns=at_risk_columns,
+                    page_size=25,
+                    sort_action="native",
+                    style_table={"overflow-x": "auto"},
+                    style_header=theme.get_table_header_style(page_theme),
+                    style_data=theme.get_table_data_style(page_theme),
+                ),
+            ]),
+
+            # App Theme Dark Or Light
+            the_app_theme
+        ]
+
+    if pathname == "/ChurnPrediction":
         return [
             {"display": "none"},
 
@@ -1034,6 +1183,478 @@ def get_content_layout(pathname, contract_val, payment_method_val, churn_val, ta
         ]
 
 
+# ►►► Dashboard Charts
+# Sidebar filters each page listens to, the Internet page ignores the payment method
+home_filters = ("Contract", "PaymentMethod") + RANGE_COLUMNS
+internet_filters = ("Contract", "Churn") + RANGE_COLUMNS
+other_filters = ("Contract", "PaymentMethod") + RANGE_COLUMNS
+
+filter_inputs = {
+    "Contract": "contracts-filter",
+    "PaymentMethod": "payment-method-filter",
+    "Churn": "churn-filter",
+    **range_inputs,
+}
+
+
+def narrowed(filters):
+    """`filters` without the range sliders that keep every row (left at their full span, or hidden)."""
+    return {key: value for key, value in filters.items()
+            if key not in RANGE_COLUMNS or (range_bounds is not None and value is not None
+                                            and tuple(value) != range_bounds[key])}
+
+
+# The cube has no axis for the range sliders, once one of them cuts the rows the charts and
+# cards are counted from row bitmaps instead (see cube.RowCounts), built on first use. The
+# filter bitmaps are shared with the At-Risk ranking.
+def build_row_counts(frame, index):
+    return RowCounts(frame, index.get())
+
+
+filter_index = Lazy(functools.partial(FilterIndex, df))
+row_counts = Lazy(functools.partial(build_row_counts, df, filter_index))
+
+
+def aggregates(filters):
+    """What answers `counts` / `kpis` for the narrowed `filters`, the SQL backend takes ranges itself."""
+    if df is not None and any(key in filters for key in RANGE_COLUMNS):
+        return row_counts.get()
+
+    return cube
+
+
+# The page modules import plotly.express, the slowest import of the app: they are
+# imported by the first chart rendered, or by the gunicorn master with PRELOAD_MODEL=1
+@functools.lru_cache(maxsize=None)
+def page_function(name):
+    """Function of a page module by name, e.g. "home.count_viz_func"."""
+    module, function = name.rsplit(".", 1)
+    return getattr(importlib.import_module(module), function)
+
+
+charts = {
+    "gender-chart": {
+        "kind": theme.CHART, "filters": home_filters,
+        "builder": "home.count_viz_func", "column": "gender",
+        "kwargs": {
+            "title": "Gender Distributions",
+            "x_label": "Gender",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Gender: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
+        },
+    },
+    "senior-citizen-chart": {
+        "kind": theme.CHART, "filters": home_filters,
+        "builder": "home.count_senior_citizen", "column": "SeniorCitizen",
+        "kwargs": {
+            "title": "Senior Citizen Distributions",
+            "x_label": "Senior Citizen",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Senior Citizen: %{x}<br>Frequency in PCT(%): %{y:0.0f}%",
+        },
+    },
+    "dependents": {
+        "kind": theme.CHART, "filters": home_filters,
+        "builder": "home.count_viz_func", "column": "Dependents",
+        "kwargs": {
+            "title": "Dependents Distributions",
+            "x_label": "Dependents",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Dependents: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
+        },
+    },
+    "phone-service-status": {
+        "kind": theme.PIE_CHART, "filters": home_filters,
+        "builder": "home.phone_service_chart", "column": "PhoneService",
+        "kwargs": {
+            "title": "Phone Services Status",
+            "hover_template": "Phone Services Status: %{label}<br>Frequency: %{value}",
+        },
+    },
+    "churn": {
+        "kind": theme.CHART, "filters": home_filters,
+        "builder": "home.count_customer_churn", "column": "Churn",
+        "kwargs": {
+            "title": "Customer Status Distributions",
+            "x_label": "Customer Status",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Churn Status: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
+        },
+    },
+    "customer_by_tenure": {
+        "kind": theme.CHART, "filters": home_filters,
+        "builder": "home.count_customer_tenure", "column": "tenure",
+        "kwargs": {
+            "title": "Number of Customers Via Tenure (Months)",
+            "hover_template": "Tenure (Months): %{x}<br>Frequency of Customer: %{y:,.0f}",
+        },
+    },
+    "online-backup-chart": {
+        "kind": theme.PIE_CHART, "filters": internet_filters,
+        "builder": "internet.count_online_backup", "column": "OnlineBackup",
+        "kwargs": {
+            "title": "Online Backup Status",
+            "hover_template": "Online Backup: %{label}<br>Frequency in PCT(%): %{percent}<br>Count: %{value:,.0f}",
+        },
+    },
+    "online-security-chart": {
+        "kind": theme.CHART, "filters": internet_filters,
+        "builder": "internet.count_viz_func", "column": "OnlineSecurity",
+        "kwargs": {
+            "title": "Online Security Status",
+            "x_label": "Online Security",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Online Security Status: %{x}<br>Frequency in PCT(%): %{y:0.0f}%",
+        },
+    },
+    "internet-service-status": {
+        "kind": theme.CHART, "filters": internet_filters,
+        "builder": "internet.count_viz_func", "column": "InternetService",
+        "kwargs": {
+            "title": "Internet Services Status Distribution",
+            "x_label": "Internet Service",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Internet Service: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
+        },
+    },
+    "device-protection-chart": {
+        "kind": theme.CHART, "filters": other_filters,
+        "builder": "other.count_viz_func", "column": "DeviceProtection",
+        "kwargs": {
+            "title": "Device Protection Subscription",
+            "x_label": "Status",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Status: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
+        },
+    },
+    "tech-support-chart": {
+        "kind": theme.PIE_CHART, "filters": other_filters,
+        "builder": "other.tech_support_chart", "column": "TechSupport",
+        "kwargs": {
+            "title": "Tech Support Subscription",
+            "hover_template": "Tech Support: %{label}<br>Frequency in PCT(%): %{percent}<br>Count: %{value:,.0f}",
+        },
+    },
+    "StreamingTV": {
+        "kind": theme.CHART, "filters": other_filters,
+        "builder": "other.count_viz_func", "column": "StreamingTV",
+        "kwargs": {
+            "title": "Streaming TV Subscription",
+            "x_label": "Streaming TV",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Status: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
+        },
+    },
+    "PaperlessBilling": {
+        "kind": theme.CHART, "filters": other_filters,
+        "builder": "other.count_viz_func", "column": "PaperlessBilling",
+        "kwargs": {
+            "title": "Paperless Billing Subscription",
+            "x_label": "Paperless Billing",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Status: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
+        },
+    },
+    "PaymentMethod": {
+        "kind": theme.CHART, "filters": other_filters,
+        "builder": "other.count_viz_func", "column": "PaymentMethod",
+        "kwargs": {
+            "title": "Payment Methods Distribution",
+            "x_label": "Payment Method",
+            "y_label": "Frequency in PCT(%)",
+            "hover_template": "Payment Method: %{x}<br>Frequency in PCT(%): %{y:0.2f}%",
+        },
+    },
+}
+
+
+def register_chart_callback(name, chart):
+    @app.callback(
+        Output({"type": chart["kind"], "index": name}, "figure"),
+        *[Input(component_id=filter_inputs[f], component_property="value") for f in chart["filters"]],
+        State(component_id="theme-toggle", component_property="value"),
+    )
+    def update_chart(*values):
+        *filter_values, target_theme = values
+        filters = narrowed(dict(zip(chart["filters"], filter_values)))
+        counts = aggregates(filters).counts(chart["column"], **filters)
+
+        return page_function(chart["builder"])(counts, chart_theme=theme.get_page_theme(target_theme)["chart_theme"],
+                                **chart["kwargs"])
+
+
+# One callback per chart, so a filter change only recomputes the charts that use it
+for chart_name, chart_spec in charts.items():
+    register_chart_callback(chart_name, chart_spec)
+
+if config.PRELOAD_MODEL:
+    for chart_spec in charts.values():
+        page_function(chart_spec["builder"])
+
+
+@app.callback(
+    Output({"type": theme.KPI_TEXT, "index": "customer-count-crd"}, "children"),
+    Output({"type": theme.KPI_TEXT, "index": "charges-crd"}, "children"),
+    Output({"type": theme.KPI_TEXT, "index": "left-customer-crd"}, "children"),
+
+    Input(component_id="contracts-filter", component_property="value"),
+    Input(component_id="payment-method-filter", component_property="value"),
+    Input(component_id="tenure-filter", component_property="value"),
+    Input(component_id="monthly-charges-filter", component_property="value"),
+)
+def update_home_cards(contract_val, payment_method_val, tenure_val, monthly_charges_val):
+    filters = narrowed(dict(Contract=contract_val, PaymentMethod=payment_method_val, tenure=tenure_val,
+                            MonthlyCharges=monthly_charges_val))
+    return page_function("home.create_home_cards")(aggregates(filters).kpis(**filters))
+
+
+# ►►► At-Risk Customers
+# Choices of the page, streamed datasets keep the largest one per filter cell
+AT_RISK_TOP_N = (25, 50, 100, 500)
+
+
+# Every customer scored once per dataset / model version (see risk.py), on the first visit of the page
+def build_risk_ranking():
+    if df is None:
+        # Streamed datasets keep only the top rows of every filter cell
+        ranking = risk.TopRisk(encoder.get(), batch_predictor.get(), n=max(AT_RISK_TOP_N))
+        streaming.stream_dataset(config.DATA_PATH, [ranking], config.STREAMING_CHUNK_ROWS, charges_median)
+        return ranking
+
+    # Scored on a background thread, the dataset may be swapped meanwhile
+    frame, index = df, filter_index
+    scores = risk.load_or_score(config.DATA_PATH, frame, encoder.get(), batch_predictor.get(), config.DATASET_MMAP)
+    return risk.RiskRanking(frame, scores, index.get())
+
+
+risk_ranking = Lazy(build_risk_ranking)
+
+# Scored before the first visit of the page: by the gunicorn master when it preloads the app, so
+# the forked workers share the ranking (not with a remote API, its connections must not be forked),
+# otherwise on a background thread of each worker, started by its first request
+if config.PRELOAD_MODEL and config.BATCH_PREDICTOR_BACKEND == "local":
+    risk_ranking.get()
+
+
+@server.before_request
+def start_risk_ranking():
+    risk_ranking.load_in_background()
+
+
+at_risk_columns = [
+    {"name": "Customer ID", "id": "customerID"},
+    {"name": "Churn Risk", "id": risk.RISK_COLUMN, "type": "numeric", "format": FormatTemplate.percentage(1)},
+    {"name": "Contract", "id": "Contract"},
+    {"name": "Payment Method", "id": "PaymentMethod"},
+    {"name": "Internet Service", "id": "InternetService"},
+    {"name": "Tenure (Months)", "id": "tenure", "type": "numeric"},
+    {"name": "Monthly Charges", "id": "MonthlyCharges", "type": "numeric", "format": FormatTemplate.money(2)},
+]
+
+
+@app.callback(
+    Output({"type": theme.TABLE, "index": "at-risk"}, "data"),
+    Output({"type": theme.KPI_TEXT, "index": "active-customers-crd"}, "children"),
+    Output({"type": theme.KPI_TEXT, "index": "expected-leavers-crd"}, "children"),
+    Output(component_id="risk-poll", component_property="disabled"),
+
+    Input(component_id="contracts-filter", component_property="value"),
+    Input(component_id="payment-method-filter", component_property="value"),
+    Input(component_id="risk-top-n", component_property="value"),
+    Input(component_id="tenure-filter", component_property="value"),
+    Input(component_id="monthly-charges-filter", component_property="value"),
+    Input(component_id="risk-poll", component_property="n_intervals"),
+)
+def update_at_risk_table(contract_val, payment_method_val, top_n, tenure_val=None, monthly_charges_val=None,
+                         n_intervals=None):
+    ranking = risk_ranking
+    if not ranking.loaded:
+        # Never scored inside a request, it can take longer than the worker timeout
+        ranking.load_in_background()
+        return [], "Scoring…", "Scoring…", False
+
+    filters = narrowed(dict(Contract=contract_val, PaymentMethod=payment_method_val, tenure=tenure_val,
+                            MonthlyCharges=monthly_charges_val))
+    # Multi select values come as lists, the cache below needs them hashable
+    filters = {key: tuple(value) if isinstance(value, list) else value for key, value in filters.items()}
+    return at_risk_table(ranking, top_n, **filters) + (True,)
+
+
+# Keyed by the ranking too, a reloaded dataset brings a new one and never hits older answers
+@functools.lru_cache(maxsize=256)
+def at_risk_table(ranking, top_n, **filters):
+    rows, matched, expected = ranking.get().top(top_n, Churn="No", **filters)
+
+    columns = [column["id"] for column in at_risk_columns]
+    return rows[columns].to_dict("records"), f"{matched:,d}", f"{expected:,.0f}"
+
+
+# ----------- Hot Reload -----------
+# With DATA_RELOAD_INTERVAL every worker checks the CSV (see reloader.py). Appended rows are
+# counted into copies of the cube, the filter values and the risk ranking, a replaced file is
+# loaded again, then the new objects are swapped in. A request reads each of them once, so it
+# sees either the old data or the new, and nothing waits for the reload.
+#
+# An append costs the new rows, not the dataset: the first worker writes them at the end of
+# the mapped column files, every worker maps the longer files again (see
+# data_loader.extend_snapshot), the filter bitmaps and the ranking built so far take the new
+# rows in without a sort (see FilterIndex.extended and RiskRanking.extended), and only the
+# new rows are scored.
+def append_rows(rows):
+    """Count the rows appended to the CSV, the number of them rejected for values outside the schema."""
+    global charges_median
+    if config.DATA_BACKEND == "sql":
+        # The database is not updated in place, it is built again for the new CSV
+        return reload_dataset()
+
+    if charges_median is None:
+        # Close to the median the blanks of the loaded rows got, the next full load uses every row
+        charges_median = float(np.nanmedian(df["TotalCharges"].to_numpy()))
+    # Rows outside the fixed schema are dropped, like on a full load (see data_loader.clean_rows)
+    rows, rejected = data_loader.clean_rows(rows, total_charges_median=charges_median)
+    if not len(rows):
+        return rejected
+
+    new_cube = cube.copy()
+    new_cube.update(rows)
+    new_first_seen = first_seen.copy()
+    new_first_seen.update(rows)
+
+    new_df, new_snapshot, new_index, new_row_counts = None, None, None, None
+    if df is not None:
+        if dataset_snapshot is not None:
+            try:
+                new_snapshot, new_df = data_loader.extend_snapshot(dataset_snapshot, df, rows, config.DATA_PATH,
+                                                                   config.DATASET_MMAP)
+            except (OSError, ValueError, KeyError):
+                logger.exception("Could not snapshot the appended rows, this worker keeps a private copy")
+        if new_df is None:
+            new_df = pd.concat([df, rows], ignore_index=True)
+
+        if filter_index.loaded:
+            new_index = filter_index.get().extended(new_df, rows)
+            if row_counts.loaded:
+                new_row_counts = row_counts.get().extended(new_df, rows, new_index)
+
+    new_ranking = Lazy(build_risk_ranking)
+    if risk_ranking.loaded:
+        ranking = risk_ranking.get()
+        if new_df is None:
+            ranking = ranking.copy()
+            ranking.update(rows)
+        else:
+            # The ranking was built over filter_index, so new_index is there
+            ranking = ranking.extended(new_df, risk.score(rows, encoder.get(), batch_predictor.get()), new_index)
+        new_ranking = Lazy.of(ranking)
+
+    swap_dataset(new_df, new_cube, new_first_seen, charges_median, new_ranking,
+                 snapshot=new_snapshot, index=new_index, counts=new_row_counts)
+    return rejected
+
+
+def reload_dataset():
+    """Load the CSV again from scratch, the At-Risk scores follow on the next visit of the page."""
+    new_df, new_cube, new_first_seen, new_median = load_data()
+    swap_dataset(new_df, new_cube, new_first_seen, new_median, Lazy(build_risk_ranking),
+                 snapshot=mapped_snapshot(new_df))
+
+
+def swap_dataset(new_df, new_cube, new_first_seen, new_median, new_ranking, snapshot=None, index=None, counts=None):
+    """Swap in a new dataset, with the filter bitmaps / row counts of `new_df` when already built."""
+    global df, cube, first_seen, charges_median, risk_ranking, filter_values, payment_method, contracts
+    global range_bounds, row_counts, filter_index, dataset_snapshot
+    df, cube, first_seen, charges_median, risk_ranking = new_df, new_cube, new_first_seen, new_median, new_ranking
+    dataset_snapshot = snapshot
+    range_bounds = load_range_bounds()
+
+    filter_index = Lazy(functools.partial(FilterIndex, new_df)) if index is None else Lazy.of(index)
+    row_counts = Lazy(functools.partial(build_row_counts, new_df, filter_index)) if counts is None else Lazy.of(counts)
+
+    filter_values = first_seen.values
+    payment_method = list(filter_values["PaymentMethod"])
+    contracts = list(filter_values["Contract"])
+    # The sidebar is served again on every page load
+    for component in sidebar.children:
+        if getattr(component, "id", None) == "contracts-filter":
+            component.options = filter_options(contracts)
+        elif getattr(component, "id", None) == "payment-method-filter":
+            component.options = filter_options(payment_method)
+    if range_bounds is not None:
+        for column, slider in range_sliders.items():
+            slider.min, slider.max = range_bounds[column]
+            slider.value = list(range_bounds[column])
+
+    # Figures are keyed by their counts and tables by their ranking, old ones would only take space
+    figure_cache.invalidate()
+    at_risk_table.cache_clear()
+
+
+if config.DATA_RELOAD_INTERVAL > 0:
+    dataset_watcher = reloader.CSVWatcher(config.DATA_PATH, append_rows, reload_dataset, config.DATA_RELOAD_INTERVAL)
+    metrics.register("dataset_reload", dataset_watcher.stats)
+
+    # Threads do not survive the fork of gunicorn workers, each worker starts its own on its first request
+    @server.before_request
+    def start_dataset_watcher():
+        dataset_watcher.start()
+
+
+# The range sliders cut rows: nothing to cut on the prediction page, and the At-Risk
+# page of a dataset that is not held in memory only kept its top rows per filter cell
+@app.callback(
+    Output(component_id="range-filters", component_property="style"),
+    Input(component_id="page-url", component_property="pathname"),
+)
+def show_range_filters(pathname):
+    if range_bounds is None or pathname == "/ChurnPrediction" or (df is None and pathname == "/AtRiskCustomers"):
+        return HIDDEN
+
+    return {"display": "block"}
+
+
+# Switch Light / Dark on the page that is already rendered: only layout patches and
+# styles go back to the browser, no data is filtered and no figure is rebuilt
+@app.callback(
+    Output({"type": theme.CHART, "index": ALL}, "figure", allow_duplicate=True),
+    Output({"type": theme.PIE_CHART, "index": ALL}, "figure", allow_duplicate=True),
+    Output({"type": theme.CHART, "index": ALL}, "style"),
+    Output({"type": theme.PIE_CHART, "index": ALL}, "style"),
+    Output({"type": theme.KPI_CARD, "index": ALL}, "style"),
+    Output({"type": theme.KPI_TEXT, "index": ALL}, "style"),
+    Output({"type": theme.PAGE_TITLE, "index": ALL}, "style"),
+    Output({"type": theme.TABLE, "index": ALL}, "style_header"),
+    Output({"type": theme.TABLE, "index": ALL}, "style_data"),
+    Output(component_id="page-content", component_property="style", allow_duplicate=True),
+
+    Input(component_id="theme-toggle", component_property="value"),
+    State(component_id="page-url", component_property="pathname"),
+    prevent_initial_call=True,
+)
+def switch_theme(target_theme, pathname):
+    page_theme = theme.get_page_theme(target_theme)
+    charts, pies, chart_styles, pie_styles, cards, texts, titles, headers, tables, _ = [
+        len(i) for i in ctx.outputs_list]
+
+    graph_style = theme.get_graph_style(page_theme)
+    card_style = theme.get_card_style(page_theme)
+
+    # The prediction page always stays light
+    page_style = no_update if pathname == "/ChurnPrediction" else theme.get_app_theme(page_theme)
+
+    return [
+        [theme.chart_patch(page_theme["chart_theme"]) for _ in range(charts)],
+        [theme.chart_patch(page_theme["chart_theme"], pie=True) for _ in range(pies)],
+        [graph_style] * chart_styles,
+        [graph_style] * pie_styles,
+        [card_style] * cards,
+        [theme.color_patch(page_theme["card_font_color"])] * texts,
+        [theme.color_patch(page_theme["title_color"])] * titles,
+        [theme.get_table_header_style(page_theme)] * headers,
+        [theme.get_table_data_style(page_theme)] * tables,
+        page_style,
+    ]
+
+
 # Run The App
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -0,0 +1,38 @@
+# Small registry of runtime counters, served as JSON on /metrics by main.py
+import threading
+from collections import deque
+
+_sources = {}
+
+
+def register(name, source):
+    """`source` is a zero argument callable returning a JSON friendly dict."""
+    _sources[name] = source
+
+
+def collect():
+    return {name: source() for name, source in _sources.items()}
+
+
+class LatencyRecorder:
+    """Latencies of the last `window` calls, summarized as percentiles in milliseconds."""
+
+    def __init__(self, window=2048):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._samples)
+
+        summary = {"count": self.count}
+        for name, q in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            summary[name] = samples[min(int(q * len(samples)), len(samples) - 1)] * 1e3 if samples else None
+
+        return summary
@@ -3,6 +3,8 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 
+from figure_cache import cached_figure
+
 used_color = ["#ADA2FF", "#FCDDB0", "#FF9F9F", "#EDD2F3", "#7FE9DE", "#84DFFF"]
 
 # Custom function for chart layout
@@ -26,22 +28,23 @@ def update_layout(fig, title_font_size=28, hover_font_size=16, hover_bgcolor="#1
 # ---------------------- Visualizations Graphs Functions ----------------------
 # ====================== Home Page ================================3
 
-def create_home_cards(the_df, the_contract, the_payment_method):
-    customer_counts = the_df["customerID"].nunique()
+def create_home_cards(kpis):
+    customer_counts = kpis["customers"]
 
-    total_charges = the_df["TotalCharges"].sum()
+    total_charges = kpis["total_charges"]
 
-    churn_customer = (len(the_df[the_df["Churn"] == "Yes"]) / len(the_df)) * 100
+    churn_customer = (kpis["churned"] / kpis["rows"]) * 100 if kpis["rows"] else 0
 
     return f"{customer_counts:,d}", f"${total_charges:,.2f}", f"{churn_customer:0.2f}%"
 
 
 # Main Visualization Function
-def count_viz_func(data_frame, column_name, title="Chart Title",
+@cached_figure
+def count_viz_func(counts, title="Chart Title",
                    title_font_size=30, x_label="X", y_label="Y",
                    showlegend=False, hover_template="None", chart_theme="plotly_dark"):
-    # Get Value Count For Any Column in df
-    value_counts = data_frame[column_name].value_counts(normalize=1) * 100
+    # Percentage of customers per category, counts come from the aggregate cube
+    value_counts = (counts[counts > 0] / counts.sum() * 100).rename("proportion")
 
     fig = px.bar(
         data_frame=value_counts,
@@ -90,10 +93,11 @@ def count_viz_func(data_frame, column_name, title="Chart Title",
     return fig
 
 
-def count_senior_citizen(data_frame, column_name, title="Chart Title",
+@cached_figure
+def count_senior_citizen(counts, title="Chart Title",
                          title_font_size=30, x_label="X", y_label="Y",
                          showlegend=False, hover_template="None", chart_theme="plotly_dark"):
-    senior_citizen = data_frame[column_name].value_counts(normalize=1) * 100
+    senior_citizen = (counts[counts > 0] / counts.sum() * 100).rename("proportion")
 
     fig = px.bar(
         data_frame=senior_citizen,
@@ -142,11 +146,12 @@ def count_senior_citizen(data_frame, column_name, title="Chart Title",
     return fig
 
 
-def tech_support_chart(data_frame, column_name, title="Chart Title",
+@cached_figure
+def tech_support_chart(counts, title="Chart Title",
                         title_font_size=30, showlegend=False,
                         hover_template="None", chart_theme="plotly_dark"):
 
-    phone_services = data_frame[column_name].value_counts()
+    phone_services = counts[counts > 0]
 
     fig = px.pie(
         names=phone_services.index,
@@ -210,10 +215,11 @@ def tech_support_chart(data_frame, column_name, title="Chart Title",
     return fig
 
 
-def count_customer_churn(data_frame, column_name, title="Chart Title",
+@cached_figure
+def count_customer_churn(counts, title="Chart Title",
                          title_font_size=30, x_label="X", y_label="Y",
                          showlegend=False, hover_template="None", chart_theme="plotly_dark"):
-    churn = data_frame[column_name].value_counts(normalize=1) * 100
+    churn = (counts[counts > 0] / counts.sum() * 100).rename("proportion")
 
     fig = px.bar(
         data_frame=churn,
@@ -262,29 +268,12 @@ def count_customer_churn(data_frame, column_name, title="Chart Title",
     return fig
 
 
-def count_customer_tenure(data_frame, column_name, title="Chart Title",
+@cached_figure
+def count_customer_tenure(counts, title="Chart Title",
                           title_font_size=30,
                           showlegend=False, hover_template="None", chart_theme="plotly_dark"):
-    def tenure_bins(x):
-        if x >= 0 and x <= 12:
-            return "0-12 Months"
-
-        if x > 12 and x <= 24:
-            return "13-24 Months"
-
-        if x > 24 and x <= 36:
-            return "25-36 Months"
-
-        if x > 36 and x <= 48:
-            return "37-48 Months"
-
-        if x > 48 and x <= 60:
-            return "49-60 Months"
-
-        if x > 60 and x <= 72:
-            return "61-72 Months"
-
-    customer_via_tenure = data_frame[column_name].apply(tenure_bins).value_counts().sort_index()
+    # Counts per tenure bucket, the buckets are cut by the aggregate cube
+    customer_via_tenure = counts[counts > 0].sort_index()
 
     fig = px.scatter(
         data_frame=customer_via_tenure,
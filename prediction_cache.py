@@ -0,0 +1,48 @@
+# Importing Toolkits
+import threading
+
+import config
+from cache import LRUCache
+
+cache = LRUCache(max_entries=config.PREDICTION_CACHE_MAX_ENTRIES,
+                 ttl=config.PREDICTION_CACHE_TTL if config.PREDICTION_CACHE_TTL > 0 else None)
+
+_lock = threading.Lock()
+_version = None
+
+
+def predict(predictor, encoder, features):
+    """Prediction for the encoded `features`, memoized per model and encoder version.
+
+    The form has a small input space and the same profile is often submitted
+    again, so answers are kept in an LRU cache with a TTL. The key is the
+    encoded feature vector, so inputs that only differ in form (15 vs 15.0)
+    share an entry. Failed predictions raise and are never stored, neither
+    are fallback answers given while the API is down.
+    """
+    global _version
+
+    version = (predictor.name, predictor.version, encoder.version)
+    with _lock:
+        if version != _version:
+            # A new model or transformer, nothing cached so far is valid
+            cache.clear()
+            _version = version
+
+    key = (version, tuple(features.tolist()))
+    missing = object()
+    prediction = cache.get(key, missing)
+    if prediction is missing:
+        prediction = predictor.predict(dict(zip(encoder.features, features)))
+        if not prediction.fallback:
+            cache.put(key, prediction)
+
+    return prediction
+
+
+def invalidate():
+    cache.clear()
+
+
+def stats():
+    return cache.stats()
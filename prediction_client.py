@@ -0,0 +1,81 @@
+# Pooled keep-alive HTTP client for the churn prediction API
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import LatencyRecorder
+
+# Gateway errors of the hosted API, worth another try after a short backoff
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class PredictionClient:
+    """One `requests.Session` shared by every callback thread.
+
+    Connections to the API host stay open between predictions (up to
+    `pool_size` of them), every call has a (connect, read) timeout and failed
+    connects, reads and gateway errors are retried `retries` times with
+    exponential backoff. A prediction is a pure function of its features, so
+    retrying the POST is safe.
+    """
+
+    def __init__(self, url, pool_size=10, connect_timeout=3.05, read_timeout=10.0, retries=2, backoff=0.3):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,  # hand back the last response, the caller checks the status
+        )
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self.session.headers["Content-Type"] = "application/json"
+
+        self.latency = LatencyRecorder()
+        self._lock = threading.Lock()
+        self.errors = 0
+
+    def post(self, body, url=None):
+        """POST `body` (already serialized) to `url` (the prediction URL by default), return the `requests.Response`.
+
+        Raises `requests.RequestException` once the retries are used up.
+        """
+        start = time.perf_counter()
+        try:
+            return self.session.post(url or self.url, data=body, timeout=self.timeout)
+        except requests.RequestException:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self.latency.record(time.perf_counter() - start)
+
+    def close(self):
+        self.session.close()
+
+    def stats(self):
+        # urllib3 counts, per host pool, the connections it opened and the requests it sent
+        connections = sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                sent += pool.num_requests
+
+        return dict(
+            self.latency.stats(),
+            errors=self.errors,
+            connections_opened=connections,
+            requests_sent=sent,
+            connection_reuse=1 - connections / sent if sent else None,
+        )
@@ -0,0 +1,227 @@
+# Churn prediction backends, chosen with PREDICTOR_BACKEND (see config.py)
+#   remote : the deep learning API on Hugging Face, over prediction_client.py
+#   local  : the same kind of dense network, evaluated in process with NumPy
+import hashlib
+import json
+from collections import namedtuple
+
+import numpy as np
+
+import config
+
+# Model inputs, in the order of the columns transformer.pkl outputs
+FEATURES = ["GenderMale",
+            "InternetServiceFiberOptic",
+            "InternetServiceNo",
+            "ContractOneYear",
+            "ContractTwoYear",
+            "PaymentMethodCreditCard",
+            "PaymentMethodElectronicCheck",
+            "PaymentMethodMailedCheck",
+            "SeniorCitizen",
+            "Partner",
+            "Dependents",
+            "tenure",
+            "PhoneService",
+            "MonthlyCharges",
+            "TotalCharges"]
+
+# Raw columns the transformer takes, the Yes/No ones as 0/1 like the prediction form sends them
+INPUT_COLUMNS = ["gender", "SeniorCitizen", "Partner", "Dependents", "tenure", "PhoneService",
+                 "InternetService", "Contract", "PaymentMethod", "MonthlyCharges", "TotalCharges"]
+BINARY_COLUMNS = ["Partner", "Dependents", "PhoneService"]
+
+LEAVE_TEXT = "The Customer Will Leave"
+STAY_TEXT = "The Customer Will Stay"
+
+# `text` is shown on the prediction page, `will_leave` picks the face image,
+# `fallback` marks answers of the local model standing in for the API (see resilience.py)
+Prediction = namedtuple("Prediction", ["text", "will_leave", "fallback"], defaults=[False])
+
+
+def model_inputs(df):
+    """Customer rows of the dataset (see data_loader.py) as transformer input."""
+    inputs = df[INPUT_COLUMNS].copy()
+    for column in BINARY_COLUMNS:
+        inputs[column] = (inputs[column].astype(str) == "Yes").astype(np.int64)
+
+    inputs["SeniorCitizen"] = inputs["SeniorCitizen"].astype(np.int64)
+
+    return inputs
+
+
+class PredictionError(Exception):
+    """The backend could not produce a prediction (API down, timeout, bad response)."""
+
+
+class RemotePredictor:
+    """Predictions from the API, one customer per call or `batch_size` per call to `batch_url`.
+
+    The batch endpoint takes a JSON list of feature objects and answers a
+    JSON list of the texts /churn_prediction would return, see local_server.py.
+    """
+
+    name = "remote"
+
+    def __init__(self, client, batch_url=None, batch_size=32):
+        self.client = client
+        self.batch_url = batch_url
+        self.batch_size = batch_size
+        # The API does not report its model version, PREDICTION_CACHE_TTL bounds how stale cached answers get
+        self.version = client.url
+
+    def _post(self, payload, url=None):
+        import requests
+
+        url = url or self.client.url
+        try:
+            response = self.client.post(json.dumps(payload), url)
+        except requests.RequestException as error:
+            raise PredictionError(str(error)) from error
+
+        if response.status_code != 200:
+            raise PredictionError(f"{url} returned HTTP {response.status_code}")
+
+        return response
+
+    def predict(self, features):
+        """`features` maps every name in FEATURES to its transformed value."""
+        text = self._post({key: float(features[key]) for key in FEATURES}).text
+
+        return Prediction(text, "Leave" in text)
+
+    def predict_many(self, features_list):
+        """Predictions of several customers, one call to `batch_url` (one per customer without it)."""
+        if not self.batch_url:
+            return [self.predict(features) for features in features_list]
+
+        payload = [{key: float(features[key]) for key in FEATURES} for features in features_list]
+        try:
+            texts = self._post(payload, self.batch_url).json()
+        except ValueError as error:
+            raise PredictionError(f"{self.batch_url} returned invalid JSON") from error
+
+        if not isinstance(texts, list) or len(texts) != len(payload):
+            raise PredictionError(f"{self.batch_url} did not return one answer per customer")
+
+        # Shown as the single endpoint answers it, a JSON string
+        return [Prediction(json.dumps(text), "Leave" in text) for text in texts]
+
+    def predict_batch(self, X):
+        """(will leave, None) of every row of `X`, `batch_size` rows per API call."""
+        rows = [dict(zip(FEATURES, row)) for row in X]
+        will_leave = [prediction.will_leave
+                      for start in range(0, len(rows), self.batch_size)
+                      for prediction in self.predict_many(rows[start:start + self.batch_size])]
+
+        return np.array(will_leave, dtype=bool), None
+
+    def stats(self):
+        return self.client.stats()
+
+
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "linear": lambda x: x,
+}
+
+
+class LocalPredictor:
+    """Forward pass of a dense network stored in a .npz file.
+
+    The file holds `W0, b0, W1, b1, ...` and one activation name per layer in
+    `activations`, see scripts/train_local_model.py. The last layer has a
+    single sigmoid unit, the churn probability.
+    """
+
+    name = "local"
+
+    def __init__(self, path, threshold=0.5):
+        with open(path, "rb") as f:
+            self.version = hashlib.sha256(f.read()).hexdigest()[:12]
+
+        with np.load(path) as model:
+            activations = [str(name) for name in model["activations"]]
+            self.layers = [
+                (model[f"W{i}"].astype(np.float64), model[f"b{i}"].astype(np.float64), ACTIVATIONS[activation])
+                for i, activation in enumerate(activations)
+            ]
+
+        self.threshold = threshold
+        if self.layers[0][0].shape[0] != len(FEATURES):
+            raise ValueError(f"{path} expects {self.layers[0][0].shape[0]} features, not {len(FEATURES)}")
+
+    def predict_proba(self, X):
+        """Churn probability of every row of `X`, shaped (n_rows, len(FEATURES))."""
+        x = np.asarray(X, dtype=np.float64)
+        for weights, bias, activation in self.layers:
+            x = activation(x @ weights + bias)
+
+        return x[:, 0]
+
+    def predict_batch(self, X):
+        """(will leave, churn probability) of every row of `X`."""
+        probability = self.predict_proba(X)
+
+        return probability >= self.threshold, probability
+
+    def predict(self, features):
+        return self.predict_many([features])[0]
+
+    def predict_many(self, features_list):
+        """Predictions of several customers, one forward pass."""
+        will_leave, _ = self.predict_batch([[features[key] for key in FEATURES] for features in features_list])
+
+        return [Prediction(LEAVE_TEXT if leave else STAY_TEXT, bool(leave)) for leave in will_leave]
+
+    def stats(self):
+        return {"layers": [weights.shape[1] for weights, _, _ in self.layers]}
+
+
+def create_predictor(backend=None):
+    """The backend named `backend`, PREDICTOR_BACKEND when not given."""
+    backend = backend or config.PREDICTOR_BACKEND
+
+    if backend == "local":
+        return LocalPredictor(config.LOCAL_MODEL_PATH)
+
+    if backend == "remote":
+        from prediction_client import PredictionClient
+
+        predictor = RemotePredictor(PredictionClient(config.PREDICTION_URL,
+                                                     pool_size=config.PREDICTION_POOL_SIZE,
+                                                     connect_timeout=config.PREDICTION_CONNECT_TIMEOUT,
+                                                     read_timeout=config.PREDICTION_READ_TIMEOUT,
+                                                     retries=config.PREDICTION_RETRIES,
+                                                     backoff=config.PREDICTION_BACKOFF),
+                                    batch_url=config.PREDICTION_BATCH_URL or None,
+                                    batch_size=config.PREDICTION_BATCH_SIZE)
+
+        from resilience import CircuitBreaker, ResilientPredictor
+
+        fallback = None
+        if config.PREDICTION_FALLBACK_BACKEND:
+            if config.PREDICTION_FALLBACK_BACKEND == "remote":
+                raise ValueError("PREDICTION_FALLBACK_BACKEND cannot be 'remote', it stands in for the API")
+            fallback = create_predictor(config.PREDICTION_FALLBACK_BACKEND)
+
+        coalescing = predictor.batch_url and config.PREDICTION_BATCH_WINDOW_MS > 0
+        predictor = ResilientPredictor(predictor, fallback,
+                                       CircuitBreaker(config.PREDICTION_BREAKER_FAILURES,
+                                                      config.PREDICTION_BREAKER_RESET),
+                                       budget=config.PREDICTION_BUDGET,
+                                       max_pending=config.PREDICTION_MAX_PENDING)
+
+        if coalescing:
+            from coalescer import CoalescingPredictor
+
+            # Around the budget and breaker, not inside them: each batch sent to the API takes
+            # one slot and one budget, however many callers share it
+            predictor = CoalescingPredictor(predictor, window=config.PREDICTION_BATCH_WINDOW_MS / 1e3,
+                                            max_batch=config.PREDICTION_BATCH_SIZE,
+                                            concurrency=config.PREDICTION_POOL_SIZE)
+
+        return predictor
+
+    raise ValueError(f"Unknown predictor backend {backend!r}, expected 'remote' or 'local'")
@@ -0,0 +1,115 @@
+# Hot reload of the customer CSV while the app keeps serving
+#
+# A watcher thread checks the file every few seconds. Rows appended at the
+# end are read on their own (from the byte offset reached so far) and handed
+# to `on_append`, which returns how many of them it rejected; any other change (a rewritten or replaced file) calls
+# `on_replace`, which loads it again. main.py builds the new aggregates from
+# copies and swaps them in, requests keep reading the old ones until then.
+import io
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bytes just before the offset that must still be there for a change to count as an append
+SIGNATURE_BYTES = 4096
+
+
+class CSVWatcher:
+    """Tells appended rows from other changes of the CSV at `path`.
+
+    Created once the file is loaded, everything up to its current size
+    counts as read. A complete line is only read once its newline is
+    written, a half written last row waits for the next check.
+    """
+
+    def __init__(self, path, on_append, on_replace, interval=5.0):
+        self.path = path
+        self.on_append = on_append
+        self.on_replace = on_replace
+        self.interval = interval
+
+        self.appends = 0
+        self.replaces = 0
+        self.rows_appended = 0
+        self.rows_rejected = 0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._mark()
+
+    def _mark(self):
+        """Everything up to the last complete line of the file counts as read."""
+        with open(self.path, "rb") as f:
+            self.columns = f.readline().decode().strip().split(",")
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            f.seek(max(size - SIGNATURE_BYTES, 0))
+            tail = f.read()
+
+        self.offset = size - (len(tail) - tail.rfind(b"\n") - 1)
+        self._inode = stat.st_ino
+        self._signature = tail[:len(tail) - (size - self.offset)][-SIGNATURE_BYTES:]
+
+    def _appended(self, f):
+        """True when the bytes read so far are unchanged, only more may have been written."""
+        f.seek(self.offset - len(self._signature))
+        return f.read(len(self._signature)) == self._signature
+
+    def check(self):
+        """Look at the file once, "append", "replace" or None when nothing changed."""
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    stat = os.fstat(f.fileno())
+                    if stat.st_ino == self._inode and stat.st_size >= self.offset and self._appended(f):
+                        f.seek(self.offset)
+                        data = f.read()
+                        data = data[:data.rfind(b"\n") + 1]
+                        if not data:
+                            return None
+
+                        rows = pd.read_csv(io.BytesIO(data), header=None, names=self.columns)
+                        rejected = self.on_append(rows) or 0
+                        self.offset += len(data)
+                        self._signature = (self._signature + data)[-SIGNATURE_BYTES:]
+                        self.appends += 1
+                        self.rows_appended += len(rows) - rejected
+                        self.rows_rejected += rejected
+                        return "append"
+            except FileNotFoundError:
+                # Replaced by a rename that is not finished yet
+                return None
+
+            self.on_replace()
+            self._mark()
+            self.replaces += 1
+            return "replace"
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Reloading %s failed, the loaded data stays in use", self.path)
+            time.sleep(self.interval)
+
+    def start(self):
+        """Start checking in the background, once per process (gunicorn workers are forked without threads)."""
+        if self._pid == os.getpid():
+            return
+
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def stats(self):
+        return dict(path=self.path, offset=self.offset, appends=self.appends, rows_appended=self.rows_appended,
+                    rows_rejected=self.rows_rejected, replaces=self.replaces, interval_s=self.interval)
@@ -0,0 +1,186 @@
+# Latency budget, circuit breaker and local fallback around the prediction API
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from predictors import PredictionError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while.
+
+    Closed: every call goes through, `failure_threshold` failures in a row
+    open the breaker. Open: no call goes through for `reset_timeout`
+    seconds. Half open: one trial call goes through, its success closes the
+    breaker and its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """True when a call may go through, the caller then reports its outcome."""
+        state = self.state
+        with self._lock:
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.times_opened += 1
+                self._state = OPEN
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return dict(state=state, consecutive_failures=self._failures, times_opened=self.times_opened)
+
+
+class ResilientPredictor:
+    """`primary` answering within `budget` seconds, `fallback` when it cannot.
+
+    A call that fails or takes longer than the budget counts against the
+    circuit breaker. While the breaker is open the primary is not called at
+    all, so a dead API costs nothing instead of a timeout per prediction.
+    Without a fallback those calls raise `PredictionError` right away.
+    Fallback answers are marked (`Prediction.fallback`) so the prediction
+    cache does not keep them once the API is back. At most `max_pending`
+    calls are with the primary at once, past their budget or not: when
+    every slot is taken the call falls back right away instead of queueing
+    more load on a slow API.
+    """
+
+    def __init__(self, primary, fallback=None, breaker=None, budget=5.0, max_pending=16):
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker or CircuitBreaker()
+        self.budget = budget
+        self.name = primary.name
+        self.version = primary.version
+
+        # Calls past their budget keep running here until the client timeout ends them,
+        # each holds a slot until then so nothing ever waits in the executor queue
+        self._executor = ThreadPoolExecutor(max_workers=max_pending, thread_name_prefix="resilient")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.saturated = 0
+
+    def _count(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def _submit(self, method, args):
+        """Run `method` of the primary on the executor, its slot is given back once it returns."""
+        try:
+            future = self._executor.submit(getattr(self.primary, method), *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _call(self, method, args, budget):
+        """(result, True when it came from the fallback) of `method` of the primary."""
+        self._count(calls=1)
+        if not self._slots.acquire(blocking=False):
+            self._count(saturated=1)
+            error = PredictionError("too many calls to the primary pending")
+        elif self.breaker.allow():
+            try:
+                future = self._submit(method, args)
+                result = future.result(timeout=budget)
+            except TimeoutError:
+                # Nothing queues (see _slots), cancel() only stops a call that has not started yet
+                future.cancel()
+                self._count(timeouts=1)
+                self.breaker.record_failure()
+                error = PredictionError(f"no answer within the {budget:g}s budget")
+            except PredictionError as e:
+                self._count(failures=1)
+                self.breaker.record_failure()
+                error = e
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            else:
+                self.breaker.record_success()
+                return result, False
+        else:
+            self._slots.release()
+            error = PredictionError("circuit breaker open")
+
+        if self.fallback is None:
+            raise error
+
+        self._count(fallbacks=1)
+        return getattr(self.fallback, method)(*args), True
+
+    def predict(self, features):
+        prediction, fell_back = self._call("predict", (features,), self.budget)
+        return prediction._replace(fallback=True) if fell_back else prediction
+
+    def predict_many(self, features_list):
+        predictions, fell_back = self._call("predict_many", (features_list,), self.budget)
+        return [prediction._replace(fallback=True) for prediction in predictions] if fell_back else predictions
+
+    def predict_batch(self, X):
+        # Whole files take longer than one customer, only the client timeouts apply
+        return self._call("predict_batch", (X,), None)[0]
+
+    def stats(self):
+        with self._lock:
+            calls, fallbacks, timeouts, failures = self.calls, self.fallbacks, self.timeouts, self.failures
+            saturated = self.saturated
+
+        return dict(
+            self.primary.stats(),
+            breaker=self.breaker.stats(),
+            budget_s=self.budget,
+            calls=calls,
+            timeouts=timeouts,
+            failures=failures,
+            saturated=saturated,
+            fallbacks=fallbacks,
+            fallback_rate=fallbacks / calls if calls else None,
+        )
@@ -0,0 +1,173 @@
+# Churn risk of every customer in the dataset, for the At-Risk Customers page
+import copy
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from filter_index import FILTER_COLUMNS, selected
+from predictors import model_inputs
+
+RISK_COLUMN = "ChurnRisk"
+CHUNK_SIZE = 100_000
+# Row number in the file, orders equal scores like RiskRanking does
+POSITION_COLUMN = "_position"
+
+
+def score(df, encoder, predictor, chunk_size=CHUNK_SIZE):
+    """Churn probability of every row of `df`, encoded and predicted `chunk_size` rows at a time."""
+    scores = np.empty(len(df), dtype=np.float32)
+    for start in range(0, len(df), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        will_leave, probability = predictor.predict_batch(encoder.transform(model_inputs(df.iloc[chunk])))
+        scores[chunk] = will_leave if probability is None else probability
+
+    return scores
+
+
+def cache_path(csv_path, encoder, predictor):
+    """Score file of this CSV version, model and encoder, next to the dataset snapshots."""
+    data_version = os.path.basename(data_loader.snapshot_dir(csv_path))
+    name = f"risk-{data_version}-{predictor.name}-{predictor.version}-{encoder.version}.npy"
+    return os.path.join(data_loader.snapshot_root(csv_path), name)
+
+
+def load_or_score(csv_path, df, encoder, predictor, mmap=False):
+    """Scores of `df`, computed once per dataset / model / encoder version and kept on disk (mapped with `mmap`)."""
+    path = cache_path(csv_path, encoder, predictor)
+    try:
+        scores = np.load(path, mmap_mode="r" if mmap else None)
+        if len(scores) == len(df):
+            return scores
+    except (OSError, ValueError):
+        pass
+
+    scores = score(df, encoder, predictor)
+
+    # Same pattern as the snapshots: write a private file, rename it into place, drop older versions
+    root = os.path.dirname(path)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    try:
+        os.makedirs(root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-risk-", suffix=".npy", dir=root)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, scores)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+
+        for name in os.listdir(root):
+            if name.startswith(f"risk-{stem}-v") and name != os.path.basename(path):
+                os.remove(os.path.join(root, name))
+    except OSError:
+        pass  # read only deployments score again on start up
+
+    return scores
+
+
+class RiskRanking:
+    """Customers ordered by churn risk, with the sidebar filters from a FilterIndex."""
+
+    def __init__(self, df, scores, index):
+        self.df = df
+        self.scores = scores
+        self.index = index
+        self.order = np.argsort(-scores, kind="stable")
+
+    def extended(self, df, scores, index):
+        """Ranking of `df`, the ranked frame with rows scored `scores` appended, over `index`.
+
+        The new rows are sorted on their own and merged into the order, one
+        pass over it instead of sorting every score again.
+        """
+        ranking = RiskRanking(df.head(0), scores[:0], index)
+        ranking.df = df
+        ranking.scores = np.concatenate([self.scores, scores])
+
+        new_order = np.argsort(-scores, kind="stable")
+        # After the old rows of the same score, as a stable sort of all the scores puts them
+        at = np.searchsorted(-self.scores[self.order], -scores[new_order], side="right")
+        ranking.order = np.insert(self.order, at, new_order + len(self.scores))
+
+        return ranking
+
+    def top(self, n, **filters):
+        """(`n` riskiest rows matching `filters` with a ChurnRisk column, rows matched, expected leavers)."""
+        positions = self.index.positions(**filters)
+        if positions is None:
+            chosen, matched, expected = self.order[:n], len(self.df), float(self.scores.sum())
+        else:
+            mask = np.zeros(len(self.df), dtype=bool)
+            mask[positions] = True
+            chosen = self.order[mask[self.order]][:n]
+            matched, expected = len(positions), float(self.scores[positions].sum())
+
+        rows = self.df.take(chosen)
+        rows.insert(1, RISK_COLUMN, self.scores[chosen].astype(np.float64).round(4))
+
+        return rows, matched, expected
+
+
+class TopRisk:
+    """RiskRanking for files streamed chunk by chunk (see streaming.py).
+
+    Keeps the `n` riskiest rows of every filter cell (Contract x
+    PaymentMethod x Churn) plus its row count and expected leavers, so
+    `top` answers for any filter combination and any count up to `n` with
+    memory independent of the file size.
+    """
+
+    def __init__(self, encoder, predictor, n=500, keys=FILTER_COLUMNS):
+        self.encoder = encoder
+        self.predictor = predictor
+        self.n = n
+        self.keys = list(keys)
+        self.rows_seen = 0
+        self.cells = {}  # cell -> (top rows, rows matched, expected leavers)
+        self._empty = None
+
+    def copy(self):
+        """Independent ranking with the same rows, `update` on it leaves this one alone."""
+        ranking = copy.copy(self)
+        # Cell values are replaced by update, never changed in place
+        ranking.cells = dict(self.cells)
+        return ranking
+
+    def update(self, df):
+        scores = score(df, self.encoder, self.predictor)
+        rows = df.assign(**{RISK_COLUMN: scores,
+                            POSITION_COLUMN: np.arange(self.rows_seen, self.rows_seen + len(df))})
+        self.rows_seen += len(df)
+        if self._empty is None:
+            self._empty = rows.head(0)
+
+        for cell, group in rows.groupby(self.keys, observed=True, sort=False):
+            top, matched, expected = self.cells.get(cell, (None, 0, 0.0))
+            # nlargest keeps the earlier row of equal scores, like the stable argsort of RiskRanking
+            best = group.nlargest(self.n, RISK_COLUMN, keep="first")
+            top = best if top is None else _riskiest(pd.concat([top, best]), self.n)
+            self.cells[cell] = (top, matched + len(group), expected + float(group[RISK_COLUMN].sum()))
+
+    def top(self, n, **filters):
+        """Same as RiskRanking.top, `n` at most the `n` given when built.
+
+        Range filters are not kept per cell, main.py hides them on this page.
+        """
+        if n > self.n:
+            raise ValueError(f"Only the top {self.n} customers of each filter cell are kept")
+
+        wanted = [selected(filters.get(key, "All")) for key in self.keys]
+        cells = [value for cell, value in self.cells.items()
+                 if all(values is None or part in values for values, part in zip(wanted, cell))]
+
+        rows = _riskiest(pd.concat([self._empty] + [top for top, _, _ in cells]), n)
+        rows.index = rows.pop(POSITION_COLUMN).to_numpy()
+        risk = rows.pop(RISK_COLUMN)
+        rows.insert(1, RISK_COLUMN, risk.astype(np.float64).round(4))
+
+        return rows, sum(matched for _, matched, _ in cells), sum(expected for _, _, expected in cells)
+
+
+def _riskiest(rows, n):
+    return rows.sort_values([RISK_COLUMN, POSITION_COLUMN], ascending=[False, True], kind="stable").head(n)
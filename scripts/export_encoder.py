@@ -0,0 +1,119 @@
+# Export the fitted transformer.pkl as encoder.json for feature_encoder.FeatureEncoder
+#   python scripts/export_encoder.py --transformer transformer.pkl --output encoder.json
+#
+# The file is only written once the encoder gives the same features as
+# transformer.transform on every customer of the dataset and on random inputs.
+import argparse
+import itertools
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import data_loader  # noqa: E402
+from feature_encoder import FeatureEncoder  # noqa: E402
+from predictors import FEATURES, INPUT_COLUMNS, model_inputs  # noqa: E402
+
+
+def last_step(transformer):
+    return transformer.steps[-1][1] if hasattr(transformer, "steps") else transformer
+
+
+def export(column_transformer):
+    """FeatureEncoder with the categories, scales and offsets of the fitted ColumnTransformer."""
+    categorical, numerical = [], []
+    for name, transformer, columns in column_transformer.transformers_:
+        if name == "remainder":
+            if transformer != "drop" and len(columns):
+                raise ValueError("Columns passed through unchanged are not supported")
+            continue
+
+        step = last_step(transformer)
+        if isinstance(step, OneHotEncoder):
+            if numerical:
+                raise ValueError("The one hot columns have to come before the scaled ones")
+            if step.handle_unknown != "ignore":
+                raise ValueError("Only handle_unknown='ignore' is supported, unknown values become zeros")
+
+            for i, column in enumerate(columns):
+                categories = step.categories_[i].tolist()
+                if step.drop_idx_ is not None and step.drop_idx_[i] is not None:
+                    del categories[step.drop_idx_[i]]
+                categorical.append((column, categories))
+
+        elif isinstance(step, MinMaxScaler):
+            if step.clip:
+                raise ValueError("MinMaxScaler(clip=True) is not supported")
+            numerical.extend(zip(columns, step.scale_.tolist(), step.min_.tolist()))
+
+        else:
+            raise ValueError(f"Unsupported transformer {name}: {type(step).__name__}")
+
+    return FeatureEncoder(categorical, numerical, FEATURES)
+
+
+def random_inputs(encoder, n_rows, seed=0):
+    """Random customers, including categories the transformer never saw."""
+    rng = np.random.default_rng(seed)
+    rows = {}
+    for column, categories in encoder.categorical:
+        choices = categories + ["Unknown"]
+        rows[column] = rng.choice(np.array(choices, dtype=object), n_rows)
+
+    for column in encoder.numerical:
+        rows[column] = rng.uniform(-10, 10_000, n_rows).round(2)
+
+    return pd.DataFrame(rows)[INPUT_COLUMNS]
+
+
+def check_parity(column_transformer, encoder, inputs):
+    expected = np.asarray(column_transformer.transform(inputs), dtype=np.float64)
+
+    batch = encoder.transform(inputs)
+    if not np.array_equal(batch, expected):
+        worst = np.abs(batch - expected).max()
+        raise AssertionError(f"batch encoding differs from transformer.transform (max abs diff {worst})")
+
+    # Dicts of plain values, as the prediction form sends them
+    for row, expected_row in itertools.islice(zip(inputs.to_dict("records"), expected), 2000):
+        if not np.array_equal(encoder.transform_one(row), expected_row):
+            raise AssertionError(f"single row encoding differs from transformer.transform for {row}")
+
+    # Structured arrays
+    records = inputs.to_records(index=False)
+    if not np.array_equal(encoder.transform(records), expected):
+        raise AssertionError("structured array encoding differs from transformer.transform")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transformer", default=os.path.join(REPO_ROOT, "transformer.pkl"))
+    parser.add_argument("--data", default=os.path.join(REPO_ROOT, "Telco-Customer-Churn.csv"))
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "encoder.json"))
+    args = parser.parse_args()
+
+    column_transformer = pd.read_pickle(args.transformer)
+    encoder = export(column_transformer)
+
+    dataset = model_inputs(data_loader.load_csv(args.data))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # unknown categories in the random inputs
+        check_parity(column_transformer, encoder, dataset)
+        check_parity(column_transformer, encoder, random_inputs(encoder, 20_000))
+
+    with open(args.output, "w") as f:
+        json.dump(encoder.to_dict(), f, indent=2)
+        f.write("\n")
+
+    print(f"parity checked on {len(dataset):,d} customers and 20,000 random rows, encoder written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
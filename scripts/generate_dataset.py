@@ -0,0 +1,40 @@
+# Synthetic customer datasets of any size in the Telco schema, for scale benchmarks
+#   python scripts/generate_dataset.py --rows 1e7 --output telco-10m.csv
+#   python scripts/generate_dataset.py --rows 5e7 --format snapshot --output telco-50m
+#
+# The distributions are learned from --source (see synthetic.py). The same
+# --seed and --chunk-rows always give the same customers.
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import synthetic  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=float, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--format", choices=["csv", "snapshot"], default="csv",
+                        help="snapshot: cleaned columns as .npy files, read with data_loader.read_snapshot")
+    parser.add_argument("--source", default=synthetic.SOURCE_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = synthetic.SyntheticTelco.fit(args.source)
+    write = synthetic.write_csv if args.format == "csv" else synthetic.write_snapshot
+    write(model, args.output, int(args.rows), seed=args.seed, chunk_rows=args.chunk_rows)
+
+    seconds = time.perf_counter() - start
+    print(f"{int(args.rows):,d} customers written to {args.output} in {seconds:.1f}s "
+          f"({args.rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
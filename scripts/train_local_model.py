@@ -0,0 +1,109 @@
+# Fit the in-process churn model used by PREDICTOR_BACKEND=local
+#   python scripts/train_local_model.py --output local_model.npz
+#
+# A small dense network (15 -> hidden -> 1, sigmoid) over the encoder.json
+# features (transformer.pkl, see feature_encoder.py), trained with full batch
+# Adam in plain NumPy and saved in the layout predictors.LocalPredictor reads.
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import data_loader  # noqa: E402
+from feature_encoder import FeatureEncoder  # noqa: E402
+from predictors import FEATURES, LocalPredictor, model_inputs  # noqa: E402
+
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def train(X, y, hidden=16, epochs=3000, learning_rate=0.01, l2=1e-4, seed=42):
+    rng = np.random.default_rng(seed)
+    params = {
+        "W0": rng.normal(0, np.sqrt(2 / X.shape[1]), (X.shape[1], hidden)),
+        "b0": np.zeros(hidden),
+        "W1": rng.normal(0, np.sqrt(1 / hidden), (hidden, 1)),
+        "b1": np.zeros(1),
+    }
+    moments = {name: (np.zeros_like(value), np.zeros_like(value)) for name, value in params.items()}
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    y = y[:, None]
+
+    for step in range(1, epochs + 1):
+        hidden_in = X @ params["W0"] + params["b0"]
+        hidden_out = np.maximum(hidden_in, 0)
+        output = sigmoid(hidden_out @ params["W1"] + params["b1"])
+
+        # Binary cross entropy gradients
+        d_output = (output - y) / len(X)
+        d_hidden = (d_output @ params["W1"].T) * (hidden_in > 0)
+        grads = {
+            "W1": hidden_out.T @ d_output + l2 * params["W1"],
+            "b1": d_output.sum(axis=0),
+            "W0": X.T @ d_hidden + l2 * params["W0"],
+            "b0": d_hidden.sum(axis=0),
+        }
+
+        for name, grad in grads.items():
+            m, v = moments[name]
+            m[:] = beta1 * m + (1 - beta1) * grad
+            v[:] = beta2 * v + (1 - beta2) * grad ** 2
+            m_hat = m / (1 - beta1 ** step)
+            v_hat = v / (1 - beta2 ** step)
+            params[name] -= learning_rate * m_hat / (np.sqrt(v_hat) + eps)
+
+    return params
+
+
+def roc_auc(y, scores):
+    ranks = pd.Series(scores).rank().to_numpy()
+    positives = y.sum()
+    negatives = len(y) - positives
+
+    return (ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=os.path.join(REPO_ROOT, "Telco-Customer-Churn.csv"))
+    parser.add_argument("--encoder", default=os.path.join(REPO_ROOT, "encoder.json"))
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "local_model.npz"))
+    parser.add_argument("--hidden", type=int, default=16)
+    parser.add_argument("--epochs", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    df = data_loader.load_csv(args.data)
+    X = FeatureEncoder.load(args.encoder).transform(model_inputs(df))
+    y = (df["Churn"].astype(str) == "Yes").to_numpy(dtype=np.float64)
+    assert X.shape[1] == len(FEATURES)
+
+    # Hold out 20% of the customers to report accuracy, then refit on everything
+    order = np.random.default_rng(args.seed).permutation(len(X))
+    test, fit = order[:len(X) // 5], order[len(X) // 5:]
+
+    params = train(X[fit], y[fit], hidden=args.hidden, epochs=args.epochs, seed=args.seed)
+    scores = sigmoid(np.maximum(X[test] @ params["W0"] + params["b0"], 0) @ params["W1"] + params["b1"])[:, 0]
+    print(f"held out accuracy {((scores >= 0.5) == y[test]).mean():.3f}, ROC AUC {roc_auc(y[test], scores):.3f} "
+          f"({len(test):,d} customers, churn rate {y[test].mean():.1%})")
+
+    params = train(X, y, hidden=args.hidden, epochs=args.epochs, seed=args.seed)
+    np.savez(args.output, activations=np.array(["relu", "sigmoid"]),
+             **{name: value.astype(np.float32) for name, value in params.items()})
+
+    # The saved model has to give the same answers as the weights it was built from
+    saved = LocalPredictor(args.output).predict_proba(X)
+    expected = sigmoid(np.maximum(X @ params["W0"] + params["b0"], 0) @ params["W1"] + params["b1"])[:, 0]
+    assert np.allclose(saved, expected, atol=1e-5), "saved model does not match the trained weights"
+
+    print(f"model written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# Chart counts and KPI cards as SQL queries against an SQLite copy of the dataset
+#
+# The CSV is cleaned chunk by chunk (see streaming.py) into one table, the
+# categorical columns as the same integer codes the pandas Categoricals use,
+# with indexes on the sidebar filter columns. Every chart is then one
+# `SELECT ... WHERE <filters> GROUP BY <column>` run by SQLite on its own
+# pages, so the app never holds the rows and the dataset may be larger than
+# memory. The results are the same as AggregateCube's (see cube.py).
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import streaming
+from cube import SENIOR_CATEGORIES, TENURE_EDGES, TENURE_LABELS
+from filter_index import FILTER_COLUMNS, RANGE_COLUMNS, selected
+
+# Bump this whenever the table layout or the cleaning (see data_loader.clean_rows) changes,
+# older databases are then rebuilt
+SQL_VERSION = 2
+TABLE = "customers"
+# Pages SQLite reads through a memory map, shared with every other worker through the OS page cache
+MMAP_BYTES = 1024 * 1024 * 1024
+
+# Same buckets as cube.column_codes: upper edges inclusive, the rest not counted
+TENURE_BUCKET = "CASE WHEN tenure < 0 THEN -1 {} ELSE -1 END".format(
+    " ".join(f"WHEN tenure <= {edge} THEN {code}" for code, edge in enumerate(TENURE_EDGES)))
+
+
+def column_type(dtype):
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteWriter:
+    """Aggregator for streaming.stream_dataset that appends every cleaned chunk to the table."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.columns = None
+        self.rows = 0
+
+    def update(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            definition = ", ".join(f"{quote(c)} {column_type(df[c].dtype)}" for c in self.columns)
+            self.connection.execute(f"CREATE TABLE {TABLE} ({definition})")
+
+        values = []
+        for column in self.columns:
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # -1 like the pandas codes: a value outside the schema, never counted
+                values.append(series.cat.codes.to_numpy().astype(np.int64).tolist())
+            else:
+                values.append(series.tolist())
+
+        placeholders = ", ".join("?" * len(self.columns))
+        self.connection.executemany(f"INSERT INTO {TABLE} VALUES ({placeholders})", zip(*values))
+        self.rows += len(df)
+
+
+def cache_path(csv_path):
+    """Database of this CSV version, next to the dataset snapshots."""
+    data_version = os.path.basename(data_loader.snapshot_dir(csv_path))
+    return os.path.join(data_loader.snapshot_root(csv_path), f"sql-{data_version}-s{SQL_VERSION}.sqlite")
+
+
+def build(csv_path, path, chunk_rows):
+    """Write the cleaned rows of `csv_path` to a new database at `path`."""
+    connection = sqlite3.connect(path)
+    try:
+        # A half written file is thrown away, no journal needed
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+
+        writer = SQLiteWriter(connection)
+        median = streaming.stream_dataset(csv_path, [writer], chunk_rows)
+
+        for column in FILTER_COLUMNS:
+            connection.execute(f"CREATE INDEX {TABLE}_{column} ON {TABLE} ({quote(column)})")
+        connection.execute("ANALYZE")
+
+        meta = {"version": SQL_VERSION, "rows": writer.rows, "total_charges_median": median}
+        connection.execute("CREATE TABLE meta (value TEXT)")
+        connection.execute("INSERT INTO meta VALUES (?)", (json.dumps(meta),))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def load_or_build(csv_path, chunk_rows):
+    """Path of the database of `csv_path`, built on first use and kept until the CSV changes.
+
+    One worker builds it, the others wait on the lock and open the same file.
+    """
+    with data_loader.build_lock(csv_path):
+        path = cache_path(csv_path)
+        if os.path.exists(path):
+            return path
+
+        # Same pattern as the snapshots: write a private file, rename it into place, drop older versions
+        root = os.path.dirname(path)
+        os.makedirs(root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-sql-", suffix=".sqlite", dir=root)
+        os.close(fd)
+        try:
+            build(csv_path, tmp, chunk_rows)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        stem = os.path.splitext(os.path.basename(csv_path))[0]
+        for name in os.listdir(root):
+            if name.startswith(f"sql-{stem}-v") and name != os.path.basename(path):
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
+
+    return path
+
+
+class SQLBackend:
+    """AggregateCube's `counts` and `kpis`, answered by SQLite instead of precomputed arrays.
+
+    Filters become `WHERE column IN (codes)` on the indexed filter columns,
+    the range sliders `BETWEEN`, and each chart one GROUP BY, so only the few
+    dozen result rows come back to Python. Every thread gets its own read
+    only connection.
+    """
+
+    def __init__(self, path, keys=FILTER_COLUMNS):
+        self.path = path
+        self.keys = keys
+        self._local = threading.local()
+
+        meta = json.loads(self._query("SELECT value FROM meta")[0][0])
+        if meta["version"] != SQL_VERSION:
+            raise ValueError(f"Database version {meta['version']} != {SQL_VERSION}")
+        self.rows = meta["rows"]
+        self.total_charges_median = meta["total_charges_median"]
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            connection.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+            self._local.connection = connection
+
+        return connection
+
+    def _query(self, sql, parameters=()):
+        return self._connection().execute(sql, parameters).fetchall()
+
+    def _where(self, filters):
+        """WHERE clause and parameters of the sidebar `filters`, rows with a key outside the schema never count."""
+        conditions = [f"min({', '.join(quote(k) for k in self.keys)}) >= 0"]
+        parameters = []
+        for key in self.keys:
+            values = selected(filters.get(key, "All"))
+            if values is None:
+                continue
+            categories = data_loader.CATEGORIES[key]
+            conditions.append(f"{quote(key)} IN ({', '.join('?' * len(values))})")
+            parameters += [categories.index(v) if v in categories else -1 for v in values]
+
+        for column in RANGE_COLUMNS:
+            if filters.get(column) is not None:
+                conditions.append(f"{quote(column)} BETWEEN ? AND ?")
+                parameters += [float(i) for i in filters[column]]
+
+        return " AND ".join(conditions), parameters
+
+    def bounds(self, column):
+        """(lowest, highest) value of a range filter column."""
+        return tuple(self._query(f"SELECT min({quote(column)}), max({quote(column)}) FROM {TABLE}")[0])
+
+    @staticmethod
+    def _column(column):
+        """SQL expression of the category code of `column` and the category labels."""
+        if column == "tenure":
+            return TENURE_BUCKET, TENURE_LABELS
+        if column == "SeniorCitizen":
+            return quote(column), SENIOR_CATEGORIES
+        return quote(column), data_loader.CATEGORIES[column]
+
+    def counts(self, column, **filters):
+        """Same numbers as df[column].value_counts() under `filters`."""
+        expression, categories = self._column(column)
+        where, parameters = self._where(filters)
+        rows = self._query(f"SELECT {expression}, count(*) FROM {TABLE} WHERE {where} GROUP BY 1", parameters)
+
+        counts = np.zeros(len(categories), dtype=np.int64)
+        for code, count in rows:
+            if column == "SeniorCitizen":
+                code = SENIOR_CATEGORIES.index(code) if code in SENIOR_CATEGORIES else -1
+            if 0 <= code < len(categories):
+                counts[code] += count
+
+        counts = pd.Series(counts, index=pd.Index(categories, name=column), name="count")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def kpis(self, **filters):
+        where, parameters = self._where(filters)
+        churned = data_loader.CATEGORIES["Churn"].index("Yes")
+        customers, rows, total_charges, churned = self._query(
+            f"SELECT count(DISTINCT customerID), count(*), total(TotalCharges), total(Churn = {churned}) "
+            f"FROM {TABLE} WHERE {where}", parameters)[0]
+
+        return {
+            "customers": int(customers),
+            "rows": int(rows),
+            "total_charges": float(total_charges),
+            "churned": int(churned),
+        }
+
+    def first_seen(self, column):
+        """Categories of `column` in order of first appearance, as Series.unique() gives them."""
+        categories = data_loader.CATEGORIES[column]
+        rows = self._query(f"SELECT {quote(column)} FROM {TABLE} WHERE {quote(column)} >= 0 "
+                           f"GROUP BY 1 ORDER BY min(rowid)")
+        return [categories[code] for code, in rows]
@@ -0,0 +1,169 @@
+# Chunked loading of customer CSVs too large to hold as one DataFrame
+#
+# The file is read twice, one chunk at a time: first only TotalCharges, into a
+# quantile sketch for the median the cleaning fills blanks with, then every
+# column, cleaned like data_loader.clean_dataset and handed to aggregators
+# (AggregateCube, FirstSeen, risk.TopRisk) that keep what the pages need.
+# Peak memory follows the chunk size, not the file size, once AggregateCube
+# counts its distinct customers with a DistinctSketch (see max_exact_ids).
+import numpy as np
+import pandas as pd
+
+import data_loader
+
+
+class QuantileSketch:
+    """Approximate quantiles of a stream of numbers in bounded memory.
+
+    A stack of compactors (the KLL / Manku-Rajagopalan-Lindsay scheme): each
+    level holds at most `k` values; a full level is sorted and every other
+    value, from a random start, moves up one level where it weighs twice as
+    much. Memory is about `k` values per level, log2(n / k) levels, and rank
+    errors stay around (levels / k). Until more than `k` values are seen the
+    answers are exact, the same as numpy and pandas.
+    """
+
+    def __init__(self, k=16384, seed=0):
+        self.k = k
+        self.count = 0
+        self._levels = [[]]
+        self._sizes = [0]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+
+        self.count += len(values)
+        self._levels[0].append(values)
+        self._sizes[0] += len(values)
+        self._compact()
+
+    def _compact(self):
+        level = 0
+        while level < len(self._levels):
+            if self._sizes[level] > self.k:
+                values = np.sort(np.concatenate(self._levels[level]))
+                # An odd value out stays on this level, the rest pair up
+                kept = values[len(values) - len(values) % 2:]
+                promoted = values[:len(values) - len(kept)][self._rng.integers(2)::2]
+
+                self._levels[level], self._sizes[level] = [kept], len(kept)
+                if level + 1 == len(self._levels):
+                    self._levels.append([])
+                    self._sizes.append(0)
+                self._levels[level + 1].append(promoted)
+                self._sizes[level + 1] += len(promoted)
+
+            level += 1
+
+    def quantile(self, q):
+        if not self.count:
+            return float("nan")
+
+        if len(self._levels) == 1:
+            return float(np.quantile(np.concatenate(self._levels[0]), q))
+
+        values = np.concatenate([np.concatenate(level) for level in self._levels if level])
+        weights = np.concatenate([np.full(size, 2 ** i, dtype=np.int64)
+                                  for i, size in enumerate(self._sizes) if size])
+        order = np.argsort(values, kind="stable")
+        ranks = np.cumsum(weights[order])
+
+        return float(values[order][min(np.searchsorted(ranks, q * ranks[-1]), len(values) - 1)])
+
+
+class DistinctSketch:
+    """Approximate distinct counts of several sets of 64-bit hashes in bounded memory.
+
+    One HyperLogLog (Flajolet et al.) per set: the first `precision` bits of
+    a hash pick one of m = 2 ** precision registers, which keeps the longest
+    run of leading zeros of the remaining bits. Any union of sets is the
+    register-wise max, so the sets can be combined after the fact. Memory is
+    m bytes per set, the standard error about 1.04 / sqrt(m) (0.8% for the
+    default), small counts fall back to linear counting.
+    """
+
+    def __init__(self, n_sets, precision=14):
+        self.precision = precision
+        self.registers = np.zeros((n_sets, 2 ** precision), dtype=np.uint8)
+
+    def copy(self):
+        sketch = DistinctSketch.__new__(DistinctSketch)
+        sketch.precision = self.precision
+        sketch.registers = self.registers.copy()
+        return sketch
+
+    def update(self, sets, hashes):
+        """Add `hashes` (uint64) to the sets of the same positions in `sets`."""
+        bits = 64 - self.precision
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # Exact in float64: rest has fewer than 53 bits, frexp gives its bit length (0 for 0)
+        rank = bits + 1 - np.frexp(rest.astype(np.float64))[1]
+        np.maximum.at(self.registers, (sets, (hashes >> np.uint64(bits)).astype(np.int64)), rank.astype(np.uint8))
+
+    def count(self, sets):
+        """Estimated number of distinct hashes in the union of `sets`."""
+        registers = self.registers[np.asarray(sets, dtype=np.int64)]
+        if not len(registers):
+            return 0
+
+        registers = registers.max(axis=0)
+        m = len(registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.ldexp(1.0, -registers.astype(np.int64)).sum()
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+
+        return int(round(estimate))
+
+
+class FirstSeen:
+    """Distinct values of `columns` in order of first appearance, as Series.unique() gives them."""
+
+    def __init__(self, columns):
+        self.values = {column: [] for column in columns}
+
+    def copy(self):
+        first_seen = FirstSeen([])
+        first_seen.values = {column: list(seen) for column, seen in self.values.items()}
+        return first_seen
+
+    def update(self, df):
+        for column, seen in self.values.items():
+            # Values outside the schema are NaN, never a choice of the sidebar
+            for value in df[column].dropna().unique().tolist():
+                if value not in seen:
+                    seen.append(value)
+
+
+def read_chunks(csv_path, chunk_rows, **kwargs):
+    return pd.read_csv(csv_path, chunksize=chunk_rows, **kwargs)
+
+
+def total_charges_median(csv_path, chunk_rows):
+    """Median of TotalCharges after parsing (blanks as 0), from one pass over that column."""
+    sketch = QuantileSketch()
+    for chunk in read_chunks(csv_path, chunk_rows, usecols=["TotalCharges"]):
+        sketch.update(data_loader.parse_total_charges(chunk["TotalCharges"]).to_numpy())
+
+    return sketch.quantile(0.5)
+
+
+def stream_dataset(csv_path, aggregators, chunk_rows, median=None):
+    """Clean `csv_path` chunk by chunk and pass each chunk to `aggregator.update`.
+
+    Returns the TotalCharges median used, pass it back in to stream the same
+    file again without the extra pass.
+    """
+    if median is None:
+        median = total_charges_median(csv_path, chunk_rows)
+
+    for chunk in read_chunks(csv_path, chunk_rows):
+        chunk, _ = data_loader.clean_rows(chunk, total_charges_median=median)
+        for aggregator in aggregators:
+            aggregator.update(chunk)
+
+    return median
@@ -0,0 +1,340 @@
+# Synthetic customers in the Telco schema, learned from the shipped CSV, for scale benchmarks
+#   python scripts/generate_dataset.py --rows 1e7 --out telco-10m.csv
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import streaming
+
+# Columns in the order of Telco-Customer-Churn.csv
+COLUMNS = ["customerID", "gender", "SeniorCitizen", "Partner", "Dependents", "tenure", "PhoneService",
+           "MultipleLines", "InternetService", "OnlineSecurity", "OnlineBackup", "DeviceProtection",
+           "TechSupport", "StreamingTV", "StreamingMovies", "Contract", "PaperlessBilling", "PaymentMethod",
+           "MonthlyCharges", "TotalCharges", "Churn"]
+
+# Customer age groups: long standing customers have more services and their TotalCharges stay
+# closer to tenure x MonthlyCharges (price changes average out). Upper edges are inclusive.
+TENURE_BAND_EDGES = [1, 12, 24, 48, 72]
+TENURE_BANDS = ["0-1", "2-12", "13-24", "25-48", "49-72"]
+
+# Each categorical column is drawn from its distribution given these columns, in this order.
+# Contract x Churn is the joint every chart is sliced by; services also depend on how long the
+# customer stayed (TenureBand, derived from tenure), and the add-ons follow their parent service,
+# so "No internet service" only ever appears next to InternetService "No".
+PARENTS = {
+    "Contract": (),
+    "Churn": ("Contract",),
+    "gender": ("Contract", "Churn"),
+    "SeniorCitizen": ("Contract", "Churn"),
+    "Partner": ("Contract", "Churn"),
+    "Dependents": ("Partner", "Churn"),
+    "tenure": ("Contract", "Churn"),
+    "PhoneService": ("Contract", "TenureBand", "Churn"),
+    "MultipleLines": ("PhoneService", "TenureBand", "Churn"),
+    "InternetService": ("Contract", "TenureBand", "Churn"),
+    "OnlineSecurity": ("InternetService", "TenureBand", "Churn"),
+    "OnlineBackup": ("InternetService", "TenureBand", "Churn"),
+    "DeviceProtection": ("InternetService", "TenureBand", "Churn"),
+    "TechSupport": ("InternetService", "TenureBand", "Churn"),
+    "StreamingTV": ("InternetService", "TenureBand", "Churn"),
+    "StreamingMovies": ("InternetService", "TenureBand", "Churn"),
+    "PaperlessBilling": ("Contract", "Churn"),
+    "PaymentMethod": ("Contract", "Churn"),
+}
+NUMERIC_CODES = ("SeniorCitizen", "tenure")
+
+
+# MonthlyCharges follow the services a customer has and for how long
+CHARGES_PARENTS = ("InternetService", "PhoneService", "StreamingTV", "StreamingMovies", "TenureBand")
+
+# Points of the learned quantile functions
+QUANTILES = np.linspace(0, 1, 201)
+
+# Values data_loader.clean_dataset turns into "No"
+CLEANED_TO_NO = ("No internet service", "No phone service")
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Telco-Customer-Churn.csv")
+
+
+class SyntheticTelco:
+    """Per-column distributions of the Telco CSV, and customers drawn from them.
+
+    Categorical columns (tenure included, it only takes 73 values) keep their
+    frequencies given their PARENTS. MonthlyCharges come from a quantile
+    function per combination of services, and TotalCharges from tenure x
+    MonthlyCharges x a ratio learned per tenure band (discounts, price
+    changes), blank for customers without a first bill like in the real file.
+    Money is drawn in whole cents, so writing it out needs no float formatting.
+    """
+
+    def __init__(self, tables, charges, ratio):
+        self.tables = tables
+        self.charges = charges
+        self.ratio = ratio
+
+        # One cumulative distribution per combination of parent values, every row shifted by its
+        # combination number so a single searchsorted draws a whole column (see _draw)
+        self._cumulative = {}
+        for column, parents in PARENTS.items():
+            table = tables[column]
+            default = np.mean(list(table["conditional"].values()), axis=0)
+            rows = np.tile(default, (_n_cells(self._values(parents)), 1))
+            for key, probabilities in table["conditional"].items():
+                rows[_cell_index(self._values(parents), key)] = probabilities
+
+            cumulative = np.cumsum(rows, axis=1)
+            cumulative[:, -1] = 1.0
+            self._cumulative[column] = (cumulative + np.arange(len(rows))[:, None]).ravel()
+
+        self._charges = _quantile_table(self._values(CHARGES_PARENTS), charges)
+        self._ratio = _quantile_table([TENURE_BANDS], ratio)
+
+    def _values(self, columns):
+        return [TENURE_BANDS if column == "TenureBand" else self.tables[column]["values"] for column in columns]
+
+    @classmethod
+    def fit(cls, csv_path=SOURCE_PATH):
+        raw = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+        raw["TenureBand"] = np.array(TENURE_BANDS)[_tenure_bands(raw["tenure"].astype(int).to_numpy())]
+
+        tables = {}
+        for column, parents in PARENTS.items():
+            values = sorted(raw[column].unique().tolist(), key=_sort_key)
+            groups = raw.groupby(list(parents), sort=True) if parents else [((), raw)]
+            conditional = {}
+            for key, group in groups:
+                counts = group[column].value_counts().reindex(values, fill_value=0).to_numpy()
+                conditional[_key(key)] = (counts / counts.sum()).tolist()
+
+            tables[column] = {"values": values, "conditional": conditional}
+
+        monthly = raw["MonthlyCharges"].astype(float)
+        charges = {_key(key): np.quantile(group, QUANTILES).tolist()
+                   for key, group in monthly.groupby([raw[p] for p in CHARGES_PARENTS])}
+
+        billed = raw[raw["TotalCharges"].str.strip() != ""]
+        ratio = billed["TotalCharges"].astype(float) / (billed["tenure"].astype(float) *
+                                                         billed["MonthlyCharges"].astype(float))
+        ratio = {band: np.quantile(group, QUANTILES).tolist() for band, group in ratio.groupby(billed["TenureBand"])}
+
+        return cls(tables, charges, ratio)
+
+    def to_dict(self):
+        return {"tables": self.tables, "charges": self.charges, "ratio": self.ratio}
+
+    def _draw(self, column, codes, n_rows, rng):
+        parents = PARENTS[column]
+        cells = _cells(self._values(parents), [codes[p] for p in parents]) if parents else 0
+        n_values = len(self.tables[column]["values"])
+
+        # Row c of the table lies in [c, c + 1], so c + u finds the value within row c
+        drawn = np.searchsorted(self._cumulative[column], cells + rng.random(n_rows), side="right")
+        return np.minimum(drawn - cells * n_values, n_values - 1)
+
+    def draw(self, n_rows, rng):
+        """Category codes of every categorical column, MonthlyCharges and TotalCharges in cents (-1 blank)."""
+        codes = {}
+        for column in PARENTS:
+            codes[column] = self._draw(column, codes, n_rows, rng)
+            if column == "tenure":
+                tenure = np.array(self.tables["tenure"]["values"], dtype=np.int64)[codes["tenure"]]
+                codes["TenureBand"] = _tenure_bands(tenure)
+
+        cells = _cells(self._values(CHARGES_PARENTS), [codes[p] for p in CHARGES_PARENTS])
+        monthly = _draw_quantiles(self._charges, cells, rng.random(n_rows))
+        # Prices move in steps of 5 cents
+        codes["MonthlyCharges"] = np.rint(monthly * 20).astype(np.int64) * 5
+
+        ratio = _draw_quantiles(self._ratio, codes.pop("TenureBand"), rng.random(n_rows))
+        total = np.rint(tenure * codes["MonthlyCharges"] * ratio).astype(np.int64)
+        codes["TotalCharges"] = np.where(tenure > 0, np.maximum(total, codes["MonthlyCharges"]), -1)
+
+        return codes
+
+    def sample(self, n_rows, rng, first_id=0, id_digits=7):
+        """DataFrame of `n_rows` customers with raw CSV values, drawn with the numpy Generator `rng`.
+
+        TotalCharges is NaN where the CSV has a blank.
+        """
+        codes = self.draw(n_rows, rng)
+
+        columns = {"customerID": _customer_ids(first_id, n_rows, id_digits)}
+        for column in PARENTS:
+            values = self.tables[column]["values"]
+            if column in NUMERIC_CODES:
+                columns[column] = np.array(values, dtype=np.int64)[codes[column]]
+            else:
+                columns[column] = pd.Categorical.from_codes(codes[column], values)
+
+        columns["MonthlyCharges"] = codes["MonthlyCharges"] / 100
+        columns["TotalCharges"] = np.where(codes["TotalCharges"] >= 0, codes["TotalCharges"] / 100, np.nan)
+
+        return pd.DataFrame({column: columns[column] for column in COLUMNS})
+
+    def csv_lines(self, n_rows, rng, first_id=0, id_digits=7):
+        """Same customers as `sample`, as CSV text (without header) built from lookup tables."""
+        codes = self.draw(n_rows, rng)
+
+        columns = {"customerID": _customer_ids(first_id, n_rows, id_digits).astype(object)}
+        for column in PARENTS:
+            columns[column] = np.array(self.tables[column]["values"], dtype=object)[codes[column]]
+
+        columns["MonthlyCharges"] = _money(codes["MonthlyCharges"])
+        columns["TotalCharges"] = _money(codes["TotalCharges"])
+
+        return "\n".join(map(",".join, zip(*[columns[column] for column in COLUMNS]))) + "\n"
+
+
+def _tenure_bands(tenure):
+    return np.searchsorted(TENURE_BAND_EDGES, tenure, side="left")
+
+
+def _quantile_table(parent_values, quantiles):
+    """Quantile functions as rows of a matrix, one per combination of parent values.
+
+    Combinations the CSV never shows get the average of the others.
+    """
+    table = np.tile(np.mean(list(quantiles.values()), axis=0), (_n_cells(parent_values), 1))
+    for key, values in quantiles.items():
+        table[_cell_index(parent_values, key)] = values
+    return table
+
+
+def _draw_quantiles(table, cells, u):
+    """Row `cells` of the quantile `table` evaluated at `u`, by linear interpolation."""
+    position = u * (len(QUANTILES) - 1)
+    lower = position.astype(np.int64)
+    upper = np.minimum(lower + 1, len(QUANTILES) - 1)
+    return table[cells, lower] + (position - lower) * (table[cells, upper] - table[cells, lower])
+
+
+def _money(cents):
+    """Cents as "1889.50", -1 as the blank " " of customers without a first bill."""
+    dollars = np.array([str(i) for i in range(max(int(cents.max()) // 100 + 1, 1))], dtype=object)
+    decimals = np.array([f".{i:02d}" for i in range(100)], dtype=object)
+    text = dollars[np.maximum(cents, 0) // 100] + decimals[np.maximum(cents, 0) % 100]
+    text[cents < 0] = " "
+    return text
+
+
+def _sort_key(value):
+    return (0, float(value), "") if value.replace(".", "", 1).isdigit() else (1, 0.0, value)
+
+
+def _key(key):
+    """Group key of pandas as a string, so the model stays JSON friendly."""
+    return "|".join(key if isinstance(key, tuple) else (key,))
+
+
+def _n_cells(parent_values):
+    return int(np.prod([len(values) for values in parent_values]))
+
+
+def _cells(parent_values, parent_codes):
+    """Combination of parent values of every row, as one integer."""
+    cells = 0
+    for values, codes in zip(parent_values, parent_codes):
+        cells = cells * len(values) + codes
+    return cells
+
+
+def _cell_index(parent_values, key):
+    cell = 0
+    for values, part in zip(parent_values, key.split("|") if parent_values else []):
+        cell = cell * len(values) + values.index(part)
+    return cell
+
+
+def _customer_ids(first_id, n_rows, width):
+    """Unique ids like 0000042-SYN, built as bytes instead of one Python string at a time."""
+    digits = np.arange(first_id, first_id + n_rows)[:, None] // 10 ** np.arange(width - 1, -1, -1) % 10
+    text = np.concatenate([(digits + ord("0")).astype(np.uint8),
+                           np.broadcast_to(np.frombuffer(b"-SYN", dtype=np.uint8), (n_rows, 4))], axis=1)
+
+    return np.ascontiguousarray(text).view(f"S{width + 4}").ravel().astype(f"U{width + 4}")
+
+
+def id_digits(n_rows):
+    """Digits of the customer ids of an `n_rows` dataset, at least 7 like make_dataset always used."""
+    return max(7, len(str(n_rows - 1)))
+
+
+def _generators(n_rows, seed, chunk_rows):
+    """(first row, rows, numpy Generator) of every chunk, the same for a given seed and chunk size."""
+    streams = np.random.SeedSequence(seed).spawn((n_rows + chunk_rows - 1) // chunk_rows)
+    for i, stream in enumerate(streams):
+        start = i * chunk_rows
+        yield start, min(chunk_rows, n_rows - start), np.random.default_rng(stream)
+
+
+def chunks(model, n_rows, seed=0, chunk_rows=1_000_000):
+    """Customers as DataFrames of `chunk_rows` rows."""
+    for start, rows, rng in _generators(n_rows, seed, chunk_rows):
+        yield model.sample(rows, rng, first_id=start, id_digits=id_digits(n_rows))
+
+
+def write_csv(model, path, n_rows, seed=0, chunk_rows=1_000_000):
+    """`n_rows` customers in the layout of Telco-Customer-Churn.csv."""
+    with open(path, "w", newline="") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        for start, rows, rng in _generators(n_rows, seed, chunk_rows):
+            f.write(model.csv_lines(rows, rng, first_id=start, id_digits=id_digits(n_rows)))
+
+    return path
+
+
+def write_snapshot(model, path, n_rows, seed=0, chunk_rows=1_000_000):
+    """Cleaned columns in the snapshot layout of data_loader.py, read back with data_loader.read_snapshot.
+
+    Every column is a memory mapped .npy filled chunk by chunk, so memory
+    stays bounded by `chunk_rows` whatever `n_rows` is. Blank TotalCharges get
+    the median from a quantile sketch, as the streaming loader does. Same
+    customers as write_csv with the same seed and chunk size.
+    """
+    os.makedirs(path, exist_ok=True)
+    files, sketch, blanks = {}, streaming.QuantileSketch(), []
+
+    def store(column, values, start):
+        if column not in files:
+            files[column] = np.lib.format.open_memmap(os.path.join(path, f"{column}.npy"), mode="w+",
+                                                      dtype=values.dtype, shape=(n_rows,))
+        files[column][start:start + len(values)] = values
+
+    for start, rows, rng in _generators(n_rows, seed, chunk_rows):
+        codes = model.draw(rows, rng)
+
+        store("customerID", _customer_ids(start, rows, id_digits(n_rows)), start)
+        for column in PARENTS:
+            values = model.tables[column]["values"]
+            if column in NUMERIC_CODES:
+                recode = np.array(values).astype(data_loader.NUMERIC_TYPES[column])
+            else:
+                # Codes of the cleaned categories, "No internet service" and "No phone service" are "No"
+                categories = data_loader.CATEGORIES[column]
+                recode = np.array([categories.index("No" if v in CLEANED_TO_NO else v) for v in values], np.int8)
+            store(column, recode[codes[column]], start)
+
+        store("MonthlyCharges", codes["MonthlyCharges"] / 100, start)
+        total = np.maximum(codes["TotalCharges"], 0) / 100
+        sketch.update(total)
+        store("TotalCharges", total, start)
+        blanks.append(np.flatnonzero(codes["TotalCharges"] < 0) + start)
+
+    files["TotalCharges"][np.concatenate(blanks)] = sketch.quantile(0.5)
+    for values in files.values():
+        values.flush()
+
+    meta = {"version": data_loader.SNAPSHOT_VERSION, "rows": n_rows, "columns": [
+        {"name": column, "kind": "categorical", "categories": data_loader.CATEGORIES[column]}
+        if column in data_loader.CATEGORIES else
+        {"name": column, "kind": "string" if column == "customerID" else "numeric"}
+        for column in COLUMNS
+    ]}
+    # meta.json is written last, a directory without it is incomplete
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    return path
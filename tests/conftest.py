@@ -0,0 +1,31 @@
+# Shared setup for the tests, run them from the repo root:
+#   python -m pytest tests
+import contextlib
+import importlib
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+CSV_PATH = os.path.join(REPO_ROOT, "Telco-Customer-Churn.csv")
+
+
+@contextlib.contextmanager
+def loaded_main(csv_path, env):
+    """main.py imported afresh with config from `env` and the dataset at `csv_path`, the env restored after."""
+    saved = {name: os.environ.get(name) for name in list(env) + ["CHURN_DATA_PATH"]}
+    os.environ.update(env, CHURN_DATA_PATH=csv_path)
+    for name in ("config", "main"):
+        sys.modules.pop(name, None)
+    try:
+        yield importlib.import_module("main")
+    finally:
+        sys.modules.pop("main", None)
+        sys.modules.pop("config", None)
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
@@ -0,0 +1,37 @@
+# Every chart of the dashboard drawn for sidebar filters that match no customer
+import shutil
+
+import pytest
+
+from conftest import CSV_PATH, loaded_main
+
+import figure_cache
+import theme
+
+# No two-year contract customer has a tenure of 0 months and pays 18-19 a month
+NOTHING = dict(Contract=["Two year"], PaymentMethod=["Electronic check"], Churn="All", tenure=[0, 0],
+               MonthlyCharges=[18, 19])
+
+
+@pytest.fixture(scope="module", params=["pandas", "sql"])
+def main(request, tmp_path_factory):
+    csv_path = str(tmp_path_factory.mktemp("data") / "telco.csv")
+    shutil.copy(CSV_PATH, csv_path)
+
+    env = {"DATA_RELOAD_INTERVAL": "0", "STREAMING_INGEST": "0", "DATA_BACKEND": request.param}
+    with loaded_main(csv_path, env) as main:
+        yield main
+
+
+@pytest.mark.parametrize("target_theme", ["Light", "Dark"])
+def test_charts_of_filters_matching_nobody(main, target_theme):
+    chart_theme = theme.get_page_theme(target_theme)["chart_theme"]
+
+    for name, chart in main.charts.items():
+        filters = main.narrowed({key: NOTHING[key] for key in chart["filters"]})
+        counts = main.aggregates(filters).counts(chart["column"], **filters)
+        assert counts.sum() == 0, name
+
+        fig = main.page_function(chart["builder"])(counts, chart_theme=chart_theme, **chart["kwargs"])
+        assert [annotation.text for annotation in fig.layout.annotations] == [figure_cache.NO_DATA], name
+        assert fig.layout.title.text == chart["kwargs"]["title"], name
@@ -0,0 +1,60 @@
+# Concurrent predictions share batch calls to the API, see coalescer.py and predictors.create_predictor
+import os
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from conftest import REPO_ROOT
+
+import config
+import local_server
+from predictors import FEATURES, create_predictor
+
+MODEL_PATH = os.path.join(REPO_ROOT, "local_model.npz")
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """URL of local_server.py serving on a free port, with some latency."""
+    server = make_server("127.0.0.1", 0, local_server.create_app(MODEL_PATH, latency_ms=50), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    url = f"http://127.0.0.1:{server.server_port}/churn_prediction"
+    monkeypatch.setattr(config, "LOCAL_MODEL_PATH", MODEL_PATH)
+    monkeypatch.setattr(config, "PREDICTION_URL", url)
+    monkeypatch.setattr(config, "PREDICTION_BATCH_URL", url + "/batch")
+    try:
+        yield url
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def test_concurrent_callers_fill_a_batch(api, monkeypatch):
+    # More callers at once than API calls may be pending: they still share full batches
+    monkeypatch.setattr(config, "PREDICTION_BATCH_SIZE", 32)
+    monkeypatch.setattr(config, "PREDICTION_BATCH_WINDOW_MS", 2000)
+    monkeypatch.setattr(config, "PREDICTION_POOL_SIZE", 2)
+    monkeypatch.setattr(config, "PREDICTION_MAX_PENDING", 2)
+    predictor = create_predictor("remote")
+
+    start = threading.Barrier(32)
+    predictions = []
+
+    def caller(i):
+        start.wait()
+        predictions.append(predictor.predict({key: (i % 7) / 7 for key in FEATURES}))
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = predictor.stats()
+    assert stats["coalescing"]["largest_batch"] == 32
+    assert stats["coalescing"]["batches"] == 1
+    assert stats["calls"] == 1 and stats["fallbacks"] == 0
+    assert len(predictions) == 32 and not any(prediction.fallback for prediction in predictions)
@@ -0,0 +1,59 @@
+# encoder.json has to give the same features as the transformer.pkl it was exported from
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_PATH, REPO_ROOT
+
+import data_loader
+from feature_encoder import FeatureEncoder
+from predictors import model_inputs
+
+pytest.importorskip("sklearn")
+
+
+@pytest.fixture(scope="module")
+def transformer():
+    return pd.read_pickle(os.path.join(REPO_ROOT, "transformer.pkl"))
+
+
+@pytest.fixture(scope="module")
+def encoder():
+    return FeatureEncoder.load(os.path.join(REPO_ROOT, "encoder.json"))
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    return model_inputs(data_loader.load_csv(CSV_PATH))
+
+
+def test_dataset_matches_transformer(transformer, encoder, inputs):
+    expected = np.asarray(transformer.transform(inputs), dtype=np.float64)
+
+    assert np.array_equal(encoder.transform(inputs), expected)
+    assert np.array_equal(encoder.transform(inputs.to_records(index=False)), expected)
+
+
+def test_single_rows_match_transformer(transformer, encoder, inputs):
+    rows = inputs.head(500)
+    expected = np.asarray(transformer.transform(rows), dtype=np.float64)
+
+    # Dicts of plain values, as the prediction form sends them
+    for row, expected_row in zip(rows.to_dict("records"), expected):
+        assert np.array_equal(encoder.transform_one(row), expected_row)
+
+
+def test_unknown_categories_match_transformer(transformer, encoder, inputs):
+    rows = inputs.head(50).copy()
+    rows["PaymentMethod"] = "Crypto wallet"
+    rows["Contract"] = rows["Contract"].astype(str)
+    rows.loc[rows.index[::2], "Contract"] = "Ten year"
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # unknown categories
+        expected = np.asarray(transformer.transform(rows), dtype=np.float64)
+
+    assert np.array_equal(encoder.transform(rows), expected)
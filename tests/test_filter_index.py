@@ -0,0 +1,61 @@
+# Range slider masks of filter_index.FilterIndex against the rows compared one by one
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex
+
+
+def frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    # tenure has few values held by many rows each, MonthlyCharges mostly distinct ones
+    tenure = np.where(rng.random(n_rows) < 0.3, 1, rng.integers(0, 73, n_rows)).astype(np.int16)
+    return pd.DataFrame({
+        "tenure": tenure,
+        "MonthlyCharges": rng.uniform(18, 119, n_rows).round(2),
+        "Contract": pd.Categorical(rng.choice(["Month-to-month", "One year"], n_rows)),
+    })
+
+
+def expected(df, column, low, high):
+    return np.packbits(df[column].between(low, high).to_numpy())
+
+
+RANGES = [("tenure", 0, 72), ("tenure", 1, 1), ("tenure", 2, 2), ("tenure", 0, 1), ("tenure", 1, 40),
+          ("tenure", 13, 12), ("tenure", 80, 90), ("tenure", 0.5, 1.5), ("tenure", -5.0, 0.0),
+          ("MonthlyCharges", 50.5, 50), ("MonthlyCharges", 20.5, 80.25), ("MonthlyCharges", 50, 50.5),
+          ("MonthlyCharges", 0, 30), ("MonthlyCharges", 118, 200)]
+
+
+@pytest.mark.parametrize("n_rows", [1, 7, 100, 10_003])
+def test_range_masks(n_rows):
+    df = frame(n_rows)
+    index = FilterIndex(df, columns=("Contract",))
+
+    for column, low, high in RANGES:
+        mask = index.mask(**{column: (low, high)})
+        if mask is None:
+            assert df[column].between(low, high).all()
+        else:
+            assert np.array_equal(mask, expected(df, column, low, high)), (column, low, high)
+
+
+def test_range_of_an_empty_frame():
+    index = FilterIndex(frame(0), columns=("Contract",))
+
+    assert index.mask(tenure=(0, 10)) is None
+    assert len(index.select(tenure=(0, 10), Contract="One year")) == 0
+
+
+def test_extended_range_masks():
+    df, rows = frame(5_000), frame(333, seed=1)
+    index = FilterIndex(df, columns=("Contract",))
+    for column, low, high in RANGES:
+        index.mask(**{column: (low, high)})
+
+    both = pd.concat([df, rows], ignore_index=True)
+    extended = index.extended(both, rows)
+    for column, low, high in RANGES:
+        mask = extended.mask(**{column: (low, high)}, Contract="One year")
+        keep = both[column].between(low, high) & (both["Contract"] == "One year")
+        assert np.array_equal(mask, np.packbits(keep.to_numpy())), (column, low, high)
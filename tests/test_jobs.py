@@ -0,0 +1,82 @@
+# Job ids come back from the browser, anything else than an id submit() handed out is an unknown job
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from jobs import CANCELLED, DONE, FAILED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path), max_workers=2, max_pending=2)
+
+
+@pytest.mark.parametrize("job_id", [None, 42, ["abc"], {"id": "abc"}, "", "abc", "../" + "0" * 29, "f" * 33])
+def test_invalid_ids_are_unknown_jobs(queue, job_id):
+    assert queue.status(job_id) is None
+    assert queue.collect(job_id) is None
+    assert queue.wait(job_id, 0)
+    queue.cancel(job_id)
+    assert os.listdir(queue.directory) == []
+
+
+def test_cancel_after_collect_leaves_no_files(queue):
+    job_id = queue.submit(lambda report: "result")
+    assert queue.wait(job_id, 5)
+    assert queue.collect(job_id)["state"] == DONE
+
+    queue.cancel(job_id)
+    assert queue.status(job_id) is None
+    assert os.listdir(queue.directory) == []
+
+
+def test_cancel_running_job(queue):
+    started, release = threading.Event(), threading.Event()
+
+    def job(report):
+        started.set()
+        release.wait(5)
+        report("Still running")
+
+    job_id = queue.submit(job)
+    assert started.wait(5)
+    queue.cancel(job_id)
+    assert queue.collect(job_id)["state"] == CANCELLED
+
+    release.set()
+    assert queue.wait(job_id, 5)
+    assert os.listdir(queue.directory) == []
+
+
+def test_running_job_of_a_lost_worker_failed(queue):
+    job_id = "0" * 32
+    path = os.path.join(queue.directory, job_id + ".json")
+    stale = time.time() - queue.heartbeat_timeout - 1
+    with open(path, "w") as f:
+        json.dump({"state": RUNNING, "progress": "Waiting for the churn model", "updated": stale}, f)
+    os.utime(path, (stale, stale))
+
+    assert queue.status(job_id) == {"state": FAILED, "progress": "Failed", "error": "worker lost"}
+    assert queue.collect(job_id)["state"] == FAILED
+    assert os.listdir(queue.directory) == []
+
+
+def test_running_job_seen_from_another_worker_is_alive(tmp_path):
+    queue = JobQueue(str(tmp_path), max_workers=1, max_pending=0, heartbeat_timeout=0.3)
+    other_worker = JobQueue(str(tmp_path), heartbeat_timeout=0.3)
+    release = threading.Event()
+
+    def job(report):
+        report("Still running")
+        release.wait(5)
+
+    job_id = queue.submit(job)
+    time.sleep(1)
+    assert other_worker.status(job_id)["state"] == RUNNING
+
+    release.set()
+    assert queue.wait(job_id, 5)
+    assert other_worker.collect(job_id)["state"] == DONE
@@ -0,0 +1,111 @@
+# Rows appended to the customer CSV while the app runs, see reloader.py and main.append_rows
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_PATH, loaded_main
+
+import data_loader
+import reloader
+import risk
+from cube import RowCounts
+from filter_index import FilterIndex
+
+ENV = {"DATA_RELOAD_INTERVAL": "0", "DATASET_MMAP": "1", "PREDICTOR_BACKEND": "local", "STREAMING_INGEST": "0",
+       "DATA_BACKEND": "pandas"}
+
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    """main.py loaded from a copy of the shipped CSV, the copy is then appended to."""
+    csv_path = str(tmp_path_factory.mktemp("data") / "telco.csv")
+    shutil.copy(CSV_PATH, csv_path)
+
+    with loaded_main(csv_path, ENV) as main:
+        yield main, csv_path, reloader.CSVWatcher(csv_path, main.append_rows, main.reload_dataset)
+
+
+def assert_same_as_a_cold_load(main, csv_path):
+    cold = data_loader.load_dataset(csv_path, use_snapshot=False)
+    assert len(main.df) == len(cold)
+    assert main.cube.kpis()["rows"] == len(cold)
+
+
+def append(csv_path, **changes):
+    """Append a copy of the first customer, with a new customerID and `changes`."""
+    row = pd.read_csv(CSV_PATH, nrows=1)
+    row["customerID"] = f"9999-{len(open(csv_path).readlines()):05d}"
+    for column, value in changes.items():
+        row[column] = value
+    row.to_csv(csv_path, mode="a", header=False, index=False)
+
+
+def test_rows_outside_the_schema_are_rejected(app):
+    main, csv_path, watcher = app
+    customers, rows = main.cube.kpis()["customers"], len(main.df)
+
+    append(csv_path, PaymentMethod="Crypto wallet")
+    assert watcher.check() == "append"
+
+    assert main.cube.kpis()["customers"] == customers
+    assert len(main.df) == rows
+    assert watcher.stats()["rows_rejected"] == 1
+    assert all(isinstance(value, str) for values in main.filter_values.values() for value in values)
+    assert "Crypto wallet" not in main.payment_method
+    assert_same_as_a_cold_load(main, csv_path)
+
+
+def test_rows_inside_the_schema_are_counted(app):
+    main, csv_path, watcher = app
+    customers, rows = main.cube.kpis()["customers"], len(main.df)
+    month_to_month = main.cube.kpis(Contract="Month-to-month")["customers"]
+
+    append(csv_path, Contract="Month-to-month", tenure=3)
+    assert watcher.check() == "append"
+
+    assert main.cube.kpis()["customers"] == customers + 1
+    assert main.cube.kpis(Contract="Month-to-month")["customers"] == month_to_month + 1
+    assert len(main.df) == rows + 1
+    assert main.update_at_risk_table([], [], 25, [0, 72], [18, 119])[1] is not None
+
+
+def test_appended_rows_extend_what_is_built(app):
+    main, csv_path, watcher = app
+    filters = dict(Contract="Month-to-month", PaymentMethod=("Electronic check",), tenure=(3, 40),
+                   MonthlyCharges=(20.0, 80.5))
+    main.row_counts.get().counts("InternetService", **filters)
+    main.risk_ranking.get()
+
+    append(csv_path, Contract="Month-to-month", PaymentMethod="Electronic check", tenure=3, MonthlyCharges=20.0)
+    append(csv_path, tenure=40, MonthlyCharges=80.5)
+    assert watcher.check() == "append"
+
+    # Mapped again from a snapshot holding the new rows, not copied into this process
+    assert main.dataset_snapshot.endswith(f"+rows-{len(main.df)}")
+    assert isinstance(main.df["tenure"].to_numpy().base, np.memmap)
+
+    index = FilterIndex(main.df)
+    assert np.array_equal(main.filter_index.get().mask(**filters), index.mask(**filters))
+    counts = RowCounts(main.df, index)
+    for column in ("InternetService", "tenure", "Churn"):
+        assert main.row_counts.get().counts(column, **filters).equals(counts.counts(column, **filters))
+
+    ranking = main.risk_ranking.get()
+    assert np.array_equal(ranking.order, risk.RiskRanking(main.df, ranking.scores, index).order)
+
+
+def test_replaced_file_with_unknown_values_keeps_clean_options(app):
+    main, csv_path, watcher = app
+    df = pd.read_csv(CSV_PATH)
+    df.loc[:10, "Contract"] = "Ten year"
+    df.to_csv(csv_path + ".new", index=False)
+    os.replace(csv_path + ".new", csv_path)
+
+    assert watcher.check() == "replace"
+    assert sorted(main.filter_values["Contract"]) == ["Month-to-month", "One year", "Two year"]
+    assert all(isinstance(option["value"], str) for option in main.filter_options(main.contracts))
+    assert len(main.df) == len(df) - 11
+    assert_same_as_a_cold_load(main, csv_path)
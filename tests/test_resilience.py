@@ -0,0 +1,67 @@
+# A slow prediction API never gets more than max_pending calls, the rest fall back right away
+import threading
+import time
+
+from predictors import Prediction
+from resilience import CircuitBreaker, ResilientPredictor
+
+
+class SlowPredictor:
+    name = "slow"
+    version = "1"
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.running = 0
+        self.most_running = 0
+        self._lock = threading.Lock()
+
+    def predict(self, features):
+        with self._lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.running -= 1
+        return Prediction("Stay", False)
+
+    def stats(self):
+        return {}
+
+
+class Fallback(SlowPredictor):
+    def __init__(self):
+        super().__init__(0)
+
+
+def test_calls_past_the_budget_hold_their_slot():
+    primary = SlowPredictor(0.5)
+    predictor = ResilientPredictor(primary, Fallback(), CircuitBreaker(failure_threshold=100),
+                                   budget=0.05, max_pending=2)
+
+    threads = [threading.Thread(target=predictor.predict, args=([0],)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = predictor.stats()
+    assert primary.most_running == 2
+    assert stats["timeouts"] + stats["saturated"] == 8
+    assert stats["saturated"] >= 6
+    assert stats["fallbacks"] == 8
+
+    # Once the slow calls are over their slots are free again
+    time.sleep(0.6)
+    primary.seconds = 0
+    assert predictor.predict([0]).fallback is False
+
+
+def test_open_breaker_gives_back_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    predictor = ResilientPredictor(SlowPredictor(0), Fallback(), breaker, budget=1, max_pending=1)
+
+    for _ in range(3):
+        assert predictor.predict([0]).fallback is True
+    assert predictor.stats()["saturated"] == 0
@@ -0,0 +1,101 @@
+# Rows appended to a columnar snapshot, see data_loader.extend_snapshot
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_PATH
+
+import data_loader
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """(csv path, snapshot path, mapped DataFrame, the cleaned rows to append) of a copy of the shipped CSV."""
+    csv_path = str(tmp_path / "telco.csv")
+    shutil.copy(CSV_PATH, csv_path)
+    df = data_loader.load_dataset(csv_path, mmap=True)
+
+    rows = data_loader.load_csv(CSV_PATH).head(30)
+    rows["customerID"] = [f"9999-{i:05d}" for i in range(len(rows))]
+    return csv_path, data_loader.snapshot_dir(csv_path), df, rows
+
+
+def expected(df, rows):
+    return pd.concat([df, rows], ignore_index=True)
+
+
+def test_appends_write_the_rows_only(snapshot):
+    csv_path, path, df, rows = snapshot
+    sizes = {name: os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)}
+
+    first, df1 = data_loader.extend_snapshot(path, df, rows[:10], csv_path, mmap=True)
+    second, df2 = data_loader.extend_snapshot(first, df1, rows[10:], csv_path, mmap=True)
+
+    # New snapshots are a meta.json each, the column files grew by the rows
+    assert os.listdir(first) == os.listdir(second) == ["meta.json"]
+    tenure = os.path.join(path, "tenure.npy")
+    assert os.path.getsize(tenure) == sizes["tenure.npy"] + 30 * df["tenure"].dtype.itemsize
+    assert os.path.getsize(os.path.join(path, "meta.json")) == sizes["meta.json"]
+
+    pd.testing.assert_frame_equal(df2, expected(df, rows))
+    pd.testing.assert_frame_equal(data_loader.read_snapshot(second), expected(df, rows))
+    # Older snapshots still read as they were
+    pd.testing.assert_frame_equal(data_loader.read_snapshot(path), df)
+    pd.testing.assert_frame_equal(data_loader.read_snapshot(first), expected(df, rows[:10]))
+    assert isinstance(df2["tenure"].to_numpy().base, np.memmap)
+
+
+def test_worker_behind_reuses_the_written_rows(snapshot):
+    csv_path, path, df, rows = snapshot
+    data_loader.extend_snapshot(path, df, rows, csv_path, mmap=True)
+    size = os.path.getsize(os.path.join(path, "MonthlyCharges.npy"))
+
+    # Another worker saw the same rows in two reads
+    first, df1 = data_loader.extend_snapshot(path, df, rows[:10], csv_path, mmap=True)
+    _, df2 = data_loader.extend_snapshot(first, df1, rows[10:], csv_path, mmap=True)
+
+    assert os.path.getsize(os.path.join(path, "MonthlyCharges.npy")) == size
+    pd.testing.assert_frame_equal(df2, expected(df, rows))
+
+
+def test_new_dictionary_values(tmp_path):
+    csv_path = str(tmp_path / "plans.csv")
+    path = os.path.join(data_loader.snapshot_root(csv_path), "plans-v3")
+    os.makedirs(path)
+    df = pd.DataFrame({"plan": ["basic", "plus", "basic"], "price": [10.0, 20.0, 10.0]})
+    data_loader.write_snapshot(df, path)
+    df = data_loader.read_snapshot(path, mmap=True)
+
+    rows = pd.DataFrame({"plan": ["premium", "basic", "family", "premium"], "price": [30.0, 10.0, 25.0, 30.0]})
+    target, df1 = data_loader.extend_snapshot(path, df, rows, csv_path, mmap=True)
+
+    pd.testing.assert_frame_equal(df1, expected(df, rows))
+    pd.testing.assert_frame_equal(data_loader.read_snapshot(target), expected(df, rows))
+
+
+def test_written_whole_when_the_rows_do_not_fit(snapshot):
+    csv_path, path, df, rows = snapshot
+    rows = rows.copy()
+    rows.loc[0, "customerID"] = "a-much-longer-customer-id"
+
+    target, df1 = data_loader.extend_snapshot(path, df, rows, csv_path, mmap=True)
+    assert "customerID.npy" in os.listdir(target)
+    pd.testing.assert_frame_equal(df1, expected(df, rows))
+
+
+def test_written_whole_when_the_files_are_gone(snapshot):
+    csv_path, path, df, rows = snapshot
+    shutil.rmtree(path)
+
+    target, df1 = data_loader.extend_snapshot(path, df, rows, csv_path, mmap=True)
+    assert "tenure.npy" in os.listdir(target)
+    pd.testing.assert_frame_equal(df1, expected(df, rows))
+
+    # Appends to it grow its own files
+    more = rows.assign(customerID=[f"8888-{i:05d}" for i in range(len(rows))])
+    second, df2 = data_loader.extend_snapshot(target, df1, more, csv_path, mmap=True)
+    assert os.listdir(second) == ["meta.json"]
+    pd.testing.assert_frame_equal(df2, expected(df1, more))
@@ -0,0 +1,74 @@
+# The SQLite backend has to answer every chart and KPI card like the in-memory cube
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import CSV_PATH
+
+import data_loader
+import sql_backend
+from cube import CUBE_COLUMNS, AggregateCube, RowCounts
+from filter_index import FilterIndex
+
+CATEGORICAL_FILTERS = [
+    {},
+    {"Contract": "Two year"},
+    {"Contract": ["Month-to-month", "One year"], "PaymentMethod": "Electronic check"},
+    {"PaymentMethod": ["Mailed check", "Bank transfer (automatic)"], "Churn": "Yes"},
+    {"Contract": [], "PaymentMethod": ["All"], "Churn": "No"},
+    {"Contract": "Not a contract"},
+]
+RANGE_FILTERS = [
+    {"tenure": (12, 48)},
+    {"tenure": (0, 0), "Contract": ["Two year"]},
+    {"MonthlyCharges": (30, 90), "PaymentMethod": ["Electronic check", "Credit card (automatic)"]},
+    {"tenure": (1, 72), "MonthlyCharges": (18, 119), "Churn": "Yes"},
+]
+
+
+@pytest.fixture(scope="module")
+def df():
+    return data_loader.load_csv(CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def backend(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("sql") / "telco.sqlite")
+    sql_backend.build(CSV_PATH, path, chunk_rows=2000)
+    return sql_backend.SQLBackend(path)
+
+
+def assert_same(backend, expected, filters):
+    for column in CUBE_COLUMNS:
+        assert backend.counts(column, **filters).equals(expected.counts(column, **filters)), (column, filters)
+
+    kpis, expected_kpis = backend.kpis(**filters), expected.kpis(**filters)
+    assert {k: kpis[k] for k in ("customers", "rows", "churned")} == \
+           {k: expected_kpis[k] for k in ("customers", "rows", "churned")}
+    assert np.isclose(kpis["total_charges"], expected_kpis["total_charges"], rtol=1e-9)
+
+
+@pytest.mark.parametrize("filters", CATEGORICAL_FILTERS)
+def test_same_as_cube(backend, df, filters):
+    assert_same(backend, AggregateCube(df), filters)
+
+
+def test_every_single_value_filter(backend, df):
+    cube = AggregateCube(df)
+    keys = ["Contract", "PaymentMethod", "Churn"]
+    for values in itertools.product(*[["All"] + data_loader.CATEGORIES[k] for k in keys]):
+        filters = dict(zip(keys, values))
+        assert backend.counts("InternetService", **filters).equals(cube.counts("InternetService", **filters))
+        assert backend.kpis(**filters)["customers"] == cube.kpis(**filters)["customers"]
+
+
+@pytest.mark.parametrize("filters", RANGE_FILTERS)
+def test_ranges_same_as_row_bitmaps(backend, df, filters):
+    assert_same(backend, RowCounts(df, FilterIndex(df)), filters)
+
+
+def test_metadata(backend, df):
+    assert backend.rows == len(df)
+    assert backend.bounds("tenure") == (df["tenure"].min(), df["tenure"].max())
+    assert backend.first_seen("PaymentMethod") == df["PaymentMethod"].unique().tolist()
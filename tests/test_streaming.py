@@ -0,0 +1,51 @@
+# Distinct customers of a streamed file: exact up to max_exact_ids, a bounded sketch estimate past it
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_PATH
+
+import data_loader
+import streaming
+from cube import AggregateCube
+
+
+@pytest.fixture(scope="module")
+def whole():
+    return AggregateCube(data_loader.load_csv(CSV_PATH))
+
+
+def streamed(max_exact_ids):
+    cube = AggregateCube(max_exact_ids=max_exact_ids)
+    streaming.stream_dataset(CSV_PATH, [cube], chunk_rows=1000)
+    return cube
+
+
+def test_exact_below_the_limit(whole):
+    cube = streamed(max_exact_ids=10_000)
+    for contract in ["All"] + data_loader.CATEGORIES["Contract"]:
+        assert cube.kpis(Contract=contract) == pytest.approx(whole.kpis(Contract=contract))
+
+
+def test_estimated_past_the_limit(whole):
+    cube = streamed(max_exact_ids=1000)
+    assert cube._seen_ids is None
+
+    for filters in [{}, {"Contract": "Month-to-month"}, {"PaymentMethod": ["Mailed check", "Bank transfer (automatic)"]}]:
+        expected = whole.kpis(**filters)
+        kpis = cube.kpis(**filters)
+        assert kpis["customers"] == pytest.approx(expected["customers"], rel=0.03)
+        assert {k: v for k, v in kpis.items() if k != "customers"} == pytest.approx(
+            {k: v for k, v in expected.items() if k != "customers"})
+
+
+def test_sketch_union_of_sets():
+    ids = pd.util.hash_array(np.array([f"{i:07d}-ABCDE" for i in range(200_000)], dtype=object), categorize=False)
+    sketch = streaming.DistinctSketch(4)
+    sketch.update(np.arange(len(ids)) % 4, ids)
+    # The same IDs again change nothing
+    sketch.update(np.arange(len(ids)) % 4, ids)
+
+    assert sketch.count([0]) == pytest.approx(50_000, rel=0.03)
+    assert sketch.count([0, 1, 2, 3]) == pytest.approx(200_000, rel=0.03)
+    assert sketch.count([]) == 0
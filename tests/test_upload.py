@@ -0,0 +1,71 @@
+# A CSV upload is scored as a background job: polled until done, and cancelled between chunks
+import base64
+import shutil
+import threading
+
+import pandas as pd
+import pytest
+
+from conftest import CSV_PATH, loaded_main
+
+import batch_scoring
+
+
+@pytest.fixture(scope="module")
+def main(tmp_path_factory):
+    csv_path = str(tmp_path_factory.mktemp("data") / "telco.csv")
+    shutil.copy(CSV_PATH, csv_path)
+
+    env = {"DATA_RELOAD_INTERVAL": "0", "STREAMING_INGEST": "0", "BATCH_PREDICTOR_BACKEND": "local",
+           "PREDICTION_JOBS_DIR": str(tmp_path_factory.mktemp("jobs"))}
+    with loaded_main(csv_path, env) as main:
+        yield main
+
+
+def upload(path=CSV_PATH):
+    with open(path, "rb") as f:
+        return "data:text/csv;base64," + base64.b64encode(f.read()).decode()
+
+
+def test_upload_is_scored_in_the_background(main):
+    job_id = main.prediction_jobs.submit(main.run_upload_scoring, upload(), "telco.csv")
+    assert main.prediction_jobs.wait(job_id, 30)
+
+    summary, download, job, poll_disabled, _ = main.upload_result(job_id)
+    assert job is None and poll_disabled
+    assert download["filename"] == "telco-scored.csv"
+    assert "of 7,043 customers" in summary[0].children
+    assert main.prediction_jobs.status(job_id) is None  # collected
+
+
+def test_unreadable_upload_reports_the_error(main):
+    job_id = main.prediction_jobs.submit(main.run_upload_scoring, "data:text/csv;base64,", "empty.csv")
+    assert main.prediction_jobs.wait(job_id, 30)
+
+    summary, download, job, _, _ = main.upload_result(job_id)
+    assert summary.children.startswith("Could not score empty.csv")
+    assert job is None
+
+
+def test_cancelled_upload_stops_between_chunks(main, monkeypatch, tmp_path):
+    two_chunks = tmp_path / "two-chunks.csv"
+    pd.concat([pd.read_csv(CSV_PATH)] * 8).to_csv(two_chunks, index=False)
+    started, release = threading.Event(), threading.Event()
+    chunks = []
+    predict_batch = main.batch_predictor.get().predict_batch
+
+    def slow_predict_batch(X):
+        chunks.append(len(X))
+        started.set()
+        release.wait(5)
+        return predict_batch(X)
+
+    monkeypatch.setattr(main.batch_predictor.get(), "predict_batch", slow_predict_batch)
+    job_id = main.prediction_jobs.submit(main.run_upload_scoring, upload(two_chunks), "two-chunks.csv")
+    assert started.wait(5)
+
+    main.prediction_jobs.cancel(job_id)
+    assert main.upload_result(job_id)[0].children == "Scoring Cancelled"
+    release.set()
+    assert main.prediction_jobs.wait(job_id, 30)
+    assert chunks == [batch_scoring.CHUNK_SIZE]
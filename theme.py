@@ -0,0 +1,139 @@
+# Light / Dark page themes and the patches that switch a rendered page between them
+import functools
+
+import plotly.io as pio
+from dash import Patch
+
+# Charts drawn with the page template (bars, tenure scatter)
+CHART = "chart"
+
+# Pie charts keep the default template, only their background and title color follow the page
+PIE_CHART = "pie-chart"
+
+# Everything else on a page that follows the theme
+KPI_CARD = "kpi-card"
+TABLE = "table"
+KPI_TEXT = "kpi-text"
+PAGE_TITLE = "page-title"
+
+
+def get_page_theme(target_theme):
+    page_theme = {
+        "title_color": "#333",
+        "text_color": "#777",
+        "app_theme": "#F8F8F8",
+
+        "chart_theme": "plotly_white",
+        "chart_border": "#F8F8F8",
+
+        "card_bg": "#fff",
+        "card_bg_border": "#fafafa",
+        "card_font_color": "#333",
+
+    }
+
+    if target_theme == "Dark":
+        page_theme["title_color"] = "#fefefe"
+
+        page_theme["text_color"] = "#eee"
+
+        page_theme["app_theme"] = "#111526"
+
+        page_theme["chart_theme"] = "plotly_dark"
+        page_theme["chart_border"] = "#171C31"
+
+        page_theme["card_bg"] = "#171C31"
+        page_theme["card_bg_border"] = "#171C31"
+        page_theme["card_font_color"] = "#fafafa"
+
+    return page_theme
+
+
+def get_card_style(page_theme):
+    return {
+        "background-color": page_theme["card_bg"],
+        "text-align": "center",
+        "padding-top": "25px",
+        "padding-bottom": "25px",
+        "border": f"3px solid {page_theme['card_bg_border']}",
+        "border-radius": "5px",
+        "margin-bottom": "5px",
+        "box-shadow": "0 1px 2px 0 rgba(0, 0, 0, 0.05)",
+        "opacity": 0.8
+    }
+
+
+def get_graph_style(page_theme):
+    return {
+        "margin-bottom": "10px",
+        "height": "560px",
+        "border": f"3px solid {page_theme['chart_border']}",
+        "border-radius": "4px"
+    }
+
+
+def get_app_theme(page_theme):
+    return {
+        "margin-left": "16rem",
+        "margin-right": "0rem",
+        "padding": "20px",
+        "height": "100%",
+        "background-color": page_theme['app_theme']
+    }
+
+
+def get_table_header_style(page_theme):
+    return {
+        "background-color": page_theme["chart_border"] if page_theme["chart_theme"] == "plotly_dark" else "#ededed",
+        "color": page_theme["title_color"],
+        "font": "bold 14px arial",
+        "border": f"1px solid {page_theme['app_theme']}",
+    }
+
+
+def get_table_data_style(page_theme):
+    return {
+        "background-color": page_theme["card_bg"],
+        "color": page_theme["card_font_color"],
+        "font": "14px arial",
+        "border": f"1px solid {page_theme['app_theme']}",
+    }
+
+
+# Trace types the template charts use, the other trace defaults are not sent
+TEMPLATE_TRACES = ("bar", "scatter")
+
+
+@functools.lru_cache(maxsize=None)
+def template_json(chart_theme):
+    template = pio.templates[chart_theme].to_plotly_json()
+    template["data"] = {k: v for k, v in template["data"].items() if k in TEMPLATE_TRACES}
+    return template
+
+
+# ---------------------- Theme Patches ----------------------
+# Mirror what the chart functions do for `chart_theme`, without rebuilding the figure.
+def chart_patch(chart_theme, pie=False):
+    patch = Patch()
+
+    if chart_theme == "plotly_dark":
+        patch["layout"]["paper_bgcolor"] = '#171C31'
+        patch["layout"]["plot_bgcolor"] = 'rgba(255,255,255,0)'
+    else:
+        del patch["layout"]["paper_bgcolor"]
+        del patch["layout"]["plot_bgcolor"]
+
+    if not pie:
+        patch["layout"]["template"] = template_json(chart_theme)
+    elif chart_theme == "plotly_dark":
+        patch["layout"]["title"]["font"]["color"] = "#fff"
+    else:
+        del patch["layout"]["title"]["font"]["color"]
+
+    return patch
+
+
+def color_patch(color):
+    patch = Patch()
+    patch["color"] = color
+    return patch